@@ -20,6 +20,7 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 from .base_build_pointing_model import *
+from .consdb_client import *
 from .love_manager_client import *
 from .make_love_stress_tests import *
 from .make_love_uptime_tests import *
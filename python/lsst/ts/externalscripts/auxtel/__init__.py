@@ -23,8 +23,11 @@ from .calsys_take_narrowband_data import *
 from .calsys_takedata import *
 from .latiss_acquire import *
 from .latiss_acquire_and_take_sequence import *
+from .latiss_align_replay import *
 from .latiss_cwfs_align import *
+from .latiss_fast_centroid import *
 from .latiss_intra_extra_focal_data import *
+from .latiss_measurement_service import *
 from .latiss_take_twilight_flats import *
 from .latiss_wep_align import *
 from .make_latiss_calibrations import *
@@ -24,10 +24,12 @@ __all__ = [
 
 import warnings
 
+import astropy.table
+import numpy as np
+from lsst.ts import utils
 from lsst.ts.observatory.control.utils.enums import RotType
 
 try:
-    from lsst.summit.utils import BestEffortIsr
     from lsst.ts.observing.utilities.auxtel.latiss.getters import get_image
     from lsst.ts.observing.utilities.auxtel.latiss.utils import (
         calculate_xy_offsets,
@@ -41,6 +43,174 @@ from lsst.ts.externalscripts.base_build_pointing_model import BaseBuildPointingM
 from lsst.ts.observatory.control.auxtel import ATCS, LATISS, ATCSUsages, LATISSUsages
 from lsst.ts.observatory.control.constants.latiss_constants import boresight
 
+from .latiss_measurement_service import get_measurement_service
+
+
+class TargetIndex:
+    """Index of a local star catalog used to find reference targets for the
+    grid positions without querying a catalog service.
+
+    The catalog is filtered by magnitude and sorted by declination once, when
+    the index is built. A grid position in azimuth/elevation corresponds to a
+    fixed hour angle/declination, so the candidate targets of a position are
+    the stars in the declination band around it. The candidates of each grid
+    cell are precomputed with `precompute`; only the right ascension of the
+    position, and therefore the order of the candidates, depends on the time
+    of the slew.
+
+    Parameters
+    ----------
+    catalog : `astropy.table.Table`
+        Star catalog with ``ra`` and ``dec`` (in deg) and ``mag`` columns,
+        and, optionally, a ``name`` column.
+    mag_limit : `float`
+        Brightest magnitude of the targets.
+    mag_range : `float`
+        Magnitude range of the targets.
+    radius : `float`
+        Search radius around the grid positions (in deg).
+    latitude : `float`
+        Latitude of the observatory (in deg).
+    """
+
+    def __init__(self, catalog, mag_limit, mag_range, radius, latitude):
+        self.radius = radius
+        self.latitude = latitude
+
+        mag = np.array(catalog["mag"], dtype=float)
+        in_range = (mag >= mag_limit) & (mag <= mag_limit + mag_range)
+
+        dec = np.array(catalog["dec"], dtype=float)[in_range]
+        dec_sort = np.argsort(dec)
+
+        self.ra = np.array(catalog["ra"], dtype=float)[in_range][dec_sort]
+        self.dec = dec[dec_sort]
+        self.mag = mag[in_range][dec_sort]
+        self.name = (
+            np.array(catalog["name"], dtype=str)[in_range][dec_sort]
+            if "name" in catalog.colnames
+            else np.array(
+                [f"{ra:0.4f} {dec:+0.4f}" for ra, dec in zip(self.ra, self.dec)]
+            )
+        )
+
+        # Hour angle, declination and candidate targets of each grid cell,
+        # by azimuth/elevation.
+        self.cell_candidates = dict()
+
+    def __len__(self):
+        return len(self.ra)
+
+    def precompute(self, azimuths, elevations):
+        """Precompute the candidate targets of the grid cells.
+
+        Parameters
+        ----------
+        azimuths : `numpy.ndarray`
+            Azimuth of the grid positions (in deg).
+        elevations : `numpy.ndarray`
+            Elevation of the grid positions (in deg).
+        """
+        for azimuth, elevation in zip(azimuths, elevations):
+            self.get_cell_candidates(azimuth=azimuth, elevation=elevation)
+
+    def get_cell_candidates(self, azimuth, elevation):
+        """Get the candidate targets of a grid cell, computing them if they
+        were not precomputed.
+
+        Parameters
+        ----------
+        azimuth : `float`
+            Azimuth of the position (in deg).
+        elevation : `float`
+            Elevation of the position (in deg).
+
+        Returns
+        -------
+        hour_angle : `float`
+            Hour angle of the position (in deg).
+        declination : `float`
+            Declination of the position (in deg).
+        candidates : `numpy.ndarray`
+            Indices of the stars in the declination band of the position.
+        """
+        key = (float(azimuth), float(elevation))
+
+        if key not in self.cell_candidates:
+            hour_angle, declination = azel_to_hadec(
+                azimuth=azimuth, elevation=elevation, latitude=self.latitude
+            )
+            start, end = np.searchsorted(
+                self.dec, [declination - self.radius, declination + self.radius]
+            )
+            self.cell_candidates[key] = (hour_angle, declination, np.arange(start, end))
+
+        return self.cell_candidates[key]
+
+    def find_targets(self, azimuth, elevation, local_sidereal_time, max_targets=None):
+        """Find the targets within the search radius of an azimuth/elevation
+        position, nearest first.
+
+        Parameters
+        ----------
+        azimuth : `float`
+            Azimuth of the position (in deg).
+        elevation : `float`
+            Elevation of the position (in deg).
+        local_sidereal_time : `float`
+            Local sidereal time (in deg).
+        max_targets : `int`, optional
+            Maximum number of targets to return.
+
+        Returns
+        -------
+        targets : `list` [`tuple` [`str`, `float`, `float`]]
+            Name, right ascension (in hours) and declination (in deg) of the
+            targets.
+        """
+        hour_angle, declination, candidates = self.get_cell_candidates(
+            azimuth=azimuth, elevation=elevation
+        )
+        right_ascension = local_sidereal_time - hour_angle
+
+        separation = angular_separation(
+            right_ascension, declination, self.ra[candidates], self.dec[candidates]
+        )
+        order = np.argsort(separation)
+        order = order[separation[order] <= self.radius][:max_targets]
+
+        return [
+            (self.name[index], self.ra[index] / 15.0, self.dec[index])
+            for index in candidates[order]
+        ]
+
+    def find_target(self, azimuth, elevation, local_sidereal_time):
+        """Find the target nearest to an azimuth/elevation position.
+
+        Parameters
+        ----------
+        azimuth : `float`
+            Azimuth of the position (in deg).
+        elevation : `float`
+            Elevation of the position (in deg).
+        local_sidereal_time : `float`
+            Local sidereal time (in deg).
+
+        Returns
+        -------
+        target : `tuple` [`str`, `float`, `float`] or `None`
+            Name, right ascension (in hours) and declination (in deg) of the
+            target, or `None` if there are no stars within the search radius.
+        """
+        targets = self.find_targets(
+            azimuth=azimuth,
+            elevation=elevation,
+            local_sidereal_time=local_sidereal_time,
+            max_targets=1,
+        )
+
+        return targets[0] if targets else None
+
 
 class BuildPointingModel(BaseBuildPointingModel):
     """Build pointing model.
@@ -70,6 +240,8 @@ class BuildPointingModel(BaseBuildPointingModel):
             self._atcs = None
             self._latiss = None
 
+        self.target_index = None
+
     @property
     def tcs(self):
         return self._atcs
@@ -82,8 +254,13 @@ class BuildPointingModel(BaseBuildPointingModel):
     def boresight(self):
         return boresight
 
+    async def warm_up_measurement_service(self):
+        # Isolate the construction of the ISR and measurement task so it can
+        # be mocked in unit tests
+        await get_measurement_service().warm_up()
+
     def get_best_effort_isr(self):
-        return BestEffortIsr()
+        return get_measurement_service().best_effort_isr
 
     async def get_image(self, image_id):
         return await get_image(
@@ -116,6 +293,29 @@ class BuildPointingModel(BaseBuildPointingModel):
         bool
             True if successful, False, otherwise.
         """
+        if self.target_index is not None:
+            for name, ra, dec in self.find_targets_in_index(
+                azimuth=azimuth, elevation=elevation
+            ):
+                try:
+                    await self.tcs.slew_icrs(
+                        ra=ra,
+                        dec=dec,
+                        target_name=name,
+                        rot=rotator,
+                        rot_type=RotType.PhysicalSky,
+                    )
+                    return True
+                except Exception:
+                    self.log.exception(
+                        f"Failed to slew to {name}. Trying next candidate target."
+                    )
+
+            self.log.warning(
+                f"No target in local catalog for azimuth={azimuth}, elevation={elevation}. "
+                "Querying catalog service."
+            )
+
         try:
             target = await self.tcs.find_target(
                 az=azimuth,
@@ -136,11 +336,65 @@ class BuildPointingModel(BaseBuildPointingModel):
         )
         return True
 
+    def find_targets_in_index(self, azimuth, elevation):
+        """Find the candidate targets for a grid position in the local target
+        index, nearest first.
+
+        Parameters
+        ----------
+        azimuth : `float`
+            Azimuth position, in deg.
+        elevation : `float`
+            Elevation position, in deg.
+
+        Returns
+        -------
+        targets : `list` [`tuple` [`str`, `float`, `float`]]
+            Name, right ascension (in hours) and declination (in deg) of up
+            to ``target_candidates`` targets.
+        """
+        time = utils.astropy_time_from_tai_unix(utils.current_tai())
+        time.location = self.tcs.location
+        local_sidereal_time = time.sidereal_time("mean").deg
+
+        return self.target_index.find_targets(
+            azimuth=azimuth,
+            elevation=elevation,
+            local_sidereal_time=local_sidereal_time,
+            max_targets=self.config.target_candidates,
+        )
+
     @classmethod
     def get_schema(cls):
         schema = super().get_schema()
         # Update the program default for AuxTel
         schema["properties"]["program"]["default"] = "ATPTMODEL"
+        schema["properties"]["target_catalog"] = dict(
+            description=(
+                "Optional local star catalog used to find the targets for the grid positions, "
+                "instead of querying the catalog service for each position. The file must be "
+                "readable by astropy and contain ra and dec (in deg) and mag columns, and, "
+                "optionally, a name column. Grid positions without a target in the local "
+                "catalog fall back to the catalog service."
+            ),
+            anyOf=[dict(type="string"), dict(type="null")],
+            default=None,
+        )
+        schema["properties"]["target_search_radius"] = dict(
+            type="number",
+            default=3.0,
+            exclusiveMinimum=0,
+            description="Search radius (in deg) for targets in the local star catalog.",
+        )
+        schema["properties"]["target_candidates"] = dict(
+            type="integer",
+            default=3,
+            minimum=1,
+            description=(
+                "Number of targets from the local star catalog tried for each grid position, "
+                "nearest first, before falling back to the catalog service."
+            ),
+        )
         return schema
 
     async def configure(self, config):
@@ -162,8 +416,30 @@ class BuildPointingModel(BaseBuildPointingModel):
             )
             await self._latiss.start_task
 
+        # Build the shared ISR and measurement task in the service executor,
+        # before the base class retrieves the ISR.
+        await self.warm_up_measurement_service()
+
         await super().configure(config)
 
+        if self.config.target_catalog is not None:
+            self.target_index = TargetIndex(
+                catalog=astropy.table.Table.read(self.config.target_catalog),
+                mag_limit=self.config.magnitude_limit,
+                mag_range=self.config.magnitude_range,
+                radius=self.config.target_search_radius,
+                latitude=self.tcs.location.lat.deg,
+            )
+            self.target_index.precompute(
+                azimuths=np.concatenate([self.azimuth_grid, self.azimuth_candidates]),
+                elevations=np.concatenate(
+                    [self.elevation_grid, self.elevation_candidates]
+                ),
+            )
+            self.log.info(
+                f"Loaded {len(self.target_index)} targets from {self.config.target_catalog}."
+            )
+
     async def setup_instrument(self):
         """Setup latiss.
 
@@ -190,3 +466,62 @@ class BuildPointingModel(BaseBuildPointingModel):
             timeout=self._atcs.long_timeout,
         )
         await self._atcs.reset_offsets()
+
+
+def azel_to_hadec(azimuth, elevation, latitude):
+    """Convert azimuth/elevation to hour angle/declination.
+
+    Parameters
+    ----------
+    azimuth : `float` or `numpy.ndarray`
+        Azimuth, measured from north through east (in deg).
+    elevation : `float` or `numpy.ndarray`
+        Elevation (in deg).
+    latitude : `float`
+        Latitude of the observatory (in deg).
+
+    Returns
+    -------
+    hour_angle : `float` or `numpy.ndarray`
+        Hour angle (in deg).
+    declination : `float` or `numpy.ndarray`
+        Declination (in deg).
+    """
+    az = np.radians(azimuth)
+    el = np.radians(elevation)
+    lat = np.radians(latitude)
+
+    declination = np.arcsin(
+        np.sin(el) * np.sin(lat) + np.cos(el) * np.cos(lat) * np.cos(az)
+    )
+    hour_angle = np.arctan2(
+        -np.sin(az) * np.cos(el),
+        np.sin(el) * np.cos(lat) - np.cos(el) * np.cos(az) * np.sin(lat),
+    )
+
+    return np.degrees(hour_angle), np.degrees(declination)
+
+
+def angular_separation(ra1, dec1, ra2, dec2):
+    """Compute the angular separation between sky positions.
+
+    Parameters
+    ----------
+    ra1, dec1 : `float` or `numpy.ndarray`
+        Coordinates of the first position (in deg).
+    ra2, dec2 : `float` or `numpy.ndarray`
+        Coordinates of the second position (in deg).
+
+    Returns
+    -------
+    separation : `float` or `numpy.ndarray`
+        Angular separation (in deg).
+    """
+    ra1, dec1, ra2, dec2 = map(np.radians, (ra1, dec1, ra2, dec2))
+
+    # Haversine formula, well conditioned for small separations.
+    sin_half_dra = np.sin((ra2 - ra1) / 2.0)
+    sin_half_ddec = np.sin((dec2 - dec1) / 2.0)
+    hav = sin_half_ddec**2 + np.cos(dec1) * np.cos(dec2) * sin_half_dra**2
+
+    return np.degrees(2.0 * np.arcsin(np.sqrt(np.clip(hav, 0.0, 1.0))))
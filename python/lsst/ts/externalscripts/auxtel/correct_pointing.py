@@ -31,9 +31,6 @@ import yaml
 from lsst.geom import PointD
 
 try:
-    from lsst.pipe.tasks.quickFrameMeasurement import QuickFrameMeasurementTask
-    from lsst.summit.utils import BestEffortIsr
-    from lsst.ts.observing.utilities.auxtel.latiss.getters import get_image
     from lsst.ts.observing.utilities.auxtel.latiss.utils import (
         calculate_xy_offsets,
         parse_visit_id,
@@ -47,6 +44,8 @@ from lsst.ts.observatory.control.constants.latiss_constants import boresight
 from lsst.ts.observatory.control.utils.enums import RotType
 from lsst.ts.salobj import BaseScript
 
+from .latiss_measurement_service import get_measurement_service
+
 
 class CorrectPointing(BaseScript):
     """Measure and apply a zero point offset to the pointing.
@@ -63,6 +62,9 @@ class CorrectPointing(BaseScript):
         self.atcs = None
         self.latiss = None
 
+        # Shared BestEffortIsr and quick measurement task.
+        self.measurement_service = get_measurement_service()
+
         self.image_in_oods_timeout = 15.0
         self.get_image_timeout = 10.0
         self.tolerance = 1.0
@@ -75,6 +77,7 @@ class CorrectPointing(BaseScript):
         self.magnitude_range = 4.0
         self.filter = "empty_1"
         self.max_iters = 5
+        self.early_stop = False
 
     @classmethod
     def get_schema(cls) -> dict[str, typing.Any]:
@@ -130,6 +133,13 @@ class CorrectPointing(BaseScript):
                 description: Maximum number of iterations to attempt.
                 default: 5
                 minimum: 0
+            early_stop:
+                type: boolean
+                description: >-
+                    If true, stop iterating when the residual predicted from the
+                    convergence of the previous iterations is within the
+                    tolerance, instead of taking another image to verify it.
+                default: false
         """
         return yaml.safe_load(schema_yaml)
 
@@ -156,6 +166,7 @@ class CorrectPointing(BaseScript):
             )
             await self.latiss.start_task
 
+        await self.warm_up_measurement_service()
         self.best_effort_isr = self.get_best_effort_isr()
 
         self.azimuth = config.az
@@ -167,11 +178,17 @@ class CorrectPointing(BaseScript):
         self.reset_aos_offsets = config.reset_aos_offsets
         self.filter = config.filter
         self.max_iters = config.max_iters
+        self.early_stop = config.early_stop
+
+    async def warm_up_measurement_service(self):
+        # Isolate the construction of the ISR and measurement task, in the
+        # service executor, so it can be mocked in unit tests
+        await self.measurement_service.warm_up()
 
     def get_best_effort_isr(self):
         # Isolate the BestEffortIsr class so it can be mocked
         # in unit tests
-        return BestEffortIsr()
+        return self.measurement_service.best_effort_isr
 
     @property
     def camera_readout_time(self):
@@ -332,16 +349,30 @@ class CorrectPointing(BaseScript):
         self.latiss.rem.atoods.evt_imageInOODS.flush()
 
         offset = await self._center()
+        offsets = [offset]
 
         _success = self.max_iters == 0
 
         for iter_num in range(self.max_iters):
+            predicted_residual = self.predict_residual(offsets)
             if offset < self.tolerance:
                 self.log.info(
                     "Distance between target and center of detector is within tolerance."
                 )
                 _success = True
                 break
+            elif (
+                self.early_stop
+                and predicted_residual is not None
+                and predicted_residual < self.tolerance
+            ):
+                self.log.info(
+                    f"Predicted distance between target and center of detector "
+                    f"{predicted_residual:0.2f} arcsec is within tolerance. "
+                    "Stopping early."
+                )
+                _success = True
+                break
             else:
                 self.log.info(
                     f"Distance between target and center of detector {offset} "
@@ -350,12 +381,42 @@ class CorrectPointing(BaseScript):
                 )
 
                 offset = await self._center()
+                offsets.append(offset)
 
         if not _success:
             raise RuntimeError(f"Failed to correct pointing after {iter_num} attempts.")
 
         await self.atcs.add_point_data()
 
+    @staticmethod
+    def predict_residual(offsets: list[float]) -> float | None:
+        """Predict the distance between the target and the center of the
+        detector left after the last offset.
+
+        Assumes each iteration reduces the distance by the same factor, which
+        is estimated from the last two offsets.
+
+        Parameters
+        ----------
+        offsets : list[float]
+            Size of the offsets applied in each iteration (in arcsec).
+
+        Returns
+        -------
+        float or None
+            Predicted residual (in arcsec), or None if it cannot be estimated
+            or the iterations are not converging.
+        """
+        if len(offsets) < 2 or offsets[-2] == 0.0:
+            return None
+
+        convergence_factor = offsets[-1] / offsets[-2]
+
+        if convergence_factor >= 1.0:
+            return None
+
+        return offsets[-1] * convergence_factor
+
     async def _center(self) -> float:
         """Find offset between the brightest source and the bore sight and
         offset the telescope.
@@ -401,19 +462,12 @@ class CorrectPointing(BaseScript):
             Offset in image coordinates, x/y in arcsec.
         """
 
-        # TODO: (DM-37665) Move this method to a utility class in
-        # ts_observing_utilities.
-        exposure = await get_image(
-            parse_visit_id(image_id),
-            self.best_effort_isr,
-            timeout=self.get_image_timeout,
+        # The measurement runs in the persistent executor of the service,
+        # without blocking the event loop.
+        result = await self.measurement_service.measure(
+            parse_visit_id(image_id), timeout=self.get_image_timeout
         )
 
-        quick_measurement_config = QuickFrameMeasurementTask.ConfigClass()
-        quick_measurement = QuickFrameMeasurementTask(config=quick_measurement_config)
-
-        result = quick_measurement.run(exposure)
-
         dx_arcsec, dy_arcsec = calculate_xy_offsets(
             PointD(result.brightestObjCentroid[0], result.brightestObjCentroid[1]),
             boresight,
@@ -22,15 +22,15 @@
 __all__ = ["QuickFrameMeasurement"]
 
 import asyncio
-import concurrent.futures
+import math
+import time
 import warnings
 
+import numpy as np
 import yaml
+from astropy.table import Table
 
 try:
-    from lsst.pipe.tasks.quickFrameMeasurement import QuickFrameMeasurementTask
-    from lsst.summit.utils import BestEffortIsr
-    from lsst.ts.observing.utilities.auxtel.latiss.getters import get_image
     from lsst.ts.observing.utilities.auxtel.latiss.utils import parse_obs_id
 
 except ImportError:
@@ -39,6 +39,8 @@ except ImportError:
 from lsst.geom import PointD
 from lsst.ts import salobj
 
+from ..latiss_measurement_service import get_measurement_service
+
 STD_TIMEOUT = 10  # seconds
 
 
@@ -61,6 +63,13 @@ class QuickFrameMeasurement(salobj.BaseScript):
     This script is used to put the brightest target in a field on a specific
     pixel.
 
+    In batch mode, the brightest target is measured on a range of visits,
+    processed concurrently, and a summary table with the centroids, timings
+    and failures of each visit is produced. The measurement task of the
+    shared `LatissMeasurementService` is not thread safe and measures one
+    image at a time, so processing visits concurrently only overlaps the
+    retrieval and ISR of the images.
+
     """
 
     def __init__(self, index, silent=False):
@@ -69,9 +78,12 @@ class QuickFrameMeasurement(salobj.BaseScript):
             descr="Test QuickFrameMeasurementTask.",
         )
 
-        # instantiate the quick measurement class
-        qm_config = QuickFrameMeasurementTask.ConfigClass()
-        self.qm = QuickFrameMeasurementTask(config=qm_config)
+        # Shared BestEffortIsr and quick measurement task.
+        self.measurement_service = get_measurement_service()
+
+        # Data ids of the visits processed in batch mode.
+        self.data_ids = []
+        self.summary = None
 
     @classmethod
     def get_schema(cls):
@@ -85,8 +97,52 @@ class QuickFrameMeasurement(salobj.BaseScript):
               visit_id:
                 description: Visit id of the image to process. Format is AT_O_YYYYMMDD_NNNNNN.
                 type: string
-            required:
-              - visit_id
+              batch:
+                description: >-
+                  Optional configuration section. Measure many visits instead of a
+                  single one.
+                type: object
+                additionalProperties: false
+                properties:
+                  visit_ids:
+                    description: List of visit ids. Format is AT_O_YYYYMMDD_NNNNNN.
+                    type: array
+                    default: []
+                    items:
+                      type: string
+                  day_obs:
+                    description: Day obs of the range of visits to process.
+                    anyOf:
+                      - type: integer
+                      - type: "null"
+                    default: null
+                  seq_num_start:
+                    description: First sequence number of the range of visits.
+                    type: integer
+                    minimum: 0
+                    default: 0
+                  seq_num_end:
+                    description: Last sequence number (inclusive) of the range of visits.
+                    type: integer
+                    minimum: 0
+                    default: 0
+                  max_concurrent:
+                    description: >-
+                      Maximum number of visits processed concurrently. Only the
+                      image retrieval overlaps, the measurements run one at a time.
+                    type: integer
+                    minimum: 1
+                    default: 4
+                  summary_file:
+                    description: >-
+                      Optional path of an ECSV file to write the summary table to.
+                    anyOf:
+                      - type: string
+                      - type: "null"
+                    default: null
+            anyOf:
+              - required: [visit_id]
+              - required: [batch]
             additionalProperties: false
         """
 
@@ -103,30 +159,48 @@ class QuickFrameMeasurement(salobj.BaseScript):
 
         self.config = config
 
-        # Instantiate BestEffortIsr
+        self.data_ids = []
+        if hasattr(config, "batch"):
+            self.data_ids = [
+                parse_obs_id(visit_id) for visit_id in config.batch["visit_ids"]
+            ]
+            if config.batch["day_obs"] is not None:
+                self.data_ids += [
+                    dict(day_obs=config.batch["day_obs"], seq_num=seq_num)
+                    for seq_num in range(
+                        config.batch["seq_num_start"], config.batch["seq_num_end"] + 1
+                    )
+                ]
+
+            if len(self.data_ids) == 0:
+                raise salobj.ExpectedError("Batch mode requires at least one visit.")
+
+        # Instantiate BestEffortIsr and the measurement task
+        await self.warm_up_measurement_service()
         self.best_effort_isr = self.get_best_effort_isr()
 
+    async def warm_up_measurement_service(self):
+        # Isolate the construction of the ISR and measurement task, in the
+        # service executor, so it can be mocked in unit tests
+        await self.measurement_service.warm_up()
+
     def get_best_effort_isr(self):
         # Isolate the BestEffortIsr class so it can be mocked
         # in unit tests
-        return BestEffortIsr()
+        return self.measurement_service.best_effort_isr
 
     def set_metadata(self, metadata):
         metadata.duration = 60.0
+        if len(self.data_ids) > 0:
+            metadata.duration *= math.ceil(
+                len(self.data_ids) / self.config.batch["max_concurrent"]
+            )
 
     async def run_qm(self, visit_id):
         data_id = parse_obs_id(visit_id)
 
-        exp = await get_image(
-            data_id,
-            self.best_effort_isr,
-            timeout=STD_TIMEOUT,
-        )
-        loop = asyncio.get_event_loop()
-        executor = concurrent.futures.ThreadPoolExecutor()
-
         # Find brightest star
-        result = await loop.run_in_executor(executor, self.qm.run, exp)
+        result = await self.measurement_service.measure(data_id, timeout=STD_TIMEOUT)
 
         if not result.success:
             raise RuntimeError("Centroid finding algorithm was unsuccessful.")
@@ -137,6 +211,94 @@ class QuickFrameMeasurement(salobj.BaseScript):
 
         self.log.debug(f"Current brightest target position is {current_position}")
 
+    async def measure_visit(self, data_id, semaphore):
+        """Measure the brightest target in a visit, recording the time it
+        took and whether it succeeded.
+
+        Parameters
+        ----------
+        data_id : `dict`
+            Data id of the visit.
+        semaphore : `asyncio.Semaphore`
+            Semaphore limiting the number of visits processed concurrently.
+
+        Returns
+        -------
+        row : `dict`
+            Summary of the measurement.
+        """
+        row = dict(
+            day_obs=data_id["day_obs"],
+            seq_num=data_id["seq_num"],
+            success=False,
+            centroid_x=np.nan,
+            centroid_y=np.nan,
+            duration=np.nan,
+            error="",
+        )
+        async with semaphore:
+            start_time = time.monotonic()
+            try:
+                result = await self.measurement_service.measure(
+                    data_id, timeout=STD_TIMEOUT
+                )
+                row["success"] = bool(result.success)
+                if result.success:
+                    row["centroid_x"], row["centroid_y"] = result.brightestObjCentroid
+            except Exception as e:
+                row["error"] = repr(e)
+            row["duration"] = time.monotonic() - start_time
+
+        return row
+
+    async def run_batch(self):
+        """Measure the brightest target in all the visits and produce a
+        summary table.
+
+        Raises
+        ------
+        RuntimeError
+            If the measurement failed for any of the visits.
+        """
+        max_concurrent = self.config.batch["max_concurrent"]
+
+        self.log.info(
+            f"Running QuickFrameMeasurementTask on {len(self.data_ids)} visits, "
+            f"{max_concurrent} at a time."
+        )
+
+        semaphore = asyncio.Semaphore(max_concurrent)
+        start_time = time.monotonic()
+
+        rows = await asyncio.gather(
+            *[self.measure_visit(data_id, semaphore) for data_id in self.data_ids]
+        )
+
+        self.summary = Table(rows=rows)
+
+        failures = [row for row in rows if not row["success"]]
+
+        self.log.info(
+            f"QuickFrameMeasurementTask processed {len(rows)} visits in "
+            f"{time.monotonic() - start_time:0.1f}s, with {len(failures)} failures.\n"
+            + "\n".join(self.summary.pformat(max_lines=-1, max_width=-1))
+        )
+
+        if self.config.batch["summary_file"] is not None:
+            self.summary.write(
+                self.config.batch["summary_file"], format="ascii.ecsv", overwrite=True
+            )
+
+        if len(failures) > 0:
+            raise RuntimeError(
+                f"Centroid finding failed for {len(failures)} of {len(rows)} visits: "
+                + ", ".join(f"{row['day_obs']}/{row['seq_num']}" for row in failures)
+            )
+
     async def run(self):
+        if len(self.data_ids) > 0:
+            await self.run_batch()
+            return
+
         self.log.debug(f"Running QuickFrameMeasurementTask in {self.config.visit_id}")
         await self.run_qm(self.config.visit_id)
@@ -19,10 +19,11 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
-__all__ = ["LatissAcquire"]
+__all__ = ["LatissAcquire", "ImageInOODSRegistry"]
 
 import asyncio
-import concurrent.futures
+import collections
+import typing
 import warnings
 
 import numpy as np
@@ -34,10 +35,10 @@ from lsst.ts.observatory.control.constants import latiss_constants
 from lsst.ts.observatory.control.utils import RotType
 from lsst.ts.xml.enums.ATPtg import WrapStrategy
 
+from .latiss_fast_centroid import measure_cutout_centroid
+from .latiss_measurement_service import get_measurement_service
+
 try:
-    from lsst.pipe.tasks.quickFrameMeasurement import QuickFrameMeasurementTask
-    from lsst.summit.utils import BestEffortIsr
-    from lsst.ts.observing.utilities.auxtel.latiss.getters import get_image
     from lsst.ts.observing.utilities.auxtel.latiss.utils import (
         calculate_xy_offsets,
         parse_obs_id,
@@ -48,6 +49,100 @@ except ImportError:
 STD_TIMEOUT = 20  # seconds
 
 
+class ImageInOODSRegistry:
+    """Track the arrival of images in the OODS.
+
+    The registry installs a callback on the ``imageInOODS`` event, and keeps
+    a future for each image, resolved when its event arrives. Images can be
+    waited for before or after their event arrives, so no event is lost
+    between taking an image and waiting for it.
+
+    Parameters
+    ----------
+    topic : `salobj.topics.ReadTopic`
+        The ``imageInOODS`` event topic.
+    max_images : `int`, optional
+        Maximum number of images tracked. The oldest images are dropped
+        first.
+    """
+
+    def __init__(self, topic: typing.Any, max_images: int = 100) -> None:
+        self.topic = topic
+        self.max_images = max_images
+
+        self._futures: typing.OrderedDict[
+            typing.Tuple[int, int], asyncio.Future
+        ] = collections.OrderedDict()
+        self._previous_callback = None
+        self._started = False
+
+    def start(self) -> None:
+        """Start tracking the images arriving in the OODS."""
+        if self._started:
+            return
+
+        self._previous_callback = self.topic.callback
+        self.topic.callback = self._callback
+        self._started = True
+
+    def stop(self) -> None:
+        """Stop tracking images and restore the previous event callback."""
+        if not self._started:
+            return
+
+        self.topic.callback = self._previous_callback
+        self._previous_callback = None
+        self._started = False
+
+        for future in self._futures.values():
+            if not future.done():
+                future.cancel()
+        self._futures.clear()
+
+    def _get_future(self, day_obs: int, seq_num: int) -> asyncio.Future:
+        key = (int(day_obs), int(seq_num))
+        if key not in self._futures:
+            self._futures[key] = asyncio.get_running_loop().create_future()
+            while len(self._futures) > self.max_images:
+                _, future = self._futures.popitem(last=False)
+                if not future.done():
+                    future.cancel()
+        return self._futures[key]
+
+    def _callback(self, data: typing.Any) -> None:
+        data_id = parse_obs_id(data.obsid)
+        future = self._get_future(data_id["day_obs"], data_id["seq_num"])
+        if not future.done():
+            future.set_result(data_id)
+
+    async def wait(
+        self, image_id: int, timeout: float
+    ) -> typing.Dict[str, typing.Any]:
+        """Wait for an image to arrive in the OODS.
+
+        Parameters
+        ----------
+        image_id : `int`
+            Image id, as returned by the take image commands
+            (``day_obs * 100000 + seq_num``).
+        timeout : `float`
+            Timeout (in seconds).
+
+        Returns
+        -------
+        data_id : `dict`
+            Data id of the image.
+
+        Raises
+        ------
+        asyncio.TimeoutError
+            If the image does not arrive in time.
+        """
+        day_obs, seq_num = divmod(int(image_id), 100000)
+        future = self._get_future(day_obs, seq_num)
+        return await asyncio.wait_for(asyncio.shield(future), timeout=timeout)
+
+
 class LatissAcquire(salobj.BaseScript):
     """Perform an acquisition of a target on LATISS with the AuxTel.
 
@@ -78,6 +173,9 @@ class LatissAcquire(salobj.BaseScript):
 
         self.image_in_oods_timeout = 15.0
 
+        # Tracks the images arriving in the OODS during the acquisition.
+        self.image_in_oods_registry = None
+
     @classmethod
     def get_schema(cls):
         schema_yaml = """
@@ -223,6 +321,21 @@ class LatissAcquire(salobj.BaseScript):
                 type: boolean
                 default: False
 
+              fast_centroiding:
+                description: >-
+                    After the first iteration, measure the target on a cutout of the raw image
+                    around its predicted position, with a lightweight ISR, instead of
+                    processing the full image. Falls back to the full processing if the target
+                    is not found in the cutout.
+                type: boolean
+                default: False
+
+              fast_centroiding_cutout_size:
+                description: Size of the cutout used with fast_centroiding (pixels).
+                type: integer
+                minimum: 50
+                default: 400
+
             additionalProperties: false
             if:
               properties:
@@ -263,13 +376,11 @@ class LatissAcquire(salobj.BaseScript):
             )
             await self.latiss.start_task
 
-        # Instantiate BestEffortIsr -
+        # Shared BestEffortIsr and quick measurement task.
+        self.measurement_service = get_measurement_service()
+        await self.warm_up_measurement_service()
         self.best_effort_isr = self.get_best_effort_isr()
 
-        # instantiate the quick measurement class
-        qm_config = QuickFrameMeasurementTask.ConfigClass()
-        self.qm = QuickFrameMeasurementTask(config=qm_config)
-
         self.do_reacquire = config.do_reacquire
 
         if not self.do_reacquire:
@@ -310,6 +421,9 @@ class LatissAcquire(salobj.BaseScript):
 
         self.do_user_final_position = config.do_user_final_position
 
+        self.fast_centroiding = config.fast_centroiding
+        self.fast_centroiding_cutout_size = config.fast_centroiding_cutout_size
+
         self.user_final_x = config.user_final_x
         self.user_final_y = config.user_final_y
 
@@ -342,34 +456,45 @@ class LatissAcquire(salobj.BaseScript):
             + (self.acq_exposure_time + acq_iter_overhead_duration) * self.max_acq_iter
         )
 
+    async def warm_up_measurement_service(self):
+        # Isolate the construction of the ISR and measurement task, in the
+        # service executor, so it can be mocked in unit tests
+        await self.measurement_service.warm_up()
+
     # TODO: move to new class as part of DM-37665
     def get_best_effort_isr(self):
         # Isolate the BestEffortIsr class so it can be mocked
         # in unit tests
-        return BestEffortIsr()
+        return self.measurement_service.best_effort_isr
 
     # TODO: move to new class as part of DM-37665
-    async def get_next_image_data_id(self):
-        """Return dataID of image that appears from the ATOODS CSC.
+    async def wait_image_in_oods(self, image_id):
+        """Wait for an image to arrive in the OODS.
 
-        This is meant to be called at the same time as a take image command.
-        If this is called after take_image is completed, it may not receive
-        the imageInOODS event.
-        """
+        Parameters
+        ----------
+        image_id : `int`
+            Image id, as returned by `LATISS.take_acq`.
 
+        Returns
+        -------
+        data_id : `dict`
+            Data id of the image.
+        """
         self.log.debug(
-            f"Waiting for image to arrive in OODS for a maximum of {self.image_in_oods_timeout} seconds."
+            f"Waiting for image {image_id} to arrive in OODS for a maximum of "
+            f"{self.image_in_oods_timeout} seconds."
         )
-        in_oods = await self.latiss.rem.atoods.evt_imageInOODS.next(
-            timeout=self.image_in_oods_timeout, flush=True
+        data_id = await self.image_in_oods_registry.wait(
+            image_id, timeout=self.image_in_oods_timeout
         )
-
-        data_id = parse_obs_id(in_oods.obsid)
         self.log.debug(f"seq_num {data_id['seq_num']} arrived in OODS")
 
         return data_id
 
-    async def find_offset(self, data_id, target_position_x, target_position_y):
+    async def find_offset(
+        self, data_id, target_position_x, target_position_y, predicted_position=None
+    ):
         """Detects the brightest star in an image and returns the offsets
         (dx_arcsec and dy_arcsec) required to move the target to the target
         position.
@@ -382,6 +507,8 @@ class LatissAcquire(salobj.BaseScript):
             desired final X position in detector coordinates.
         target_position_y : `float`
             desired final X position in detector coordinates.
+        predicted_position : `lsst.geom.PointD`, optional
+            Predicted position of the target, used for fast centroiding.
 
         Returns
         -------
@@ -389,25 +516,14 @@ class LatissAcquire(salobj.BaseScript):
             offsets (arcsec) required to translate target from detected
             position to desired final position
         """
-        exp = await get_image(
-            data_id,
-            self.best_effort_isr,
-            timeout=self.acq_exposure_time + STD_TIMEOUT,
+        current_position = await self.measure_target_position(
+            data_id, predicted_position
         )
 
-        # Find brightest star in image.
-        loop = asyncio.get_event_loop()
-        executor = concurrent.futures.ThreadPoolExecutor()
-        result = await loop.run_in_executor(executor, self.qm.run, exp)
-
         # Verify a result was achieved, if not raise the exception.
-        if not result.success:
+        if current_position is None:
             raise RuntimeError("Centroid finding algorithm was unsuccessful.")
 
-        current_position = PointD(
-            result.brightestObjCentroid[0], result.brightestObjCentroid[1]
-        )
-
         target_position = PointD(target_position_x, target_position_y)
 
         # Find offsets to desired position
@@ -419,6 +535,83 @@ class LatissAcquire(salobj.BaseScript):
         dx_arcsec, dy_arcsec = calculate_xy_offsets(current_position, target_position)
         return dx_arcsec, dy_arcsec
 
+    async def measure_target_position(self, data_id, predicted_position=None):
+        """Measure the position of the brightest target in an image.
+
+        If fast centroiding is enabled and the predicted position of the
+        target is known, only a cutout of the raw image around it is
+        processed. Otherwise, or if the target is not found in the cutout,
+        the full image is processed.
+
+        Parameters
+        ----------
+        data_id : `dict`
+            data Id of the image.
+        predicted_position : `lsst.geom.PointD`, optional
+            Predicted position of the target in detector coordinates.
+
+        Returns
+        -------
+        position : `lsst.geom.PointD` or `None`
+            Position of the target, or `None` if the centroid finding
+            algorithm was unsuccessful.
+        """
+        loop = asyncio.get_running_loop()
+
+        if self.fast_centroiding and predicted_position is not None:
+            try:
+                position = await loop.run_in_executor(
+                    self.measurement_service.executor,
+                    self.measure_cutout_position,
+                    data_id,
+                    predicted_position,
+                )
+            except Exception:
+                self.log.exception("Failed to measure target position on cutout.")
+                position = None
+
+            if position is not None:
+                self.log.debug(f"Target found at {position} on cutout.")
+                return position
+
+            self.log.info(
+                f"Target not found around predicted position {predicted_position}. "
+                "Processing full image."
+            )
+
+        # Find brightest star in image.
+        result = await self.measurement_service.measure(
+            data_id, timeout=self.acq_exposure_time + STD_TIMEOUT
+        )
+
+        if not result.success:
+            return None
+
+        return PointD(result.brightestObjCentroid[0], result.brightestObjCentroid[1])
+
+    def measure_cutout_position(self, data_id, predicted_position):
+        """Measure the position of the target on a cutout of the raw image
+        around its predicted position.
+
+        Parameters
+        ----------
+        data_id : `dict`
+            data Id of the image.
+        predicted_position : `lsst.geom.PointD`
+            Predicted position of the target in detector coordinates.
+
+        Returns
+        -------
+        position : `lsst.geom.PointD` or `None`
+            Position of the target, or `None` if it is not found.
+        """
+        raw = self.best_effort_isr.butler.get(
+            "raw", dataId={"instrument": "LATISS", "detector": 0, **data_id}
+        )
+        return measure_cutout_centroid(
+            raw, predicted_position, self.fast_centroiding_cutout_size
+        )
+
     async def execute_acquisition(self, target_position_x, target_position_y):
         """Perform acquisition of target.
 
@@ -442,14 +635,31 @@ class LatissAcquire(salobj.BaseScript):
             "Beginning Acquisition Iterative Loop, with a maximum amount of "
             f"iterations set to {self.max_acq_iter}"
         )
+        # Track the images arriving in the OODS before taking any image, so
+        # no event is missed.
+        if self.image_in_oods_registry is None:
+            self.image_in_oods_registry = ImageInOODSRegistry(
+                self.latiss.rem.atoods.evt_imageInOODS
+            )
+        self.image_in_oods_registry.start()
+
+        try:
+            await self._execute_acquisition(target_position_x, target_position_y)
+        finally:
+            self.image_in_oods_registry.stop()
+
+    async def _execute_acquisition(self, target_position_x, target_position_y):
+        """Acquisition loop, see `execute_acquisition`."""
         _success = self.max_acq_iter == 0
+        # Position of the target in the next image, known once an offset
+        # is applied.
+        predicted_position = None
         for iter_num in range(self.max_acq_iter):
             self.log.debug(
                 f"\nStarting iteration number {iter_num + 1}, with a "
                 f"maximum of {self.max_acq_iter}"
             )
 
-            self.latiss.rem.atoods.evt_imageInOODS.flush()
             tmp = await self.latiss.take_acq(
                 exptime=self.acq_exposure_time,
                 n=1,
@@ -457,13 +667,16 @@ class LatissAcquire(salobj.BaseScript):
                 reason=self.reason,
                 program=self.program,
             )
-            data_id = await self.get_next_image_data_id()
             self.log.debug(
                 f"Take Object returned {tmp}. Now waiting for image to land in OODS"
             )
+            data_id = await self.wait_image_in_oods(tmp[0])
 
             dx_arcsec, dy_arcsec = await self.find_offset(
-                data_id, target_position_x, target_position_y
+                data_id,
+                target_position_x,
+                target_position_y,
+                predicted_position=predicted_position,
             )
 
             dr_arcsec = np.sqrt(dx_arcsec**2 + dy_arcsec**2)
@@ -493,6 +706,7 @@ class LatissAcquire(salobj.BaseScript):
                 await self.atcs.offset_xy(
                     x=dx_arcsec, y=dy_arcsec, relative=True, persistent=False
                 )
+                predicted_position = PointD(target_position_x, target_position_y)
 
             self.log.debug(
                 f"At end of iteration loop {iter_num+1}, success is {_success}."
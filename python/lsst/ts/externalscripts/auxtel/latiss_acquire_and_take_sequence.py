@@ -22,7 +22,6 @@ __all__ = ["LatissAcquireAndTakeSequence"]
 
 import asyncio
 import collections
-import concurrent.futures
 import warnings
 
 import numpy as np
@@ -35,10 +34,10 @@ from lsst.ts.observatory.control.utils import RotType
 from lsst.ts.standardscripts.utils import format_as_list
 from lsst.ts.xml.enums.ATPtg import WrapStrategy
 
+from .latiss_fast_centroid import measure_cutout_centroid
+from .latiss_measurement_service import get_measurement_service
+
 try:
-    from lsst.pipe.tasks.quickFrameMeasurement import QuickFrameMeasurementTask
-    from lsst.summit.utils import BestEffortIsr
-    from lsst.ts.observing.utilities.auxtel.latiss.getters import get_image
     from lsst.ts.observing.utilities.auxtel.latiss.utils import (
         calculate_xy_offsets,
         parse_obs_id,
@@ -47,6 +46,11 @@ except ImportError:
     warnings.warn("Cannot import required libraries. Script will not work.")
 
 STD_TIMEOUT = 20  # seconds
+# Estimated readout overhead for each exposure in the sequence (seconds).
+READOUT_OVERHEAD = 3.0
+# Estimated time to change the ATSpectrograph filter and/or grating and
+# let the ATAOS apply the corresponding offsets (seconds).
+RECONFIGURATION_OVERHEAD = 5.0
 
 
 class LatissAcquireAndTakeSequence(salobj.BaseScript):
@@ -82,12 +86,8 @@ class LatissAcquireAndTakeSequence(salobj.BaseScript):
 
         self.atcs = None
         self.latiss = None
-        # instantiate the quick measurement class
-        try:
-            qm_config = QuickFrameMeasurementTask.ConfigClass()
-            self.qm = QuickFrameMeasurementTask(config=qm_config)
-        except NameError:
-            self.log.warning("Library unavailable certain tests will be skipped")
+        # Shared BestEffortIsr and quick measurement task.
+        self.measurement_service = get_measurement_service()
         # Set timeout
         self.cmd_timeout = 30  # [s]
 
@@ -173,6 +173,21 @@ class LatissAcquireAndTakeSequence(salobj.BaseScript):
                 type: boolean
                 default: True
 
+              fast_centroiding:
+                description: >-
+                    After the first acquisition iteration, measure the target on a cutout of
+                    the raw image around its predicted position, with a lightweight ISR,
+                    instead of processing the full image. Falls back to the full processing
+                    if the target is not found in the cutout. Only used if do_acquire=True.
+                type: boolean
+                default: False
+
+              fast_centroiding_cutout_size:
+                description: Size of the cutout used with fast_centroiding (pixels).
+                type: integer
+                minimum: 50
+                default: 400
+
               filter_sequence:
                 description: Filters for exposure sequence. If a single value is specified then
                    the same filter is used for each exposure.
@@ -208,6 +223,22 @@ class LatissAcquireAndTakeSequence(salobj.BaseScript):
                     minimum: 0
                 default: 2.
 
+              reorder_sequence:
+                description: >-
+                  Group the exposures of the sequence that use the same filter and grating,
+                  keeping the order in which each configuration first appears, to minimize
+                  the number of instrument reconfigurations.
+                type: boolean
+                default: False
+
+              overlap_instrument_setup:
+                description: >-
+                  Change the filter and/or grating for the next exposure of the sequence
+                  while the current one is reading out, instead of waiting for the image
+                  to be completed.
+                type: boolean
+                default: True
+
               time_on_target:
                 description: Override the automatically calculated time_on_target value used
                     to optimize the telescope cable wrap positions.
@@ -306,7 +337,8 @@ class LatissAcquireAndTakeSequence(salobj.BaseScript):
             )
             await self.latiss.start_task
 
-        # Instantiate BestEffortIsr
+        # Instantiate BestEffortIsr and the measurement task
+        await self.warm_up_measurement_service()
         self.best_effort_isr = self.get_best_effort_isr()
 
         # Which processes to perform
@@ -339,6 +371,9 @@ class LatissAcquireAndTakeSequence(salobj.BaseScript):
         self.target_pointing_tolerance = config.target_pointing_tolerance
         self.target_pointing_verification = config.target_pointing_verification
 
+        self.fast_centroiding = config.fast_centroiding
+        self.fast_centroiding_cutout_size = config.fast_centroiding_cutout_size
+
         self.acq_visit_config = (
             self.acq_filter,
             self.acq_exposure_time,
@@ -361,6 +396,12 @@ class LatissAcquireAndTakeSequence(salobj.BaseScript):
             )
         ]
 
+        self.reorder_sequence = config.reorder_sequence
+        self.overlap_instrument_setup = config.overlap_instrument_setup
+
+        if self.reorder_sequence:
+            self.visit_configs = self.group_visit_configs(self.visit_configs)
+
         self.reason = config.reason
 
         if self.reason is None:
@@ -396,7 +437,10 @@ class LatissAcquireAndTakeSequence(salobj.BaseScript):
         can be optimized.
 
         Assume it takes 3 minutes to slew and 20 seconds to read the image,
-        compute the offset, and apply it.
+        compute the offset, and apply it. For the sequence, account for the
+        readout of each exposure and for the instrument reconfigurations,
+        which are partially hidden behind the readout when
+        ``overlap_instrument_setup`` is set.
 
         Returns
         -------
@@ -412,19 +456,67 @@ class LatissAcquireAndTakeSequence(salobj.BaseScript):
                 visit_exptime_total += exptime
 
             time_on_target += visit_exptime_total
-            # assume 5s for readout and instrument reconfiguration
-            # for each exposure
-            time_on_target += nexp * 5
+            time_on_target += nexp * READOUT_OVERHEAD
+
+            # The reconfiguration from the acquisition setup can not be
+            # overlapped with a readout.
+            instrument_setups = [
+                (filt, grating) for filt, exptime, grating in self.visit_configs
+            ]
+            if instrument_setups[0] != (self.acq_filter, self.acq_grating):
+                time_on_target += RECONFIGURATION_OVERHEAD
+            n_reconfigurations = sum(
+                [
+                    setup != next_setup
+                    for setup, next_setup in zip(
+                        instrument_setups[:-1], instrument_setups[1:]
+                    )
+                ]
+            )
+            reconfiguration_overhead = (
+                max(RECONFIGURATION_OVERHEAD - READOUT_OVERHEAD, 0.0)
+                if self.overlap_instrument_setup
+                else RECONFIGURATION_OVERHEAD
+            )
+            time_on_target += n_reconfigurations * reconfiguration_overhead
         self.log.debug(
             f"Assuming a time_on_target of {time_on_target/60:0.2f} minutes."
         )
 
         return time_on_target
 
+    @staticmethod
+    def group_visit_configs(visit_configs):
+        """Group the visits that use the same filter and grating.
+
+        Configurations are kept in the order in which they first appear in
+        the sequence, and so are the visits that share a configuration.
+
+        Parameters
+        ----------
+        visit_configs : `list` [`tuple`]
+            List of (filter, exposure time, grating) visits.
+
+        Returns
+        -------
+        `list` [`tuple`]
+            Reordered list of visits.
+        """
+        groups = dict()
+        for filt, exptime, grating in visit_configs:
+            groups.setdefault((filt, grating), []).append((filt, exptime, grating))
+
+        return [visit for group in groups.values() for visit in group]
+
+    async def warm_up_measurement_service(self):
+        # Isolate the construction of the ISR and measurement task, in the
+        # service executor, so it can be mocked in unit tests
+        await self.measurement_service.warm_up()
+
     def get_best_effort_isr(self):
         # Isolate the BestEffortIsr class so it can be mocked
         # in unit tests
-        return BestEffortIsr()
+        return self.measurement_service.best_effort_isr
 
     # This bit is required for ScriptQueue
     # Does the calculation below need acquisition times?
@@ -463,6 +555,83 @@ class LatissAcquireAndTakeSequence(salobj.BaseScript):
 
         return data_id
 
+    async def measure_target_position(self, data_id, predicted_position=None):
+        """Measure the position of the brightest target in an image.
+
+        If fast centroiding is enabled and the predicted position of the
+        target is known, only a cutout of the raw image around it is
+        processed. Otherwise, or if the target is not found in the cutout,
+        the full image is processed.
+
+        Parameters
+        ----------
+        data_id : `dict`
+            data Id of the image.
+        predicted_position : `lsst.geom.PointD`, optional
+            Predicted position of the target in detector coordinates.
+
+        Returns
+        -------
+        position : `lsst.geom.PointD` or `None`
+            Position of the target, or `None` if the centroid finding
+            algorithm was unsuccessful.
+        """
+        loop = asyncio.get_running_loop()
+
+        if self.fast_centroiding and predicted_position is not None:
+            try:
+                position = await loop.run_in_executor(
+                    self.measurement_service.executor,
+                    self.measure_cutout_position,
+                    data_id,
+                    predicted_position,
+                )
+            except Exception:
+                self.log.exception("Failed to measure target position on cutout.")
+                position = None
+
+            if position is not None:
+                self.log.debug(f"Target found at {position} on cutout.")
+                return position
+
+            self.log.info(
+                f"Target not found around predicted position {predicted_position}. "
+                "Processing full image."
+            )
+
+        # Find brightest star in image.
+        result = await self.measurement_service.measure(
+            data_id, timeout=self.acq_exposure_time + STD_TIMEOUT
+        )
+
+        if not result.success:
+            return None
+
+        return PointD(result.brightestObjCentroid[0], result.brightestObjCentroid[1])
+
+    def measure_cutout_position(self, data_id, predicted_position):
+        """Measure the position of the target on a cutout of the raw image
+        around its predicted position.
+
+        Parameters
+        ----------
+        data_id : `dict`
+            data Id of the image.
+        predicted_position : `lsst.geom.PointD`
+            Predicted position of the target in detector coordinates.
+
+        Returns
+        -------
+        position : `lsst.geom.PointD` or `None`
+            Position of the target, or `None` if it is not found.
+        """
+        raw = self.best_effort_isr.butler.get(
+            "raw", dataId={"instrument": "LATISS", "detector": 0, **data_id}
+        )
+        return measure_cutout_centroid(
+            raw, predicted_position, self.fast_centroiding_cutout_size
+        )
+
     async def latiss_acquire(self):
         if self.do_pointing_model:
             target_position = latiss_constants.boresight
@@ -542,6 +711,9 @@ class LatissAcquireAndTakeSequence(salobj.BaseScript):
         )
         iter_num = 0
         _success = False if self.max_acq_iter > 0 else True
+        # Position of the target in the next image, known once an offset
+        # is applied.
+        predicted_position = None
         for iter_num in range(self.max_acq_iter):
             # Take image
             self.log.debug(
@@ -564,19 +736,13 @@ class LatissAcquireAndTakeSequence(salobj.BaseScript):
             self.log.debug(f"Take Object returned {tmp}")
             self.log.debug("Now waiting for image to land in OODS")
 
-            exp = await get_image(
-                data_id,
-                self.best_effort_isr,
-                timeout=self.acq_exposure_time + STD_TIMEOUT,
-            )
-
             # Find brightest star
-            loop = asyncio.get_event_loop()
-            executor = concurrent.futures.ThreadPoolExecutor()
-            result = await loop.run_in_executor(executor, self.qm.run, exp)
+            current_position = await self.measure_target_position(
+                data_id, predicted_position
+            )
             # Verify a result was achieved, if not then remove focus
             # offset before raising the exception
-            if not result.success:
+            if current_position is None:
                 # Remove the focus offset if it was applied before
                 # raising an exception
                 if self.manual_focus_offset_applied:
@@ -590,10 +756,6 @@ class LatissAcquireAndTakeSequence(salobj.BaseScript):
                     self.manual_focus_offset_applied = False
                 raise RuntimeError("Centroid finding algorithm was unsuccessful.")
 
-            current_position = PointD(
-                result.brightestObjCentroid[0], result.brightestObjCentroid[1]
-            )
-
             # Find offsets to desired position
             self.log.debug(
                 f"Current brightest target position is {current_position} whereas the "
@@ -634,6 +796,7 @@ class LatissAcquireAndTakeSequence(salobj.BaseScript):
             await self.atcs.offset_xy(
                 dx_arcsec, dy_arcsec, relative=True, persistent=False
             )
+            predicted_position = target_position
             self.log.debug(
                 f"At end of iteration loop, success is {_success}. So moving to next iteration"
             )
@@ -694,6 +857,18 @@ class LatissAcquireAndTakeSequence(salobj.BaseScript):
         """Take the sequence of images as defined in visit_configs."""
 
         nexp = len(self.visit_configs)
+        # Filter and grating already set up for the next exposure, while
+        # the previous one was reading out.
+        instrument_setup = None
+
+        overlap_instrument_setup = self.overlap_instrument_setup and hasattr(
+            self.latiss.rem.atcamera, "evt_startReadout"
+        )
+        if self.overlap_instrument_setup and not overlap_instrument_setup:
+            self.log.warning(
+                "ATCamera startReadout event not available, "
+                "instrument setup will not overlap with readout."
+            )
 
         for i, (filt, exptime, grating) in enumerate(self.visit_configs):
             # Check if a manual focus offset is required
@@ -710,17 +885,49 @@ class LatissAcquireAndTakeSequence(salobj.BaseScript):
             # Focus and pointing offsets will be made automatically
             # by the TCS upon filter/grating changes
 
-            # Take an image
-            await self.latiss.take_object(
-                exptime=exptime,
-                n=1,
-                filter=filt,
-                grating=grating,
-                group_id=self.group_id,
-                reason=self.reason,
-                program=self.program,
+            next_setup = (
+                (self.visit_configs[i + 1][0], self.visit_configs[i + 1][2])
+                if i + 1 < nexp
+                else None
+            )
+            overlap_setup = (
+                overlap_instrument_setup
+                and next_setup is not None
+                and next_setup != (filt, grating)
             )
 
+            # Take an image, skipping the instrument setup if it was done
+            # while the previous image was reading out.
+            if overlap_setup:
+                self.latiss.rem.atcamera.evt_startReadout.flush()
+            take_object_task = asyncio.create_task(
+                self.latiss.take_object(
+                    exptime=exptime,
+                    n=1,
+                    filter=filt if instrument_setup != (filt, grating) else None,
+                    grating=grating if instrument_setup != (filt, grating) else None,
+                    group_id=self.group_id,
+                    reason=self.reason,
+                    program=self.program,
+                )
+            )
+            instrument_setup = (filt, grating)
+
+            if overlap_setup:
+                await self.wait_start_readout(take_object_task, timeout=exptime)
+                next_filter, next_grating = next_setup
+                self.log.debug(
+                    f"Setting up filter={next_filter}, grating={next_grating} "
+                    "during readout."
+                )
+                await asyncio.gather(
+                    take_object_task,
+                    self.latiss.setup_atspec(grating=next_grating, filter=next_filter),
+                )
+                instrument_setup = next_setup
+            else:
+                await take_object_task
+
             self.log.info(
                 f"Completed exposure {i + 1} of {nexp}. Exptime = {exptime:6.1f}s,"
                 f" filter={filt}, grating={grating})"
@@ -735,6 +942,37 @@ class LatissAcquireAndTakeSequence(salobj.BaseScript):
             await self.atcs.rem.ataos.cmd_offset.set_start(z=-self.manual_focus_offset)
             self.manual_focus_offset_applied = False
 
+    async def wait_start_readout(self, take_object_task, timeout):
+        """Wait for the readout of an image to start.
+
+        Parameters
+        ----------
+        take_object_task : `asyncio.Task`
+            Task taking the image. If it finishes before the readout event is
+            received, return immediately, so a failure is propagated.
+        timeout : `float`
+            Exposure time of the image (seconds). The event is waited for an
+            extra `STD_TIMEOUT` seconds; if it does not arrive, wait for the
+            image to complete.
+        """
+        start_readout_task = asyncio.create_task(
+            self.latiss.rem.atcamera.evt_startReadout.next(
+                flush=False, timeout=timeout + STD_TIMEOUT
+            )
+        )
+        try:
+            await asyncio.wait(
+                [take_object_task, start_readout_task],
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            if start_readout_task.done() and start_readout_task.exception() is None:
+                return
+            self.log.debug("No startReadout event, waiting for the image to complete.")
+            await take_object_task
+        finally:
+            if not start_readout_task.done():
+                start_readout_task.cancel()
+
     async def assert_feasibility(self) -> None:
         """Verify that the telescope and camera are in a feasible state to
         execute the script.
@@ -0,0 +1,427 @@
+# This file is part of ts_externalscripts
+#
+# Developed for the LSST Telescope and Site Systems.
+# This product includes software developed by the LSST Project
+# (https://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+__all__ = [
+    "LatissAlignReplay",
+    "LatissAlignReplayResults",
+    "ReplayATCS",
+    "ReplayExposureProvider",
+    "ReplayLATISS",
+]
+
+import dataclasses
+import itertools
+import os
+import types
+import typing
+import warnings
+
+import numpy as np
+from lsst.ts import salobj
+
+from ..utils import StageTimer
+from .latiss_base_align import LatissAlignResults, LatissBaseAlign
+
+try:
+    from lsst.afw.image import ExposureF
+except ImportError:
+    warnings.warn("Cannot import required libraries. Replay will not work.")
+
+# Day of observation used to build the visit ids of the replayed exposures.
+REPLAY_DAY_OBS = 20000101
+
+
+@dataclasses.dataclass
+class LatissAlignReplayResults:
+    """Results of replaying an alignment run.
+
+    Attributes
+    ----------
+    iterations : `int`
+        Number of intra/extra pairs processed.
+    exposures : `int`
+        Number of exposures "taken", including acquisition images.
+    hexapod_moves : `int`
+        Number of hexapod offsets applied.
+    hexapod_error : `tuple` [`float`, `float`, `float`]
+        Residual [x, y, z] hexapod misalignment (mm) of the synthetic
+        aberration model at the end of the run.
+    timings : `dict`
+        Summary of the wall time spent in each stage (see
+        `StageTimer.summary`).
+    """
+
+    iterations: int
+    exposures: int
+    hexapod_moves: int
+    hexapod_error: typing.Tuple[float, float, float]
+    timings: typing.Dict[str, typing.Dict[str, float]]
+
+
+class ReplayExposureProvider:
+    """Provide recorded exposures, stored as FITS files on local disk, to the
+    alignment scripts.
+
+    Parameters
+    ----------
+    stage_timer : `StageTimer`
+        Timer used to record the time spent loading the exposures and,
+        optionally, running ISR.
+    isr : `callable`, optional
+        Function receiving an exposure and returning the exposure after ISR.
+        If `None` (default), the recorded exposures must already be
+        processed.
+    """
+
+    def __init__(
+        self,
+        stage_timer: StageTimer,
+        isr: typing.Optional[typing.Callable[[typing.Any], typing.Any]] = None,
+    ) -> None:
+        self.stage_timer = stage_timer
+        self.isr = isr
+        self.paths: typing.Dict[int, str] = dict()
+
+    def add(self, path: typing.Union[str, os.PathLike]) -> int:
+        """Add a recorded exposure.
+
+        Parameters
+        ----------
+        path : `str` or `os.PathLike`
+            Path to the FITS file.
+
+        Returns
+        -------
+        visit_id : `int`
+            Visit id assigned to the exposure.
+        """
+        visit_id = REPLAY_DAY_OBS * 100000 + len(self.paths) + 1
+        self.paths[visit_id] = os.fspath(path)
+        return visit_id
+
+    def get_exposure(self, visit_id: int) -> typing.Any:
+        """Load a recorded exposure.
+
+        Parameters
+        ----------
+        visit_id : `int`
+            Visit id of the exposure.
+
+        Returns
+        -------
+        exposure : `lsst.afw.image.Exposure`
+            Exposure.
+        """
+        with self.stage_timer("image_load"):
+            exposure = ExposureF(self.paths[visit_id])
+
+        if self.isr is not None:
+            with self.stage_timer("isr"):
+                exposure = self.isr(exposure)
+
+        return exposure
+
+
+class _ReplayTopic:
+    """Replacement for a remote topic, returning the data built by a
+    function.
+    """
+
+    def __init__(self, get_data: typing.Callable[[], types.SimpleNamespace]) -> None:
+        self.get_data = get_data
+
+    async def aget(
+        self, timeout: typing.Optional[float] = None
+    ) -> types.SimpleNamespace:
+        return self.get_data()
+
+
+class ReplayATCS:
+    """Replacement for `ATCS` applying the hexapod offsets to a synthetic
+    aberration model.
+
+    The model is a hexapod misalignment, to which all offsets are added.
+    `LatissAlignReplay` feeds the misalignment back into the measured
+    offsets, so a converging alignment run leaves a residual misalignment
+    close to zero.
+
+    Parameters
+    ----------
+    hexapod_error : `tuple` [`float`, `float`, `float`], optional
+        Initial [x, y, z] hexapod misalignment (mm).
+    bore_sight_angle : `float`, optional
+        Bore sight angle (deg) reported for all exposures.
+    """
+
+    def __init__(
+        self,
+        hexapod_error: typing.Tuple[float, float, float] = (0.0, 0.0, 0.0),
+        bore_sight_angle: float = 0.0,
+    ) -> None:
+        self.hexapod_error = np.array(hexapod_error, dtype=float)
+        self.bore_sight_angle = bore_sight_angle
+        self.hexapod_moves = 0
+
+        self.rem = types.SimpleNamespace(
+            atptg=types.SimpleNamespace(
+                evt_currentTarget=_ReplayTopic(
+                    lambda: types.SimpleNamespace(targetName="replay")
+                )
+            ),
+            athexapod=types.SimpleNamespace(
+                tel_positionStatus=_ReplayTopic(
+                    lambda: types.SimpleNamespace(
+                        reportedPosition=list(self.hexapod_error) + [0.0, 0.0, 0.0]
+                    )
+                )
+            ),
+        )
+
+    async def offset_aos_lut(
+        self,
+        z: float = 0.0,
+        x: float = 0.0,
+        y: float = 0.0,
+        u: float = 0.0,
+        v: float = 0.0,
+        m1: float = 0.0,
+    ) -> None:
+        self.hexapod_error += [x, y, z]
+        self.hexapod_moves += 1
+
+    def get_misalignment(self, focus_offset: float = 0.0) -> np.ndarray:
+        """Get the misalignment of the hexapod relative to the in-focus
+        position.
+
+        Parameters
+        ----------
+        focus_offset : `float`, optional
+            Hexapod z offset (mm) applied on purpose to defocus the
+            telescope, which is not part of the misalignment.
+
+        Returns
+        -------
+        misalignment : `numpy.ndarray`
+            [x, y, z] hexapod misalignment (mm).
+        """
+        return self.hexapod_error - [0.0, 0.0, focus_offset]
+
+    async def get_bore_sight_angle(self) -> float:
+        return self.bore_sight_angle
+
+    async def add_point_data(self) -> None:
+        pass
+
+    async def assert_all_enabled(self) -> None:
+        pass
+
+    async def assert_ataos_corrections_enabled(self) -> None:
+        pass
+
+
+class ReplayLATISS:
+    """Replacement for `LATISS` returning the visit ids of recorded
+    exposures.
+
+    Parameters
+    ----------
+    visit_id_pairs : `list` [`tuple` [`int`, `int`]]
+        Visit ids of the intra/extra pairs. The pairs are used in order and
+        cycled through if the alignment needs more pairs than recorded.
+    """
+
+    read_out_time = 2.0
+    shutter_time = 1.0
+
+    def __init__(self, visit_id_pairs: typing.List[typing.Tuple[int, int]]) -> None:
+        self._visit_ids = itertools.cycle(
+            itertools.chain.from_iterable(visit_id_pairs)
+        )
+        self.exposures = 0
+
+    async def take_cwfs(self, **kwargs: typing.Any) -> typing.List[int]:
+        self.exposures += 1
+        return [next(self._visit_ids)]
+
+    async def take_acq(self, *args: typing.Any, **kwargs: typing.Any) -> None:
+        self.exposures += 1
+
+    async def assert_all_enabled(self) -> None:
+        pass
+
+
+class LatissAlignReplay:
+    """Replay an alignment run of `LatissCWFSAlign` or `LatissWEPAlign` with
+    recorded intra/extra focal exposures.
+
+    The script runs its full alignment loop with `ReplayATCS` and
+    `ReplayLATISS` instead of the telescope and camera, and its exposures are
+    loaded from local FITS files. The wall time spent in each stage of the
+    processing (image load, ISR, detection, cutouts and Zernike estimation)
+    is recorded, which allows profiling the alignment without telescope time.
+
+    The hexapod offsets measured from the recorded exposures are perturbed by
+    the current misalignment of the synthetic aberration model of
+    `ReplayATCS` (see `perturb_results`), so the measured wavefront follows
+    the corrections applied by the script. The recorded exposures define the
+    wavefront measured with no misalignment.
+
+    Parameters
+    ----------
+    script : `LatissBaseAlign`
+        Alignment script, created with ``remotes=False``.
+    exposure_pairs : `list` [`tuple` [`str`, `str`]]
+        Paths to the intra/extra focal exposure pairs.
+    hexapod_error : `tuple` [`float`, `float`, `float`], optional
+        Initial [x, y, z] hexapod misalignment (mm) of the synthetic
+        aberration model.
+    bore_sight_angle : `float`, optional
+        Bore sight angle (deg) reported for all exposures.
+    isr : `callable`, optional
+        Function applying ISR to the loaded exposures. See
+        `ReplayExposureProvider`.
+
+    Examples
+    --------
+    >>> script = LatissWEPAlign(index=1, remotes=False)
+    >>> replay = LatissAlignReplay(script, [("intra.fits", "extra.fits")])
+    >>> results = await replay.run(dict(max_iter=3))
+    """
+
+    def __init__(
+        self,
+        script: LatissBaseAlign,
+        exposure_pairs: typing.List[typing.Tuple[str, str]],
+        hexapod_error: typing.Tuple[float, float, float] = (0.0, 0.0, 0.0),
+        bore_sight_angle: float = 0.0,
+        isr: typing.Optional[typing.Callable[[typing.Any], typing.Any]] = None,
+    ) -> None:
+        if len(exposure_pairs) == 0:
+            raise RuntimeError("At least one intra/extra exposure pair is required.")
+
+        self.script = script
+        self.log = script.log.getChild("replay")
+
+        self.exposure_provider = ReplayExposureProvider(
+            stage_timer=script.stage_timer, isr=isr
+        )
+        visit_id_pairs = [
+            (self.exposure_provider.add(intra), self.exposure_provider.add(extra))
+            for intra, extra in exposure_pairs
+        ]
+
+        self.atcs = ReplayATCS(
+            hexapod_error=hexapod_error, bore_sight_angle=bore_sight_angle
+        )
+        self.latiss = ReplayLATISS(visit_id_pairs)
+
+        self._calculate_results = script.calculate_results
+
+    def perturb_results(self) -> LatissAlignResults:
+        """Calculate the results of the script and add the misalignment of
+        the synthetic aberration model to the measured offsets.
+
+        The misalignment is converted to the offset the script would measure
+        with its current gain. It replaces `LatissBaseAlign.calculate_results`
+        during the replay.
+
+        Returns
+        -------
+        results : `LatissAlignResults`
+            Perturbed results of the wavefront sensing.
+        """
+        results = self._calculate_results()
+
+        # The hexapod may be left in the extra-focal position while the
+        # wavefront is measured (see `LatissBaseAlign.take_intra_extra`).
+        focus_offset = (
+            -(self.script.dz + self.script.extra_focal_offset)
+            if self.script.at_extra_focal_position
+            else 0.0
+        )
+        misalignment = self.atcs.get_misalignment(focus_offset)
+
+        hexapod_offset = np.array(results.offset_hex) - misalignment * self.script.gain
+        tel_offset = np.matmul(hexapod_offset, self.script.hexapod_offset_scale)
+
+        self.log.debug(
+            f"Model misalignment [mm]: {misalignment}. "
+            f"Perturbed hexapod offsets [mm]: {hexapod_offset}."
+        )
+
+        return dataclasses.replace(
+            results, offset_hex=hexapod_offset, offset_tel=tel_offset
+        )
+
+    async def run(
+        self, config: typing.Optional[typing.Dict[str, typing.Any]] = None
+    ) -> LatissAlignReplayResults:
+        """Configure the script and replay the alignment run.
+
+        Parameters
+        ----------
+        config : `dict`, optional
+            Script configuration. Target options are ignored, the telescope
+            is not slewed.
+
+        Returns
+        -------
+        results : `LatissAlignReplayResults`
+            Results of the replay.
+        """
+        self.script.atcs = self.atcs
+        self.script.latiss = self.latiss
+        self.script.exposure_provider = self.exposure_provider
+        self.script.calculate_results = self.perturb_results
+
+        config = dict() if config is None else dict(config)
+        for target_option in ("find_target", "track_target"):
+            config.pop(target_option, None)
+
+        validator = salobj.DefaultingValidator(schema=self.script.get_schema())
+        await self.script.configure(
+            types.SimpleNamespace(**validator.validate(config))
+        )
+
+        if not self.script.group_id:
+            self.script.group_id = "replay"
+
+        self.script.stage_timer.reset()
+
+        with self.script.stage_timer("total"):
+            await self.script.arun()
+
+        results = LatissAlignReplayResults(
+            iterations=self.script.iterations_executed + 1,
+            exposures=self.latiss.exposures,
+            hexapod_moves=self.atcs.hexapod_moves,
+            hexapod_error=tuple(self.atcs.hexapod_error),
+            timings=self.script.stage_timer.summary(),
+        )
+
+        self.log.info(
+            f"Replayed {results.iterations} iterations with {results.exposures} "
+            f"exposures and {results.hexapod_moves} hexapod moves. "
+            f"Residual hexapod error: {results.hexapod_error}.\n"
+            f"{self.script.stage_timer.format()}"
+        )
+
+        return results
@@ -37,6 +37,8 @@ from lsst.ts.observatory.control.utils import RotType
 from lsst.ts.xml.enums.ATPtg import WrapStrategy
 from lsst.ts.xml.enums.Script import ScriptState
 
+from ..utils import StageTimer
+
 STD_TIMEOUT = 10
 
 
@@ -48,6 +50,128 @@ class LatissAlignResults:
     offset_tel: typing.Tuple[float, float, float]
 
 
+class AlignGainController:
+    """Adapt the gains applied to the wavefront corrections from the history
+    of measured residuals.
+
+    After each correction, the fraction of it that was realized is estimated
+    from the change in the measured residual, for each axis. The gain of the
+    next correction is the nominal gain divided by this response (a damped
+    Newton step), so an under-responding axis receives a larger correction
+    and an over-responding one a smaller correction.
+
+    Parameters
+    ----------
+    gain : `numpy.ndarray`
+        Nominal gains for the [x, y, z] hexapod corrections.
+    tolerance : `numpy.ndarray`
+        Smallest [x, y, z] correction (mm) used to estimate the response.
+        Smaller corrections are dominated by the measurement noise.
+    min_gain : `float`, optional
+        Minimum gain.
+    max_gain : `float`, optional
+        Maximum gain.
+    """
+
+    def __init__(
+        self,
+        gain: np.ndarray,
+        tolerance: np.ndarray,
+        min_gain: float = 0.2,
+        max_gain: float = 1.0,
+    ) -> None:
+        self.nominal_gain = np.array(gain, dtype=float)
+        self.tolerance = np.array(tolerance, dtype=float)
+        self.min_gain = min_gain
+        self.max_gain = max_gain
+
+        self.gain = self.nominal_gain.copy()
+        self.residuals: typing.List[np.ndarray] = []
+        self.corrections: typing.List[np.ndarray] = []
+
+    def reset(self) -> np.ndarray:
+        """Reset the residual history.
+
+        Returns
+        -------
+        gain : `numpy.ndarray`
+            Nominal gains.
+        """
+        self.gain = self.nominal_gain.copy()
+        self.residuals = []
+        self.corrections = []
+        return self.gain
+
+    def update(self, residual: np.ndarray) -> np.ndarray:
+        """Register a new residual and compute the gains to correct it.
+
+        Parameters
+        ----------
+        residual : `numpy.ndarray`
+            Measured [x, y, z] hexapod offset (mm) needed to correct the
+            wavefront, before applying any gain.
+
+        Returns
+        -------
+        gain : `numpy.ndarray`
+            Gains to apply to the correction.
+        """
+        residual = np.array(residual, dtype=float)
+
+        if len(self.corrections) > 0 and len(self.residuals) > 0:
+            correction = self.corrections[-1]
+            significant = np.abs(correction) > self.tolerance
+            response = np.ones_like(residual)
+            response[significant] = (
+                self.residuals[-1][significant] - residual[significant]
+            ) / correction[significant]
+            gain = np.where(
+                response > 0.0,
+                self.nominal_gain / np.where(response > 0.0, response, 1.0),
+                self.min_gain,
+            )
+            self.gain = np.where(
+                significant,
+                np.clip(gain, self.min_gain, self.max_gain),
+                self.gain,
+            )
+
+        self.residuals.append(residual)
+
+        return self.gain
+
+    def add_correction(self, correction: np.ndarray) -> None:
+        """Register the [x, y, z] hexapod correction (mm) applied after the
+        last residual.
+
+        Parameters
+        ----------
+        correction : `numpy.ndarray`
+            Applied correction.
+        """
+        self.corrections.append(np.array(correction, dtype=float))
+
+    def is_diverging(self, n_iter: int = 2) -> bool:
+        """Check if the residual has grown in the last iterations.
+
+        Parameters
+        ----------
+        n_iter : `int`, optional
+            Number of consecutive iterations with growing residual.
+
+        Returns
+        -------
+        `bool`
+            `True` if the norm of the residual grew in each of the last
+            ``n_iter`` iterations.
+        """
+        if len(self.residuals) < n_iter + 1:
+            return False
+
+        norms = [np.linalg.norm(residual) for residual in self.residuals]
+        return all(norms[-i] > norms[-i - 1] for i in range(1, n_iter + 1))
+
+
 class LatissBaseAlign(salobj.BaseScript, metaclass=abc.ABCMeta):
     """Implements generic behavior for scripts that execute curvature wavefront
     sensing, abstracting the part that performs the measurements.
@@ -182,6 +306,26 @@ class LatissBaseAlign(salobj.BaseScript, metaclass=abc.ABCMeta):
         # Flag to monitor if iterations have started for cleanup task.
         self.iterations_started = False
 
+        # Adapt the gains from the history of residuals?
+        self.adaptive_gain = False
+        self.gain_controller = None
+
+        # Leave the hexapod in the extra-focal position after taking the
+        # intra/extra pair, and combine the return with the correction?
+        self.skip_return_to_focus = False
+
+        # Hexapod position with respect to the in-focus position.
+        self.at_intra_focal_position = False
+        self.at_extra_focal_position = False
+
+        # Wall time spent in each stage of the data processing.
+        self.stage_timer = StageTimer()
+
+        # Optional source of exposures, replacing the retrieval of the images
+        # from the butler. Must implement a blocking
+        # ``get_exposure(visit_id)`` method (see `LatissAlignReplay`).
+        self.exposure_provider = None
+
     # define the method that sets the hexapod offset to create intra/extra
     # focal images
     @property
@@ -219,7 +363,24 @@ class LatissBaseAlign(salobj.BaseScript, metaclass=abc.ABCMeta):
         """
         pass
 
-    async def take_intra_extra(self) -> None:
+    def start_image_prefetch(self, visit_id: int, intra: bool) -> None:
+        """Start retrieving and processing an image in the background.
+
+        Called by `take_intra_extra` as soon as each exposure ends, so the
+        image is processed while the hexapod moves. By default do nothing.
+        When subclassing, schedule the retrieval of the image without
+        blocking, so `run_align` can use it later.
+
+        Parameters
+        ----------
+        visit_id : `int`
+            Visit id of the image.
+        intra : `bool`
+            Is this the intra-focal image?
+        """
+        pass
+
+    async def take_intra_extra(self, return_to_focus: bool = True) -> None:
         """Take pair of Intra/Extra focal images to be used to determine the
         measured wavefront error.
 
@@ -227,14 +388,27 @@ class LatissBaseAlign(salobj.BaseScript, metaclass=abc.ABCMeta):
         hexapod receives a positive offset and is pushed towards the primary
         mirror. The extra-focal image occurs when the hexapod is pulled back
         (negative offset) from the best-focus position.
+
+        Parameters
+        ----------
+        return_to_focus : `bool`, optional
+            Move the hexapod back to the in-focus position after taking the
+            extra-focal image (default=True)? If `False` the hexapod is left
+            in the extra-focal position, and the next offset is expected to
+            account for it (see `apply_correction`).
         """
 
-        self.log.debug("Moving to intra-focal position")
+        if self.at_intra_focal_position:
+            self.log.debug("Hexapod already in intra-focal position.")
+        else:
+            self.log.debug("Moving to intra-focal position")
+
+            # Updated total focus offset value for intra-focal position
+            self.offset_total_focus += self.dz
 
-        # Updated total focus offset value for intra-focal position
-        self.offset_total_focus += self.dz
+            await self.atcs.offset_aos_lut(z=self.dz)
 
-        await self.atcs.offset_aos_lut(z=self.dz)
+        self.at_intra_focal_position = False
 
         self.log.debug("Taking intra-focal image")
 
@@ -250,6 +424,8 @@ class LatissBaseAlign(salobj.BaseScript, metaclass=abc.ABCMeta):
             program=self.program,
         )
 
+        self.start_image_prefetch(int(intra_image[0]), intra=True)
+
         self.log.debug("Moving to extra-focal position")
 
         # Hexapod offsets are relative, so need to move 2x the offset
@@ -274,6 +450,8 @@ class LatissBaseAlign(salobj.BaseScript, metaclass=abc.ABCMeta):
             program=self.program,
         )
 
+        self.start_image_prefetch(int(extra_image[0]), intra=False)
+
         self.intra_visit_id = int(intra_image[0])
         self.extra_visit_id = int(extra_image[0])
 
@@ -285,6 +463,11 @@ class LatissBaseAlign(salobj.BaseScript, metaclass=abc.ABCMeta):
 
         self.log.info(f"Angle used in cwfs algorithm is {self.angle:0.2f}")
 
+        if not return_to_focus:
+            self.log.debug("Leaving hexapod in extra-focal position.")
+            self.at_extra_focal_position = True
+            return
+
         self.log.debug("Moving hexapod back to zero offset (in-focus) position")
         # This is performed such that the telescope is left in the
         # same position it was before running the script
@@ -292,6 +475,71 @@ class LatissBaseAlign(salobj.BaseScript, metaclass=abc.ABCMeta):
 
         await self.atcs.offset_aos_lut(z=z_offset)
 
+    async def apply_correction(
+        self, x: float = 0.0, y: float = 0.0, z: float = 0.0, next_intra: bool = False
+    ) -> None:
+        """Apply a hexapod correction, relative to the in-focus position.
+
+        If the hexapod was left in the extra-focal position, the move back to
+        the in-focus position is combined with the correction.
+
+        Parameters
+        ----------
+        x : `float`, optional
+            Hexapod x offset (mm).
+        y : `float`, optional
+            Hexapod y offset (mm).
+        z : `float`, optional
+            Hexapod z offset (mm).
+        next_intra : `bool`, optional
+            Also move to the intra-focal position of the next intra/extra pair
+            (default=False)? Only used if the hexapod is in the extra-focal
+            position.
+        """
+        if self.at_extra_focal_position:
+            z += self.dz + self.extra_focal_offset
+            self.at_extra_focal_position = False
+
+            if next_intra:
+                self.log.debug(
+                    "Combining correction with move to next intra-focal position."
+                )
+                z += self.dz
+                self.offset_total_focus += self.dz
+                self.at_intra_focal_position = True
+
+        await self.atcs.offset_aos_lut(z=z, x=x, y=y)
+
+    def _adapt_gain(self, results: LatissAlignResults) -> LatissAlignResults:
+        """Replace the gains applied to the results by the ones computed by
+        the gain controller.
+
+        Parameters
+        ----------
+        results : `LatissAlignResults`
+            Results of the wavefront sensing, computed with the current gains.
+
+        Returns
+        -------
+        results : `LatissAlignResults`
+            Results with the adapted gains.
+        """
+        residual = np.array(results.offset_hex) / self.gain
+
+        self.gain = self.gain_controller.update(residual)
+
+        hexapod_offset = residual * self.gain
+        tel_offset = np.matmul(hexapod_offset, self.hexapod_offset_scale)
+
+        hexapod_str = (len(hexapod_offset) * "{:0.3f}, ").format(*hexapod_offset)
+        self.log.info(
+            f"Adapted gain: {self.gain}. Hexapod [x, y, z] offsets [mm] : [{hexapod_str}]"
+        )
+
+        return dataclasses.replace(
+            results, offset_hex=hexapod_offset, offset_tel=tel_offset
+        )
+
     def calculate_results(self) -> LatissAlignResults:
         """Calculates hexapod and telescope offsets based on derotated
         zernikes.
@@ -490,6 +738,19 @@ class LatissBaseAlign(salobj.BaseScript, metaclass=abc.ABCMeta):
                   description: Maximum number of iterations.
                   type: integer
                   default: 5
+              adaptive_gain:
+                description: >-
+                    Adapt the gains of the corrections from the measured response of the
+                    previous iterations? The loop also stops if the residuals keep growing.
+                type: boolean
+                default: false
+              skip_return_to_focus:
+                description: >-
+                    Leave the hexapod in the extra-focal position after each intra/extra
+                    pair and combine the move back to focus with the correction and with
+                    the move to the next intra-focal position, saving hexapod moves.
+                type: boolean
+                default: false
               reason:
                 description: Optional reason for taking the data.
                 anyOf:
@@ -583,6 +844,19 @@ class LatissBaseAlign(salobj.BaseScript, metaclass=abc.ABCMeta):
 
         self.max_iter = config.max_iter
 
+        self.adaptive_gain = config.adaptive_gain
+
+        self.gain_controller = (
+            AlignGainController(
+                gain=self.gain,
+                tolerance=[self.coma_threshold, self.coma_threshold, self.threshold],
+            )
+            if self.adaptive_gain
+            else None
+        )
+
+        self.skip_return_to_focus = config.skip_return_to_focus
+
         self.reason = config.reason
 
         self.program = config.program
@@ -768,6 +1042,12 @@ class LatissBaseAlign(salobj.BaseScript, metaclass=abc.ABCMeta):
         self.offset_total_coma_x = 0.0
         self.offset_total_coma_y = 0.0
 
+        self.at_intra_focal_position = False
+        self.at_extra_focal_position = False
+
+        if self.gain_controller is not None:
+            self.gain = self.gain_controller.reset()
+
         # Flagging that iterations have started
         self.iterations_started = True
         for self.iterations_executed in range(self.max_iter):
@@ -779,8 +1059,23 @@ class LatissBaseAlign(salobj.BaseScript, metaclass=abc.ABCMeta):
             # Setting visit_id's to none so run_cwfs will take a new dataset.
             self.intra_visit_id = None
             self.extra_visit_id = None
-            await self.take_intra_extra()
+            await self.take_intra_extra(return_to_focus=not self.skip_return_to_focus)
             results = await self.run_align()
+            if self.gain_controller is not None:
+                results = self._adapt_gain(results)
+                if self.gain_controller.is_diverging():
+                    if self.at_extra_focal_position:
+                        await self.apply_correction()
+                    self.log.warning(
+                        "Residuals growing in consecutive iterations, stopping. "
+                        f"Total focus correction: {self.offset_total_focus:0.3f} mm. "
+                        f"Total coma-x correction: {self.offset_total_coma_x:0.3f} mm. "
+                        f"Total coma-y correction: {self.offset_total_coma_y:0.3f} mm."
+                    )
+                    return
+            # Only move straight to the next intra-focal position if there
+            # is a next iteration.
+            next_intra = self.iterations_executed + 1 < self.max_iter
             coma_x = results.offset_hex[0]
             coma_y = results.offset_hex[1]
             focus_offset = results.offset_hex[2]
@@ -804,7 +1099,7 @@ class LatissBaseAlign(salobj.BaseScript, metaclass=abc.ABCMeta):
                 # Add coma offsets from previous run
                 self.offset_total_coma_x += coma_x
                 self.offset_total_coma_y += coma_y
-                await self.atcs.offset_aos_lut(z=focus_offset, x=coma_x, y=coma_y)
+                await self.apply_correction(z=focus_offset, x=coma_x, y=coma_y)
                 current_target = await self.atcs.rem.atptg.evt_currentTarget.aget(
                     timeout=self.timeout_short
                 )
@@ -839,7 +1134,9 @@ class LatissBaseAlign(salobj.BaseScript, metaclass=abc.ABCMeta):
                     await self.checkpoint(
                         f"[{self.iterations_executed + 1}/{self.max_iter}]: CWFS focus error too large."
                     )
-                await self.atcs.offset_aos_lut(z=self.large_defocus)
+                await self.apply_correction(z=self.large_defocus, next_intra=next_intra)
+                if self.gain_controller is not None:
+                    self.gain_controller.add_correction([0.0, 0.0, self.large_defocus])
             else:
                 self.offset_total_focus += focus_offset
                 self.log.info(
@@ -852,7 +1149,11 @@ class LatissBaseAlign(salobj.BaseScript, metaclass=abc.ABCMeta):
                     )
                 self.offset_total_coma_x += coma_x
                 self.offset_total_coma_y += coma_y
-                await self.atcs.offset_aos_lut(z=focus_offset, x=coma_x, y=coma_y)
+                await self.apply_correction(
+                    z=focus_offset, x=coma_x, y=coma_y, next_intra=next_intra
+                )
+                if self.gain_controller is not None:
+                    self.gain_controller.add_correction([coma_x, coma_y, focus_offset])
 
         # If we reach this point, it means we did not converge.
         # We are not returing it to original position in this case.
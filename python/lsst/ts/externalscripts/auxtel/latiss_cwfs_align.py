@@ -21,9 +21,12 @@
 __all__ = ["LatissCWFSAlign"]
 
 import asyncio
+import collections
 import concurrent.futures
 import functools
 import os
+import shutil
+import tempfile
 import typing
 import warnings
 from pathlib import Path
@@ -50,10 +53,21 @@ try:
 except ImportError:
     warnings.warn("Could not import cwfs code.")
 
-import copy  # used to support binning
-
 STD_TIMEOUT = 10  # seconds to perform ISR
 
+# Maximum number of cwfs Instrument/Algorithm pairs kept in memory.
+CWFS_CACHE_SIZE = 8
+
+CWFS_CONFIG_INDEX = "auxtel_latiss"
+
+CWFS_CONFIG_TEMPLATE = """#Auxiliary Telescope parameters:
+Obscuration 				0.423
+Focal_length (m)			21.6
+Aperture_diameter (m)   		1.2
+Offset (m)				{}
+Pixel_size (m)			{}
+"""
+
 
 class LatissCWFSAlign(LatissBaseAlign):
     """Perform an optical alignment procedure of Auxiliary Telescope with
@@ -85,13 +99,23 @@ class LatissCWFSAlign(LatissBaseAlign):
             "Sensing code.",
         )
 
-        # instantiate the quick measurement class
+        # instantiate the quick measurement class, one instance for each of
+        # the intra/extra images so they can be measured concurrently.
         try:
             qm_config = QuickFrameMeasurementTask.ConfigClass()
             self.qm = QuickFrameMeasurementTask(config=qm_config)
+            self.qm_extra = QuickFrameMeasurementTask(config=qm_config)
         except NameError:
             self.log.warning("Library unavailable certain tests will be skipped")
 
+        # Executor used to run the blocking processing steps, sized to
+        # process the intra and extra images at the same time.
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=2)
+
+        # Background retrieval and measurement of the images, started as
+        # soon as each exposure ends, keyed by visit id.
+        self._prefetch_tasks: typing.Dict[int, asyncio.Task] = dict()
+
         self.extra_focal_position_out_of_range = None
         self.detection_exp = None
 
@@ -105,6 +129,12 @@ class LatissCWFSAlign(LatissBaseAlign):
         self._binning = 1
         self.algo = None
 
+        # Ready to use cwfs Instrument/Algorithm pairs, keyed by (dz, binning),
+        # in least recently used order.
+        self._cwfs_cache = collections.OrderedDict()
+        # Private directory for the cwfs configuration files.
+        self._cwfs_config_dir = None
+
         self.log.info(
             "LATISS Curvature Wavefront Sensing initialized. Perform optical "
             "alignment procedure of the Rubin Auxiliary Telescope with LATISS "
@@ -125,27 +155,63 @@ class LatissCWFSAlign(LatissBaseAlign):
     def _run_additional_dz_settings(self) -> None:
         self.log.info("Using binning factor of {}".format(self.binning))
 
-        # Create configuration file with the proper parameters
-        cwfs_config_template = """#Auxiliary Telescope parameters:
-Obscuration 				0.423
-Focal_length (m)			21.6
-Aperture_diameter (m)   		1.2
-Offset (m)				{}
-Pixel_size (m)			{}
-"""
-        config_index = "auxtel_latiss"
-        path = Path(cwfs.__file__).resolve().parents[3].joinpath("data", config_index)
-        if not path.exists():
-            os.makedirs(path)
-        dest = path.joinpath(f"{config_index}.param")
-        with open(dest, "w") as fp:
+        key = (self._dz, self.binning)
+
+        if key in self._cwfs_cache:
+            self._cwfs_cache.move_to_end(key)
+        else:
+            self._cwfs_cache[key] = self._make_cwfs_instrument_algorithm()
+            if len(self._cwfs_cache) > CWFS_CACHE_SIZE:
+                self._cwfs_cache.popitem(last=False)
+
+        self.inst, self.algo = self._cwfs_cache[key]
+
+    def _make_cwfs_instrument_algorithm(
+        self,
+    ) -> typing.Tuple["Instrument", "Algorithm"]:
+        """Create the cwfs Instrument and Algorithm for the current dz and
+        binning.
+
+        The cwfs configuration file is written atomically to a directory
+        private to this script, instead of the shared cwfs data directory,
+        so concurrent scripts do not overwrite each other's configuration.
+
+        Returns
+        -------
+        inst : `Instrument`
+            cwfs Instrument.
+        algo : `Algorithm`
+            cwfs Algorithm.
+        """
+        if self._cwfs_config_dir is None:
+            self._cwfs_config_dir = tempfile.mkdtemp(prefix="latiss_cwfs_")
+
+        # cwfs reads the configuration from <data>/<index>/<index>.param and
+        # the other instrument files from <data>/<index>/. Passing an
+        # absolute path as the index makes the configuration resolve to
+        # <config_dir>/<index>.param, private to this script, and the other
+        # files to <config_dir>/<index>/, which links to the shared
+        # instrument files of the cwfs data directory.
+        config_index = os.path.join(self._cwfs_config_dir, CWFS_CONFIG_INDEX)
+        shared_index_dir = (
+            Path(cwfs.__file__).resolve().parents[3].joinpath("data", CWFS_CONFIG_INDEX)
+        )
+        if not os.path.lexists(config_index) and shared_index_dir.is_dir():
+            os.symlink(shared_index_dir, config_index)
+
+        with tempfile.NamedTemporaryFile(
+            "w", dir=self._cwfs_config_dir, delete=False
+        ) as fp:
             # Write the file and set the offset and pixel size parameters
             fp.write(
-                cwfs_config_template.format(self._dz * 0.041, 10e-6 * self.binning)
+                CWFS_CONFIG_TEMPLATE.format(self._dz * 0.041, 10e-6 * self.binning)
             )
+        os.replace(fp.name, f"{config_index}.param")
+
+        inst = Instrument(config_index, int(self.side * 2 / self.binning))
+        algo = Algorithm("exp", inst, 1)
 
-        self.inst = Instrument(config_index, int(self.side * 2 / self.binning))
-        self.algo = Algorithm("exp", self.inst, 1)
+        return inst, algo
 
     async def run_align(self) -> LatissAlignResults:
         """Runs curvature wavefront sensing code using the original cwfs
@@ -158,8 +224,7 @@ Pixel_size (m)			{}
         """
 
         # get event loop to run blocking tasks
-        loop = asyncio.get_event_loop()
-        executor = concurrent.futures.ThreadPoolExecutor()
+        loop = asyncio.get_running_loop()
 
         self.cwfs_selected_sources = []
 
@@ -169,33 +234,18 @@ Pixel_size (m)			{}
             f"and {parse_visit_id(self.extra_visit_id)}."
         )
 
-        self.intra_exposure, self.extra_exposure = await asyncio.gather(
-            get_image(
-                parse_visit_id(self.intra_visit_id),
-                self.best_effort_isr,
-                timeout=self.timeout_get_image,
-            ),
-            get_image(
-                parse_visit_id(self.extra_visit_id),
-                self.best_effort_isr,
-                timeout=self.timeout_get_image,
-            ),
+        # Retrieve and measure each image independently, so source detection
+        # on one image runs while the other is still being retrieved or
+        # measured. Images taken by take_intra_extra are already being
+        # processed since their exposures ended.
+        (
+            (self.intra_exposure, self.intra_result),
+            (self.extra_exposure, self.extra_result),
+        ) = await asyncio.gather(
+            self.get_prefetched_image(self.intra_visit_id, self.qm),
+            self.get_prefetched_image(self.extra_visit_id, self.qm_extra),
         )
 
-        self.log.debug("Running source detection")
-
-        self.intra_result = await loop.run_in_executor(
-            executor,
-            functools.partial(
-                self.qm.run, self.intra_exposure, donutDiameter=2 * self.side
-            ),
-        )
-        self.extra_result = await loop.run_in_executor(
-            executor,
-            functools.partial(
-                self.qm.run, self.extra_exposure, donutDiameter=2 * self.side
-            ),
-        )
         self.log.debug("Source detection completed")
 
         # Verify a result was achieved, if not then raising the exception
@@ -238,18 +288,9 @@ Pixel_size (m)			{}
             )
             self.extra_focal_position_out_of_range = False
 
-        # Create stamps for CWFS algorithm. Bin (if desired).
-        self.create_donut_stamps_for_cwfs()
-
-        # Now we should be ready to run CWFS
-        self.log.info("Starting CWFS algorithm calculation.")
-        # reset inputs just in case
-        self.algo.reset(self.I1[0], self.I2[0])
-
-        # for a slow telescope, should be running in paraxial mode
-        await loop.run_in_executor(
-            executor, self.algo.runIt, self.inst, self.I1[0], self.I2[0], "paraxial"
-        )
+        # Create stamps for CWFS algorithm, bin (if desired), and run the
+        # algorithm, without blocking the event loop.
+        await loop.run_in_executor(self.executor, self.run_cwfs)
 
         self.zern = [
             -self.algo.zer4UpNm[3],  # Coma-X (in detector axes, TBC)
@@ -260,6 +301,120 @@ Pixel_size (m)			{}
         results_dict = self.calculate_results()
         return results_dict
 
+    def start_image_prefetch(self, visit_id: int, intra: bool) -> None:
+        """Start retrieving and measuring an image in the background.
+
+        Parameters
+        ----------
+        visit_id : `int`
+            Visit id of the image.
+        intra : `bool`
+            Is this the intra-focal image?
+        """
+        self.log.debug(f"Prefetching image {visit_id}.")
+        self._prefetch_tasks[visit_id] = asyncio.create_task(
+            self.get_and_measure_image(visit_id, self.qm if intra else self.qm_extra)
+        )
+
+    async def get_prefetched_image(self, visit_id, qm):
+        """Get an image and its measurement, waiting for the prefetch task of
+        the image if one was started.
+
+        Parameters
+        ----------
+        visit_id : `int`
+            Visit id of the image.
+        qm : `QuickFrameMeasurementTask`
+            Task used to measure the image if it was not prefetched.
+
+        Returns
+        -------
+        exposure : `lsst.afw.image.Exposure`
+            Exposure.
+        result : `lsst.pipe.base.Struct`
+            Result of the quick frame measurement.
+        """
+        prefetch_task = self._prefetch_tasks.pop(visit_id, None)
+        if prefetch_task is not None:
+            return await prefetch_task
+        return await self.get_and_measure_image(visit_id, qm)
+
+    async def get_and_measure_image(self, visit_id, qm):
+        """Retrieve an image and find the brightest donut.
+
+        Parameters
+        ----------
+        visit_id : `int`
+            Visit id of the image.
+        qm : `QuickFrameMeasurementTask`
+            Task used to measure the image.
+
+        Returns
+        -------
+        exposure : `lsst.afw.image.Exposure`
+            Exposure.
+        result : `lsst.pipe.base.Struct`
+            Result of the quick frame measurement.
+        """
+        loop = asyncio.get_running_loop()
+
+        if self.exposure_provider is not None:
+            exposure = await loop.run_in_executor(
+                self.executor, self.exposure_provider.get_exposure, visit_id
+            )
+        else:
+            with self.stage_timer("image_load"):
+                exposure = await get_image(
+                    parse_visit_id(visit_id),
+                    self.best_effort_isr,
+                    timeout=self.timeout_get_image,
+                )
+
+        self.log.debug(f"Running source detection on {visit_id}.")
+
+        result = await loop.run_in_executor(
+            self.executor,
+            functools.partial(self.measure_image, exposure, qm),
+        )
+
+        return exposure, result
+
+    def measure_image(self, exposure, qm):
+        """Find the brightest donut in an image.
+
+        Parameters
+        ----------
+        exposure : `lsst.afw.image.Exposure`
+            Exposure.
+        qm : `QuickFrameMeasurementTask`
+            Task used to measure the image.
+
+        Returns
+        -------
+        result : `lsst.pipe.base.Struct`
+            Result of the quick frame measurement.
+        """
+        with self.stage_timer("detection"):
+            return qm.run(exposure, donutDiameter=2 * self.side)
+
+    def run_cwfs(self) -> None:
+        """Create the donut stamps and run the cwfs algorithm.
+
+        This method is blocking and is executed in the executor by
+        `run_align`.
+        """
+        with self.stage_timer("cutouts"):
+            self.create_donut_stamps_for_cwfs()
+
+        # Now we should be ready to run CWFS
+        self.log.info("Starting CWFS algorithm calculation.")
+        with self.stage_timer("zernikes"):
+            # reset inputs just in case
+            self.algo.reset(self.I1[0], self.I2[0])
+
+            # for a slow telescope, should be running in paraxial mode
+            self.algo.runIt(self.inst, self.I1[0], self.I2[0], "paraxial")
+
     def get_donut_region(
         self, center_y: float, center_x: float
     ) -> typing.Tuple[float, float, float, float]:
@@ -313,22 +468,18 @@ Pixel_size (m)			{}
             f"length of {2 * self.side} pixels"
         )
 
-        # Bin the images
+        # Bin the images. The stamps are views of the exposure arrays, the
+        # binning creates new arrays so the exposures are not modified.
         if self.binning != 1:
             self.log.info(
                 f"Stamps for analysis will be binned by {self.binning} in each dimension."
             )
-            intra_square0 = copy.deepcopy(intra_square)
-            extra_square0 = copy.deepcopy(extra_square)
-            # get tuple array from shape array (which is a tuple) and make
-            # an integer
-            new_shape = tuple(
-                np.asarray(
-                    np.asarray(intra_square0.shape) / self.binning, dtype=np.int32
-                )
+            new_shape = (
+                intra_square.shape[0] // self.binning,
+                intra_square.shape[1] // self.binning,
             )
-            intra_square = self.rebin(intra_square0, new_shape)
-            extra_square = self.rebin(extra_square0, new_shape)
+            intra_square = self.rebin(intra_square, new_shape)
+            extra_square = self.rebin(extra_square, new_shape)
             self.log.info(f"intra_square shape is {intra_square.shape}")
             self.log.info(f"extra_square shape is {extra_square.shape}")
 
@@ -341,6 +492,10 @@ Pixel_size (m)			{}
         """Rebins the array to a new shape via taking the mean of the
         surrounding pixels
 
+        The input array is viewed as blocks of pixels, without copying it,
+        and the mean of each block is computed in a single reduction. Rows and
+        columns that do not fill a complete block are ignored.
+
         Parameters
         ----------
         arr : `np.array`
@@ -353,14 +508,13 @@ Pixel_size (m)			{}
         rebinned : `np.array`
             Array binned to new shape
         """
-        shape = (
-            new_shape[0],
-            arr.shape[0] // new_shape[0],
-            new_shape[1],
-            arr.shape[1] // new_shape[1],
+        bin_y = arr.shape[0] // new_shape[0]
+        bin_x = arr.shape[1] // new_shape[1]
+
+        blocks = arr[: new_shape[0] * bin_y, : new_shape[1] * bin_x].reshape(
+            new_shape[0], bin_y, new_shape[1], bin_x
         )
-        rebinned = arr.reshape(shape).mean(-1).mean(1)
-        return rebinned
+        return blocks.mean(axis=(1, 3))
 
     async def configure(self, config):
         """Configure script.
@@ -372,8 +526,23 @@ Pixel_size (m)			{}
         """
         await super().configure(config)
 
-        # Instantiate BestEffortIsr
-        self.best_effort_isr = self.get_best_effort_isr()
+        # Instantiate BestEffortIsr, not needed if the exposures are provided
+        # locally.
+        if self.exposure_provider is None:
+            self.best_effort_isr = self.get_best_effort_isr()
+
+    async def cleanup(self):
+        await super().cleanup()
+
+        for prefetch_task in self._prefetch_tasks.values():
+            prefetch_task.cancel()
+        self._prefetch_tasks = dict()
+
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+        if self._cwfs_config_dir is not None:
+            shutil.rmtree(self._cwfs_config_dir, ignore_errors=True)
+            self._cwfs_config_dir = None
 
     def get_best_effort_isr(self):
         # Isolate the BestEffortIsr class so it can be mocked
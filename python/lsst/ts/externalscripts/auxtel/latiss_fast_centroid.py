@@ -0,0 +1,198 @@
+# This file is part of ts_externalscripts
+#
+# Developed for the LSST Telescope and Site Systems.
+# This product includes software developed by the LSST Project
+# (https://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+__all__ = [
+    "assemble_cutout",
+    "find_cutout_centroid",
+    "measure_cutout_centroid",
+]
+
+import typing
+
+import numpy as np
+from lsst.geom import Box2I, Extent2I, Point2I, PointD
+
+
+def assemble_cutout(raw: typing.Any, bbox: Box2I) -> np.ndarray:
+    """Assemble a region of a raw exposure, with a lightweight ISR.
+
+    Only the amplifiers overlapping the region are processed. The median of
+    the serial overscan of each amplifier is subtracted and the amplifier
+    data is flipped to the assembled orientation. No other correction is
+    applied.
+
+    Parameters
+    ----------
+    raw : `lsst.afw.image.Exposure`
+        Raw (untrimmed) exposure, with its detector.
+    bbox : `lsst.geom.Box2I`
+        Region to assemble, in assembled detector coordinates.
+
+    Returns
+    -------
+    cutout : `numpy.ndarray`
+        Overscan subtracted image of the region.
+    """
+    cutout = np.zeros((bbox.getHeight(), bbox.getWidth()), dtype=np.float32)
+
+    for amp in raw.getDetector():
+        amp_bbox = amp.getBBox()
+        overlap = amp_bbox.clippedTo(bbox)
+        if overlap.isEmpty():
+            continue
+
+        data = raw.image[amp.getRawDataBBox()].array
+        overscan = np.median(raw.image[amp.getRawSerialOverscanBBox()].array)
+
+        if amp.getRawFlipX():
+            data = data[:, ::-1]
+        if amp.getRawFlipY():
+            data = data[::-1, :]
+
+        amp_y0 = overlap.getMinY() - amp_bbox.getMinY()
+        amp_x0 = overlap.getMinX() - amp_bbox.getMinX()
+        cutout_y0 = overlap.getMinY() - bbox.getMinY()
+        cutout_x0 = overlap.getMinX() - bbox.getMinX()
+
+        cutout[
+            cutout_y0 : cutout_y0 + overlap.getHeight(),
+            cutout_x0 : cutout_x0 + overlap.getWidth(),
+        ] = (
+            data[
+                amp_y0 : amp_y0 + overlap.getHeight(),
+                amp_x0 : amp_x0 + overlap.getWidth(),
+            ]
+            - overscan
+        )
+
+    return cutout
+
+
+def find_cutout_centroid(
+    cutout: np.ndarray, n_sigma: float = 10.0, radius: int = 15
+) -> typing.Optional[typing.Tuple[float, float]]:
+    """Find the centroid of the brightest source in a cutout.
+
+    The peak is located on the image smoothed with a 3x3 box, to reject
+    cosmic rays and hot pixels, and the centroid is the background subtracted
+    center of mass within ``radius`` of the peak.
+
+    Parameters
+    ----------
+    cutout : `numpy.ndarray`
+        Image.
+    n_sigma : `float`, optional
+        Minimum significance of the peak, in units of the background noise.
+    radius : `int`, optional
+        Half size of the box used to compute the centroid (in pixels).
+
+    Returns
+    -------
+    centroid : `tuple` [`float`, `float`] or `None`
+        The x/y centroid in the cutout (in pixels), or `None` if no
+        significant source is found or if the source is too close to the
+        edge of the cutout to be measured.
+    """
+    background = np.median(cutout)
+    noise = 1.4826 * np.median(np.abs(cutout - background))
+    image = cutout - background
+
+    padded = np.pad(image, 1)
+    smoothed = sum(
+        padded[dy : dy + image.shape[0], dx : dx + image.shape[1]]
+        for dy in range(3)
+        for dx in range(3)
+    )
+
+    peak_y, peak_x = np.unravel_index(np.argmax(smoothed), smoothed.shape)
+
+    # The noise of the sum of 9 pixels is 3 times the noise of a pixel.
+    if smoothed[peak_y, peak_x] < n_sigma * 3.0 * noise:
+        return None
+
+    if (
+        peak_y < radius
+        or peak_x < radius
+        or peak_y + radius >= image.shape[0]
+        or peak_x + radius >= image.shape[1]
+    ):
+        return None
+
+    stamp = np.clip(
+        image[
+            peak_y - radius : peak_y + radius + 1, peak_x - radius : peak_x + radius + 1
+        ],
+        0.0,
+        None,
+    )
+    y, x = np.mgrid[-radius : radius + 1, -radius : radius + 1]
+    flux = stamp.sum()
+
+    return (
+        peak_x + float((x * stamp).sum() / flux),
+        peak_y + float((y * stamp).sum() / flux),
+    )
+
+
+def measure_cutout_centroid(
+    raw: typing.Any,
+    predicted_position: PointD,
+    cutout_size: int,
+    n_sigma: float = 10.0,
+) -> typing.Optional[PointD]:
+    """Measure the position of a source close to its predicted position,
+    processing only a cutout of the raw exposure.
+
+    Parameters
+    ----------
+    raw : `lsst.afw.image.Exposure`
+        Raw (untrimmed) exposure, with its detector.
+    predicted_position : `lsst.geom.PointD`
+        Predicted position of the source in detector coordinates.
+    cutout_size : `int`
+        Size of the cutout (in pixels).
+    n_sigma : `float`, optional
+        Minimum significance of the source, in units of the background
+        noise.
+
+    Returns
+    -------
+    position : `lsst.geom.PointD` or `None`
+        Position of the source in detector coordinates, or `None` if the
+        source is not found in the cutout.
+    """
+    bbox = Box2I(
+        Point2I(
+            int(predicted_position.getX()) - cutout_size // 2,
+            int(predicted_position.getY()) - cutout_size // 2,
+        ),
+        Extent2I(cutout_size, cutout_size),
+    ).clippedTo(raw.getDetector().getBBox())
+
+    if bbox.isEmpty():
+        return None
+
+    centroid = find_cutout_centroid(assemble_cutout(raw, bbox), n_sigma=n_sigma)
+
+    if centroid is None:
+        return None
+
+    return PointD(bbox.getMinX() + centroid[0], bbox.getMinY() + centroid[1])
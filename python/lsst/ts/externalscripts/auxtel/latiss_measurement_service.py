@@ -0,0 +1,247 @@
+# This file is part of ts_externalscripts
+#
+# Developed for the LSST Telescope and Site Systems.
+# This product includes software developed by the LSST Project
+# (https://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+__all__ = ["LatissMeasurementService", "get_measurement_service"]
+
+import asyncio
+import collections
+import concurrent.futures
+import threading
+import typing
+import warnings
+
+try:
+    from lsst.pipe.tasks.quickFrameMeasurement import QuickFrameMeasurementTask
+    from lsst.summit.utils import BestEffortIsr
+    from lsst.ts.observing.utilities.auxtel.latiss.getters import get_image
+    from lsst.ts.observing.utilities.auxtel.latiss.utils import parse_visit_id
+except ImportError:
+    warnings.warn("Cannot import required libraries. Service will not work.")
+
+
+class LatissMeasurementService:
+    """Measure the position of the brightest source in LATISS images.
+
+    The `BestEffortIsr` and `QuickFrameMeasurementTask` instances are
+    constructed once, on first use, and the measurements run in a persistent
+    executor, so the scripts using the service do not pay for the setup on
+    every image. The results of the most recent measurements are cached.
+
+    Parameters
+    ----------
+    max_workers : `int`, optional
+        Number of threads of the executor.
+    cache_size : `int`, optional
+        Number of measurements to keep in the cache.
+    """
+
+    def __init__(self, max_workers: int = 2, cache_size: int = 32) -> None:
+        self.cache_size = cache_size
+        self.executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=max_workers
+        )
+
+        self._best_effort_isr = None
+        self._quick_measurement = None
+        # Guards the construction of the ISR and measurement task, and the
+        # measurement task itself, which is not thread safe.
+        self._setup_lock = threading.Lock()
+        self._measurement_lock = threading.Lock()
+
+        self._cache: typing.OrderedDict[
+            typing.Tuple[int, int], typing.Any
+        ] = collections.OrderedDict()
+        self._pending: typing.Dict[typing.Tuple[int, int], asyncio.Future] = dict()
+
+    @property
+    def best_effort_isr(self) -> "BestEffortIsr":
+        """Shared `BestEffortIsr` instance, constructed on first use."""
+        with self._setup_lock:
+            if self._best_effort_isr is None:
+                self._best_effort_isr = BestEffortIsr()
+            return self._best_effort_isr
+
+    @property
+    def quick_measurement(self) -> "QuickFrameMeasurementTask":
+        """Shared `QuickFrameMeasurementTask` instance, constructed on first
+        use.
+        """
+        with self._setup_lock:
+            if self._quick_measurement is None:
+                quick_measurement_config = QuickFrameMeasurementTask.ConfigClass()
+                self._quick_measurement = QuickFrameMeasurementTask(
+                    config=quick_measurement_config
+                )
+            return self._quick_measurement
+
+    async def warm_up(self) -> None:
+        """Construct the ISR and measurement task in the executor, without
+        blocking the event loop.
+        """
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(
+            self.executor,
+            lambda: (self.best_effort_isr, self.quick_measurement),
+        )
+
+    @staticmethod
+    def get_key(
+        data_id: typing.Union[int, typing.Dict[str, typing.Any]]
+    ) -> typing.Tuple[int, int]:
+        """Return the cache key of an image.
+
+        Parameters
+        ----------
+        data_id : `int` or `dict`
+            Visit id or data id of the image.
+
+        Returns
+        -------
+        `tuple` [`int`, `int`]
+            Day obs and sequence number of the image.
+        """
+        if not isinstance(data_id, dict):
+            data_id = parse_visit_id(data_id)
+        return int(data_id["day_obs"]), int(data_id["seq_num"])
+
+    def run_quick_measurement(self, exposure: typing.Any) -> typing.Any:
+        """Run the measurement task on an exposure.
+
+        Parameters
+        ----------
+        exposure : `lsst.afw.image.Exposure`
+            Exposure to measure.
+
+        Returns
+        -------
+        result : `lsst.pipe.base.Struct`
+            Result of `QuickFrameMeasurementTask`.
+        """
+        quick_measurement = self.quick_measurement
+        with self._measurement_lock:
+            return quick_measurement.run(exposure)
+
+    async def measure_exposure(self, exposure: typing.Any) -> typing.Any:
+        """Run the measurement task on an exposure in the executor.
+
+        Parameters
+        ----------
+        exposure : `lsst.afw.image.Exposure`
+            Exposure to measure.
+
+        Returns
+        -------
+        result : `lsst.pipe.base.Struct`
+            Result of `QuickFrameMeasurementTask`.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.executor, self.run_quick_measurement, exposure
+        )
+
+    async def measure(
+        self,
+        data_id: typing.Union[int, typing.Dict[str, typing.Any]],
+        timeout: float,
+    ) -> typing.Any:
+        """Measure the brightest source in an image.
+
+        Concurrent requests for the same image share a single measurement,
+        and recent results are returned from the cache.
+
+        Parameters
+        ----------
+        data_id : `int` or `dict`
+            Visit id or data id of the image.
+        timeout : `float`
+            Timeout to wait for the image to be available (in seconds).
+
+        Returns
+        -------
+        result : `lsst.pipe.base.Struct`
+            Result of `QuickFrameMeasurementTask`.
+        """
+        key = self.get_key(data_id)
+
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]
+
+        if key in self._pending:
+            return await asyncio.shield(self._pending[key])
+
+        if not isinstance(data_id, dict):
+            data_id = dict(day_obs=key[0], seq_num=key[1])
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending[key] = future
+        try:
+            exposure = await get_image(
+                data_id,
+                self.best_effort_isr,
+                timeout=timeout,
+            )
+            result = await self.measure_exposure(exposure)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as exception:
+            future.set_exception(exception)
+            # Mark the exception as retrieved, in case nobody else is waiting.
+            future.exception()
+            raise
+        finally:
+            del self._pending[key]
+
+        future.set_result(result)
+        self._cache[key] = result
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+        return result
+
+    def clear_cache(self) -> None:
+        """Remove all the measurements from the cache."""
+        self._cache.clear()
+
+    def shutdown(self) -> None:
+        """Shutdown the executor of the service."""
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+_measurement_service = None
+
+
+def get_measurement_service() -> LatissMeasurementService:
+    """Return the measurement service shared by the scripts running in this
+    process, creating it if needed.
+
+    Returns
+    -------
+    `LatissMeasurementService`
+        Shared measurement service.
+    """
+    global _measurement_service
+
+    if _measurement_service is None:
+        _measurement_service = LatissMeasurementService()
+
+    return _measurement_service
@@ -24,12 +24,14 @@ __all__ = ["LatissWEPAlign"]
 import asyncio
 import concurrent.futures
 import functools
+import types
 import typing
 import warnings
 
 import astropy
 import astropy.units as u
 import numpy as np
+import yaml
 from astropy.table import QTable
 from lsst.afw.image import Exposure
 from lsst.geom import PointD
@@ -62,6 +64,7 @@ except ImportError:
 
 from lsst.ts.observatory.control.constants.latiss_constants import boresight
 
+from ..utils import StageTimer
 from .latiss_base_align import LatissAlignResults, LatissBaseAlign
 
 
@@ -90,12 +93,97 @@ class LatissWEPAlign(LatissBaseAlign):
             "MTAOS.",
         )
 
+        # Long-lived worker process used to run the wavefront estimation
+        # pipeline. It keeps the stack imported and the tasks, butler and
+        # camera geometry loaded between iterations.
+        self.wep_executor = None
+
+        # Number of donuts per image used in the wavefront estimation.
+        self.n_donuts = 1
+
         self.log.info(
             "LATISS Wavefront Estimation Pipeline initialized. Perform optical "
             "alignment procedure of the Rubin Auxiliary Telescope with LATISS "
             "using the Wavefront Estimation Pipeline task."
         )
 
+    @classmethod
+    def get_schema(cls) -> typing.Dict[str, typing.Any]:
+        schema_dict = super().get_schema()
+
+        schema_dict["properties"].update(
+            yaml.safe_load(
+                """
+                n_donuts:
+                  description: >-
+                    Number of donuts, the brightest isolated ones in each image, used to
+                    estimate the wavefront. The Zernike coefficients are averaged over all
+                    the intra/extra donut pairs.
+                  type: integer
+                  minimum: 1
+                  default: 1
+                """
+            )
+        )
+
+        return schema_dict
+
+    async def additional_configuration(self, config: types.SimpleNamespace) -> None:
+        """Configure the number of donuts and start the wavefront estimation
+        worker process.
+
+        The worker is warmed up in the background, so the first call to
+        `run_align` does not pay the cost of loading the stack.
+
+        Parameters
+        ----------
+        config : `types.SimpleNamespace`
+            Script configuration, as defined by `schema`.
+        """
+        self.n_donuts = config.n_donuts
+
+        if self.wep_executor is None:
+            self.wep_executor = concurrent.futures.ProcessPoolExecutor(max_workers=1)
+
+        warm_up = self.wep_executor.submit(warm_up_wep_worker, 2 * self.side)
+        warm_up.add_done_callback(self._log_warm_up_failure)
+
+    def start_image_prefetch(self, visit_id: int, intra: bool) -> None:
+        """Start retrieving an image, and running ISR, in the wavefront
+        estimation worker process.
+
+        The exposure is kept in the worker process and used by `run_wep`.
+
+        Parameters
+        ----------
+        visit_id : `int`
+            Visit id of the image.
+        intra : `bool`
+            Is this the intra-focal image?
+        """
+        if self.wep_executor is None or self.exposure_provider is not None:
+            return
+
+        self.log.debug(f"Prefetching image {visit_id}.")
+        prefetch = self.wep_executor.submit(
+            prefetch_image, visit_id, 2 * self.side, self.timeout_get_image
+        )
+        prefetch.add_done_callback(self._log_prefetch_failure)
+
+    def _log_prefetch_failure(self, prefetch: concurrent.futures.Future) -> None:
+        if not prefetch.cancelled() and prefetch.exception() is not None:
+            self.log.warning(
+                f"Failed to prefetch image: {prefetch.exception()!r}. "
+                "Image will be retrieved when running the wavefront estimation."
+            )
+
+    def _log_warm_up_failure(self, warm_up: concurrent.futures.Future) -> None:
+        if not warm_up.cancelled() and warm_up.exception() is not None:
+            self.log.warning(
+                f"Failed to warm up wavefront estimation worker: {warm_up.exception()!r}. "
+                "Tasks will be built on the first iteration."
+            )
+
     async def run_align(self) -> LatissAlignResults:
         """Runs wavefront estimation pipeline.
 
@@ -107,41 +195,222 @@ class LatissWEPAlign(LatissBaseAlign):
 
         loop = asyncio.get_running_loop()
 
-        with concurrent.futures.ProcessPoolExecutor(max_workers=1) as pool:
-            self.log.debug(
-                "Running wep with: "
-                f"intra_visit_id={self.intra_visit_id}, "
-                f"extra_visit_id={self.extra_visit_id}, "
-                f"donut_diameter={2*self.side}, "
-                f"timeout_get_image={self.timeout_get_image}. "
-            )
+        if self.wep_executor is None:
+            self.wep_executor = concurrent.futures.ProcessPoolExecutor(max_workers=1)
 
+        self.log.debug(
+            "Running wep with: "
+            f"intra_visit_id={self.intra_visit_id}, "
+            f"extra_visit_id={self.extra_visit_id}, "
+            f"donut_diameter={2*self.side}, "
+            f"timeout_get_image={self.timeout_get_image}, "
+            f"n_donuts={self.n_donuts}. "
+        )
+
+        if self.exposure_provider is not None:
+            # Exposures are provided locally, run in a thread of this process
+            # so the time spent in each stage is recorded.
             (
                 self.intra_result,
                 self.extra_result,
                 wep_results,
-            ) = await loop.run_in_executor(
-                pool,
-                functools.partial(
-                    run_wep,
-                    self.intra_visit_id,
-                    self.extra_visit_id,
-                    2 * self.side,
-                    self.timeout_get_image,
-                ),
-            )
-            zk_table = wep_results.zernikes
-            zk_average_nm = zk_table[zk_table["label"] == "average"]
-
-            # output from wep is in nm
-            self.zern = [
-                -zk_average_nm["Z8"][0].value,
-                zk_average_nm["Z7"][0].value,
-                zk_average_nm["Z4"][0].value,
-            ]
+            ) = await loop.run_in_executor(None, self.run_wep_on_provided_exposures)
+        else:
+            with self.stage_timer("wep"):
+                (
+                    self.intra_result,
+                    self.extra_result,
+                    wep_results,
+                ) = await loop.run_in_executor(
+                    self.wep_executor,
+                    functools.partial(
+                        run_wep,
+                        self.intra_visit_id,
+                        self.extra_visit_id,
+                        2 * self.side,
+                        self.timeout_get_image,
+                        n_donuts=self.n_donuts,
+                    ),
+                )
+        zk_table = wep_results.zernikes
+        zk_average_nm = zk_table[zk_table["label"] == "average"]
+
+        # output from wep is in nm
+        self.zern = [
+            -zk_average_nm["Z8"][0].value,
+            zk_average_nm["Z7"][0].value,
+            zk_average_nm["Z4"][0].value,
+        ]
 
         return self.calculate_results()
 
+    def run_wep_on_provided_exposures(self) -> typing.Tuple[Struct, Struct, Struct]:
+        """Run the wavefront estimation pipeline on the exposures of the
+        exposure provider.
+
+        Returns
+        -------
+        result_intra : `Struct`
+            Quick frame measurement result for the intra focal exposure.
+        result_extra : `Struct`
+            Quick frame measurement result for the extra focal exposure.
+        task_output : `Struct`
+            Output of `CalcZernikesTask`.
+        """
+        return run_wep_on_exposures(
+            self.exposure_provider.get_exposure(self.intra_visit_id),
+            self.exposure_provider.get_exposure(self.extra_visit_id),
+            2 * self.side,
+            n_donuts=self.n_donuts,
+            stage_timer=self.stage_timer,
+        )
+
+    async def cleanup(self):
+        await super().cleanup()
+
+        if self.wep_executor is not None:
+            self.wep_executor.shutdown(wait=False, cancel_futures=True)
+            self.wep_executor = None
+
+
+# Tasks used by run_wep, kept alive in the process between calls. See
+# get_wep_tasks.
+_wep_tasks: typing.Dict[str, typing.Any] = dict()
+
+# Exposures retrieved in advance by prefetch_image, keyed by visit id, in
+# the order they were retrieved.
+_prefetched_exposures: typing.Dict[int, Exposure] = dict()
+
+# Maximum number of prefetched exposures kept in the process.
+MAX_PREFETCHED_EXPOSURES = 4
+
+
+def get_wep_tasks(donut_diameter: int) -> Struct:
+    """Get the tasks used to run the wavefront estimation pipeline.
+
+    The tasks are built the first time this function is called in a process
+    and reused afterwards. The cutout task depends on the donut diameter and
+    is cached for each value.
+
+    Parameters
+    ----------
+    donut_diameter : `int`
+        Donut diameter (in pixels).
+
+    Returns
+    -------
+    tasks : `Struct`
+        Struct with the ``best_effort_isr``, ``quick_frame_measurement``,
+        ``cut_out``, ``calc_zernikes`` and ``camera`` entries.
+    """
+    if not _wep_tasks:
+        best_effort_isr = BestEffortIsr()
+
+        quick_frame_measurement_config = QuickFrameMeasurementTask.ConfigClass()
+        quick_frame_measurement_task = QuickFrameMeasurementTask(
+            config=quick_frame_measurement_config
+        )
+
+        config = CalcZernikesTaskConfig()
+        config.doDonutStampSelector = False
+        calc_zernikes_task = CalcZernikesTask(config=config, name="Base Task")
+
+        _wep_tasks.update(
+            best_effort_isr=best_effort_isr,
+            quick_frame_measurement=quick_frame_measurement_task,
+            calc_zernikes=calc_zernikes_task,
+            camera=Latiss.getCamera(),
+            cut_out=dict(),
+        )
+
+    cut_out_tasks = _wep_tasks["cut_out"]
+
+    if donut_diameter not in cut_out_tasks:
+        cut_out_config = CutOutDonutsScienceSensorTaskConfig()
+        cut_out_config.donutStampSize = donut_diameter
+        cut_out_config.opticalModel = "onAxis"
+        cut_out_config.initialCutoutPadding = 40
+        cut_out_tasks[donut_diameter] = CutOutDonutsScienceSensorTask(
+            config=cut_out_config
+        )
+
+    return Struct(
+        best_effort_isr=_wep_tasks["best_effort_isr"],
+        quick_frame_measurement=_wep_tasks["quick_frame_measurement"],
+        cut_out=cut_out_tasks[donut_diameter],
+        calc_zernikes=_wep_tasks["calc_zernikes"],
+        camera=_wep_tasks["camera"],
+    )
+
+
+def warm_up_wep_worker(donut_diameter: int) -> None:
+    """Build the wavefront estimation tasks in a worker process.
+
+    Parameters
+    ----------
+    donut_diameter : `int`
+        Donut diameter (in pixels).
+    """
+    get_wep_tasks(donut_diameter)
+
+
+def prefetch_image(
+    visit_id: int, donut_diameter: int, timeout_get_image: float
+) -> None:
+    """Retrieve an image, running ISR, and keep it in the process for a
+    later call to `run_wep`.
+
+    Parameters
+    ----------
+    visit_id : `int`
+        Visit id of the image.
+    donut_diameter : `int`
+        Donut diameter (in pixels), used to get the wep tasks.
+    timeout_get_image : `float`
+        Timeout to retrieve the image (in seconds).
+    """
+    tasks = get_wep_tasks(donut_diameter)
+
+    _prefetched_exposures[int(visit_id)] = get_image(
+        parse_visit_id(visit_id),
+        tasks.best_effort_isr,
+        timeout=timeout_get_image,
+    )
+
+    # Drop the oldest exposures, never used by run_wep.
+    while len(_prefetched_exposures) > MAX_PREFETCHED_EXPOSURES:
+        del _prefetched_exposures[next(iter(_prefetched_exposures))]
+
+
+def get_wep_image(
+    visit_id: int, best_effort_isr: "BestEffortIsr", timeout_get_image: float
+) -> Exposure:
+    """Get an image, prefetched by `prefetch_image` or retrieved from the
+    butler.
+
+    Parameters
+    ----------
+    visit_id : `int`
+        Visit id of the image.
+    best_effort_isr : `BestEffortIsr`
+        ISR used if the image was not prefetched.
+    timeout_get_image : `float`
+        Timeout to retrieve the image (in seconds).
+
+    Returns
+    -------
+    exposure : `Exposure`
+        Exposure, after ISR.
+    """
+    exposure = _prefetched_exposures.pop(int(visit_id), None)
+    if exposure is None:
+        exposure = get_image(
+            parse_visit_id(visit_id),
+            best_effort_isr,
+            timeout=timeout_get_image,
+        )
+    return exposure
+
 
 def run_wep(
     intra_visit_id: int,
@@ -149,102 +418,169 @@ def run_wep(
     donut_diameter: int,
     timeout_get_image: float,
     max_distance_from_boresight: float = 500.0,
+    n_donuts: int = 1,
 ) -> typing.Tuple[Struct, Struct, Struct]:
-    best_effort_isr = BestEffortIsr()
+    tasks = get_wep_tasks(donut_diameter)
 
     # Get intra and extra results
-    exposure_intra = get_image(
-        parse_visit_id(intra_visit_id),
-        best_effort_isr,
-        timeout=timeout_get_image,
+    exposure_intra = get_wep_image(
+        intra_visit_id, tasks.best_effort_isr, timeout_get_image
     )
-    exposure_extra = get_image(
-        parse_visit_id(extra_visit_id),
-        best_effort_isr,
-        timeout=timeout_get_image,
+    exposure_extra = get_wep_image(
+        extra_visit_id, tasks.best_effort_isr, timeout_get_image
     )
 
-    quick_frame_measurement_config = QuickFrameMeasurementTask.ConfigClass()
-    quick_frame_measurement_task = QuickFrameMeasurementTask(
-        config=quick_frame_measurement_config
+    return run_wep_on_exposures(
+        exposure_intra,
+        exposure_extra,
+        donut_diameter,
+        max_distance_from_boresight=max_distance_from_boresight,
+        n_donuts=n_donuts,
     )
 
-    result_intra = quick_frame_measurement_task.run(
-        exposure_intra, donutDiameter=donut_diameter
-    )
-    result_extra = quick_frame_measurement_task.run(
-        exposure_extra, donutDiameter=donut_diameter
-    )
 
-    if not result_intra.success or not result_extra.success:
-        raise RuntimeError(
-            f"Centroid finding algorithm was unsuccessful. "
-            f"Intra image ({exposure_intra}) success is {result_intra.success}. "
-            f"Extra image ({exposure_extra}) success is {result_extra.success}."
-        )
+def run_wep_on_exposures(
+    exposure_intra: Exposure,
+    exposure_extra: Exposure,
+    donut_diameter: int,
+    max_distance_from_boresight: float = 500.0,
+    n_donuts: int = 1,
+    stage_timer: typing.Optional[StageTimer] = None,
+) -> typing.Tuple[Struct, Struct, Struct]:
+    """Run the wavefront estimation pipeline on a pair of intra/extra focal
+    exposures.
 
-    dx_boresight_extra, dy_boresight_extra = calculate_xy_offsets(
-        PointD(
-            result_extra.brightestObjCentroid[0], result_extra.brightestObjCentroid[1]
-        ),
-        boresight,
-    )
-    dx_boresight_intra, dy_boresight_intra = calculate_xy_offsets(
-        PointD(
-            result_intra.brightestObjCentroid[0], result_intra.brightestObjCentroid[1]
-        ),
-        boresight,
-    )
+    Parameters
+    ----------
+    exposure_intra : `Exposure`
+        Intra focal exposure, after ISR.
+    exposure_extra : `Exposure`
+        Extra focal exposure, after ISR.
+    donut_diameter : `int`
+        Donut diameter (in pixels).
+    max_distance_from_boresight : `float`, optional
+        Maximum distance between the donuts and the boresight (in pixels).
+    n_donuts : `int`, optional
+        Maximum number of donuts per exposure.
+    stage_timer : `StageTimer`, optional
+        Timer used to record the time spent in the detection, cutouts and
+        zernikes stages.
+
+    Returns
+    -------
+    result_intra : `Struct`
+        Quick frame measurement result for the intra focal exposure.
+    result_extra : `Struct`
+        Quick frame measurement result for the extra focal exposure.
+    task_output : `Struct`
+        Output of `CalcZernikesTask`.
+    """
+    if stage_timer is None:
+        stage_timer = StageTimer()
 
-    dr_boresight_extra = np.sqrt(dx_boresight_extra**2 + dy_boresight_extra**2)
-    dr_boresight_intra = np.sqrt(dx_boresight_intra**2 + dy_boresight_intra**2)
+    tasks = get_wep_tasks(donut_diameter)
 
-    extra_source_out_of_bounds = dr_boresight_extra > max_distance_from_boresight
-    intra_source_out_of_bounds = dr_boresight_intra > max_distance_from_boresight
+    with stage_timer("detection"):
+        quick_frame_measurement_task = tasks.quick_frame_measurement
 
-    if extra_source_out_of_bounds and intra_source_out_of_bounds:
-        raise RuntimeError(
-            "Both the intra and extra images detected sources are out of bounds. "
-            f"Should be closer than {max_distance_from_boresight}. "
-            f"Got {dr_boresight_extra} and {dr_boresight_intra}."
+        result_intra = quick_frame_measurement_task.run(
+            exposure_intra, donutDiameter=donut_diameter
         )
+        result_extra = quick_frame_measurement_task.run(
+            exposure_extra, donutDiameter=donut_diameter
+        )
+
+        if not result_intra.success or not result_extra.success:
+            raise RuntimeError(
+                f"Centroid finding algorithm was unsuccessful. "
+                f"Intra image ({exposure_intra}) success is {result_intra.success}. "
+                f"Extra image ({exposure_extra}) success is {result_extra.success}."
+            )
 
-    donut_catalog_intra = get_donut_catalog(
-        *(
-            (result_intra, exposure_intra)
-            if not intra_source_out_of_bounds
-            else (result_extra, exposure_extra)
+        dx_boresight_extra, dy_boresight_extra = calculate_xy_offsets(
+            PointD(
+                result_extra.brightestObjCentroid[0],
+                result_extra.brightestObjCentroid[1],
+            ),
+            boresight,
         )
-    )
-    donut_catalog_extra = get_donut_catalog(
-        *(
-            (result_extra, exposure_extra)
-            if not extra_source_out_of_bounds
-            else (result_intra, exposure_intra)
+        dx_boresight_intra, dy_boresight_intra = calculate_xy_offsets(
+            PointD(
+                result_intra.brightestObjCentroid[0],
+                result_intra.brightestObjCentroid[1],
+            ),
+            boresight,
         )
-    )
 
-    cut_out_config = CutOutDonutsScienceSensorTaskConfig()
-    cut_out_config.donutStampSize = donut_diameter
-    cut_out_config.opticalModel = "onAxis"
-    cut_out_config.initialCutoutPadding = 40
-    cut_out_task = CutOutDonutsScienceSensorTask(config=cut_out_config)
+        dr_boresight_extra = np.sqrt(dx_boresight_extra**2 + dy_boresight_extra**2)
+        dr_boresight_intra = np.sqrt(dx_boresight_intra**2 + dy_boresight_intra**2)
 
-    camera = Latiss.getCamera()
+        extra_source_out_of_bounds = (
+            dr_boresight_extra > max_distance_from_boresight
+        )
+        intra_source_out_of_bounds = (
+            dr_boresight_intra > max_distance_from_boresight
+        )
 
-    cut_out_output = cut_out_task.run(
-        [exposure_extra, exposure_intra],
-        [donut_catalog_extra, donut_catalog_intra],
-        camera,
-    )
+        if extra_source_out_of_bounds and intra_source_out_of_bounds:
+            raise RuntimeError(
+                "Both the intra and extra images detected sources are out of bounds. "
+                f"Should be closer than {max_distance_from_boresight}. "
+                f"Got {dr_boresight_extra} and {dr_boresight_intra}."
+            )
 
-    config = CalcZernikesTaskConfig()
-    config.doDonutStampSelector = False
-    task = CalcZernikesTask(config=config, name="Base Task")
+        donut_catalog_intra = get_donut_catalog(
+            *(
+                (result_intra, exposure_intra)
+                if not intra_source_out_of_bounds
+                else (result_extra, exposure_extra)
+            )
+        )
+        donut_catalog_extra = get_donut_catalog(
+            *(
+                (result_extra, exposure_extra)
+                if not extra_source_out_of_bounds
+                else (result_intra, exposure_intra)
+            )
+        )
 
-    task_output = task.run(
-        cut_out_output.donutStampsExtra, cut_out_output.donutStampsIntra
-    )
+        if n_donuts > 1 and not (
+            intra_source_out_of_bounds or extra_source_out_of_bounds
+        ):
+            centroids_intra, fluxes_intra = find_donuts(
+                exposure_intra, donut_diameter, n_donuts
+            )
+            centroids_extra, fluxes_extra = find_donuts(
+                exposure_extra, donut_diameter, n_donuts
+            )
+            intra_index, extra_index = match_donuts(
+                centroids_intra, centroids_extra, max_distance=donut_diameter
+            )
+            # Only replace the single donut catalogs if more than one pair of
+            # donuts is found.
+            if len(intra_index) > 1:
+                donut_catalog_intra = get_multi_donut_catalog(
+                    centroids_intra[intra_index],
+                    fluxes_intra[intra_index],
+                    exposure_intra,
+                )
+                donut_catalog_extra = get_multi_donut_catalog(
+                    centroids_extra[extra_index],
+                    fluxes_extra[extra_index],
+                    exposure_extra,
+                )
+
+    with stage_timer("cutouts"):
+        cut_out_output = tasks.cut_out.run(
+            [exposure_extra, exposure_intra],
+            [donut_catalog_extra, donut_catalog_intra],
+            tasks.camera,
+        )
+
+    with stage_timer("zernikes"):
+        task_output = tasks.calc_zernikes.run(
+            cut_out_output.donutStampsExtra, cut_out_output.donutStampsIntra
+        )
 
     return result_intra, result_extra, task_output
 
@@ -283,3 +619,195 @@ def get_donut_catalog(result: Struct, exposure: Exposure) -> astropy.table.QTabl
     donut_catalog = addVisitInfoToCatTable(exposure, donut_catalog)
 
     return donut_catalog
+
+
+def get_multi_donut_catalog(
+    centroids: np.ndarray, fluxes: np.ndarray, exposure: Exposure
+) -> astropy.table.QTable:
+    """Get the donut catalog, used by wep, from a list of donut centroids.
+
+    Parameters
+    ----------
+    centroids : `numpy.ndarray`
+        Array of shape (N, 2) with the x/y donut centroids (in pixels).
+    fluxes : `numpy.ndarray`
+        Donut fluxes.
+    exposure : `Exposure`
+        Exposure, to compute Ra/Dec and pass on visit info.
+
+    Returns
+    -------
+    donut_catalog : `astropy.table.QTable`
+        Donut catalog. Donuts are in the same order as the input, so
+        catalogs built for matched intra/extra donuts stay paired.
+    """
+    wcs = exposure.getWcs()
+    ra, dec = wcs.pixelToSkyArray(
+        centroids[:, 0],
+        centroids[:, 1],
+        degrees=False,
+    )
+    donut_catalog = QTable()
+    donut_catalog["coord_ra"] = ra * u.rad
+    donut_catalog["coord_dec"] = dec * u.rad
+    donut_catalog["centroid_x"] = centroids[:, 0] * u.pixel
+    donut_catalog["centroid_y"] = centroids[:, 1] * u.pixel
+    donut_catalog["source_flux"] = fluxes * u.nJy
+    donut_catalog.meta["blend_centroid_x"] = ""
+    donut_catalog.meta["blend_centroid_y"] = ""
+    donut_catalog = addVisitInfoToCatTable(exposure, donut_catalog)
+
+    return donut_catalog
+
+
+def find_donuts(
+    exposure: Exposure,
+    donut_diameter: int,
+    n_donuts: int,
+    isolation: float = 1.5,
+    n_sigma: float = 5.0,
+) -> typing.Tuple[np.ndarray, np.ndarray]:
+    """Find the brightest isolated donuts in an exposure.
+
+    The image is binned in blocks of a quarter of the donut diameter and the
+    brightest donut-sized windows are selected iteratively, masking the
+    windows overlapping each source. Donuts closer than ``isolation`` donut
+    diameters to a brighter source, or too close to the edge of the image to
+    be cut out, are rejected.
+
+    Parameters
+    ----------
+    exposure : `Exposure`
+        Exposure.
+    donut_diameter : `int`
+        Donut diameter (in pixels).
+    n_donuts : `int`
+        Maximum number of donuts to return.
+    isolation : `float`, optional
+        Minimum separation between donuts, in units of the donut diameter.
+    n_sigma : `float`, optional
+        Minimum significance of the donuts, in units of the noise of the
+        binned image.
+
+    Returns
+    -------
+    centroids : `numpy.ndarray`
+        Array of shape (N, 2), with N <= n_donuts, with the x/y centroid of
+        the donuts (in pixels), brightest first.
+    fluxes : `numpy.ndarray`
+        Background subtracted flux of the donuts.
+    """
+    image = exposure.image.array
+    background = np.median(image)
+
+    block = max(donut_diameter // 4, 1)
+    ny, nx = image.shape[0] // block, image.shape[1] // block
+    binned = (
+        image[: ny * block, : nx * block]
+        .reshape(ny, block, nx, block)
+        .sum(axis=(1, 3))
+        - background * block**2
+    )
+
+    # Sum over a donut-sized window of blocks with a cumulative sum.
+    window = max(donut_diameter // block, 1)
+    cumsum = np.pad(binned, ((1, 0), (1, 0))).cumsum(axis=0).cumsum(axis=1)
+    flux_map = (
+        cumsum[window:, window:]
+        - cumsum[:-window, window:]
+        - cumsum[window:, :-window]
+        + cumsum[:-window, :-window]
+    )
+
+    noise = 1.4826 * np.median(np.abs(binned - np.median(binned))) * window
+    threshold = n_sigma * noise
+
+    # Minimum distance (in blocks) between the window origin and the edge
+    # so the donut can be cut out with some padding.
+    edge = int(np.ceil(donut_diameter / block / 2))
+    separation = isolation * donut_diameter
+
+    centroids: typing.List[typing.Tuple[float, float]] = []
+    fluxes: typing.List[float] = []
+    sources: typing.List[typing.Tuple[float, float]] = []
+
+    flux_map = flux_map.copy()
+    half_window = window * block / 2.0
+    while len(centroids) < n_donuts:
+        iy, ix = np.unravel_index(np.argmax(flux_map), flux_map.shape)
+        flux = flux_map[iy, ix]
+        if flux < threshold:
+            break
+
+        center_x = ix * block + half_window
+        center_y = iy * block + half_window
+
+        # A window next to a masked region only partially overlaps a
+        # source too close to a brighter one, whose own window was masked.
+        neighbors = flux_map[max(iy - 1, 0) : iy + 2, max(ix - 1, 0) : ix + 2]
+        partial = bool(np.any(np.isneginf(neighbors)))
+
+        # Mask the windows overlapping the source, so neither the source nor
+        # part of it is selected again.
+        mask = window + 1
+        flux_map[
+            max(iy - mask, 0) : iy + mask + 1, max(ix - mask, 0) : ix + mask + 1
+        ] = -np.inf
+
+        too_close = partial or any(
+            np.hypot(center_x - x, center_y - y) < separation for x, y in sources
+        )
+        sources.append((center_x, center_y))
+
+        at_edge = (
+            min(ix, iy) < edge
+            or ix > flux_map.shape[1] - 1 - edge
+            or iy > flux_map.shape[0] - 1 - edge
+        )
+
+        if not (too_close or at_edge):
+            centroids.append((center_x, center_y))
+            fluxes.append(flux)
+
+    return np.array(centroids).reshape(-1, 2), np.array(fluxes)
+
+
+def match_donuts(
+    centroids_intra: np.ndarray, centroids_extra: np.ndarray, max_distance: float
+) -> typing.Tuple[np.ndarray, np.ndarray]:
+    """Match intra and extra focal donuts by position.
+
+    Parameters
+    ----------
+    centroids_intra : `numpy.ndarray`
+        Array of shape (N, 2) with the intra focal donut centroids.
+    centroids_extra : `numpy.ndarray`
+        Array of shape (M, 2) with the extra focal donut centroids.
+    max_distance : `float`
+        Maximum distance between matched donuts (in pixels).
+
+    Returns
+    -------
+    intra_index : `numpy.ndarray`
+        Indices of the matched intra focal donuts.
+    extra_index : `numpy.ndarray`
+        Indices of the matched extra focal donuts, in the same order as
+        ``intra_index``.
+    """
+    if len(centroids_intra) == 0 or len(centroids_extra) == 0:
+        return np.array([], dtype=int), np.array([], dtype=int)
+
+    distance = np.hypot(
+        centroids_intra[:, np.newaxis, 0] - centroids_extra[np.newaxis, :, 0],
+        centroids_intra[:, np.newaxis, 1] - centroids_extra[np.newaxis, :, 1],
+    )
+
+    intra_index = []
+    extra_index = []
+    for i in range(len(centroids_intra)):
+        j = int(np.argmin(distance[i]))
+        if distance[i, j] <= max_distance and j not in extra_index:
+            intra_index.append(i)
+            extra_index.append(j)
+
+    return np.array(intra_index, dtype=int), np.array(extra_index, dtype=int)
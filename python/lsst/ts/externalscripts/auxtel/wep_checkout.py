@@ -24,11 +24,21 @@ __all__ = ["WepCheckout"]
 import asyncio
 import concurrent.futures
 import functools
+import glob
+import time
+import typing
 
 import numpy as np
 import yaml
+from astropy.table import Table
 from lsst.ts import salobj
-from lsst.ts.externalscripts.auxtel.latiss_wep_align import run_wep
+from lsst.ts.externalscripts.auxtel.latiss_wep_align import (
+    run_wep,
+    warm_up_wep_worker,
+)
+
+# Index of the Zernike coefficients in the average wep output.
+ZERNIKE_INDICES = {0: "defocus", 3: "coma_x", 4: "coma_y"}
 
 
 class WepCheckout(salobj.BaseScript):
@@ -37,6 +47,11 @@ class WepCheckout(salobj.BaseScript):
     This script checks out the WEP pipeline by running the WEP pipeline
     with known intra/extra pair of images.
 
+    In batch mode, the pipeline runs on a list of intra/extra pairs across a
+    pool of worker processes, each with the pipeline tasks already built,
+    and a summary table with the Zernike coefficients, timings and failures
+    of each pair is produced.
+
     Parameters
     ----------
     index : `int`
@@ -53,6 +68,10 @@ class WepCheckout(salobj.BaseScript):
 
         self.timeout_get_image = 20.0
 
+        # Intra/extra visit id pairs processed in batch mode.
+        self.visit_pairs: typing.List[typing.Tuple[str, str]] = []
+        self.summary = None
+
     @classmethod
     def get_schema(cls):
         schema_yaml = """
@@ -102,6 +121,44 @@ class WepCheckout(salobj.BaseScript):
                   Tolerance for Zernike coefficients.
                 type: number
                 default: 20
+              batch:
+                description: >-
+                  Optional configuration section. Run the pipeline on many intra/extra
+                  pairs instead of validating the results of a single pair.
+                type: object
+                additionalProperties: false
+                properties:
+                  visit_pairs:
+                    description: List of [intra_visit_id, extra_visit_id] pairs.
+                    type: array
+                    default: []
+                    items:
+                      type: array
+                      minItems: 2
+                      maxItems: 2
+                      items:
+                        type: string
+                  visit_pairs_glob:
+                    description: >-
+                      Glob pattern of text files with additional pairs, one
+                      "intra_visit_id extra_visit_id" pair per line. Lines starting with
+                      "#" are ignored.
+                    anyOf:
+                      - type: string
+                      - type: "null"
+                    default: null
+                  max_workers:
+                    description: Number of worker processes.
+                    type: integer
+                    minimum: 1
+                    default: 4
+                  summary_file:
+                    description: >-
+                      Optional path of an ECSV file to write the summary table to.
+                    anyOf:
+                      - type: string
+                      - type: "null"
+                    default: null
             additionalProperties: false
         """
         return yaml.safe_load(schema_yaml)
@@ -125,17 +182,42 @@ class WepCheckout(salobj.BaseScript):
         # arbitrary factor here to make it larger
         self.side = config.side * 1.1  # normally 1.1
 
+        self.visit_pairs = []
+        if hasattr(config, "batch"):
+            self.visit_pairs = [tuple(pair) for pair in config.batch["visit_pairs"]]
+            if config.batch["visit_pairs_glob"] is not None:
+                self.visit_pairs += read_visit_pairs(config.batch["visit_pairs_glob"])
+
+            if len(self.visit_pairs) == 0:
+                raise salobj.ExpectedError(
+                    "Batch mode requires at least one intra/extra visit pair."
+                )
+
         self.config = config
 
     def set_metadata(self, metadata):
-        metadata.duration = 10.0
+        metadata.duration = (
+            10.0
+            if len(self.visit_pairs) == 0
+            else 10.0
+            * np.ceil(len(self.visit_pairs) / self.config.batch["max_workers"])
+        )
+
+    @property
+    def donut_diameter(self) -> int:
+        return int(np.ceil(self.side * self.dz / 1.5 / 2.0) * 2)
 
     async def run(self):
         """Run the WEP pipeline checkout."""
+
+        if len(self.visit_pairs) > 0:
+            await self.run_batch()
+            return
+
         self.log.info("Starting WEP pipeline checkout.")
 
         # Process images using WEP
-        donut_diameter = int(np.ceil(self.side * self.dz / 1.5 / 2.0) * 2)
+        donut_diameter = self.donut_diameter
 
         try:
 
@@ -170,12 +252,95 @@ class WepCheckout(salobj.BaseScript):
             self.log.error(error_msg)
             raise RuntimeError(error_msg)
 
+    async def run_batch(self):
+        """Run the WEP pipeline on all the intra/extra pairs and produce a
+        summary table.
+
+        Raises
+        ------
+        RuntimeError
+            If the pipeline failed for any of the pairs.
+        """
+        max_workers = self.config.batch["max_workers"]
+
+        self.log.info(
+            f"Starting WEP pipeline checkout on {len(self.visit_pairs)} pairs "
+            f"with {max_workers} workers."
+        )
+
+        loop = asyncio.get_running_loop()
+        start_time = time.monotonic()
+
+        # Build the pipeline tasks once in each worker, when it starts, so
+        # they are reused by all the pairs processed in the worker.
+        with concurrent.futures.ProcessPoolExecutor(
+            max_workers=max_workers,
+            initializer=warm_up_wep_worker,
+            initargs=(self.donut_diameter,),
+        ) as pool:
+            results = await asyncio.gather(
+                *[
+                    loop.run_in_executor(
+                        pool,
+                        functools.partial(
+                            run_wep_checkout,
+                            intra_visit_id,
+                            extra_visit_id,
+                            self.donut_diameter,
+                            self.timeout_get_image,
+                        ),
+                    )
+                    for intra_visit_id, extra_visit_id in self.visit_pairs
+                ],
+                return_exceptions=True,
+            )
+
+        rows = []
+        for (intra_visit_id, extra_visit_id), result in zip(self.visit_pairs, results):
+            if isinstance(result, BaseException):
+                # Failures to run the task in the pool, e.g. a broken worker.
+                result = dict(
+                    zernikes=dict.fromkeys(ZERNIKE_INDICES.values(), np.nan),
+                    duration=np.nan,
+                    error=repr(result),
+                )
+            rows.append(
+                dict(
+                    intra_visit_id=intra_visit_id,
+                    extra_visit_id=extra_visit_id,
+                    **result["zernikes"],
+                    duration=result["duration"],
+                    error=result["error"],
+                )
+            )
+
+        self.summary = Table(rows=rows)
+
+        failures = [row for row in rows if row["error"]]
+
+        self.log.info(
+            f"WEP pipeline checkout processed {len(rows)} pairs in "
+            f"{time.monotonic() - start_time:0.1f}s, with {len(failures)} failures.\n"
+            + "\n".join(self.summary.pformat(max_lines=-1, max_width=-1))
+        )
+
+        if self.config.batch["summary_file"] is not None:
+            self.summary.write(
+                self.config.batch["summary_file"], format="ascii.ecsv", overwrite=True
+            )
+
+        if len(failures) > 0:
+            raise RuntimeError(
+                f"WEP pipeline failed for {len(failures)} of {len(rows)} pairs: "
+                + ", ".join(
+                    f"{row['intra_visit_id']}/{row['extra_visit_id']}"
+                    for row in failures
+                )
+            )
+
     def validate_results(self, wep_results):
         """Validate the WEP results against expected values."""
-        # Mapping indices to expected Zernike coefficients
-        indices = {0: "defocus", 3: "coma_x", 4: "coma_y"}
-
-        for index, key in indices.items():
+        for index, key in ZERNIKE_INDICES.items():
             measured = wep_results[index] * 1e3  # nm
             expected = self.expected_zernikes[key]
             if abs(measured - expected) > self.threshold:
@@ -192,3 +357,84 @@ class WepCheckout(salobj.BaseScript):
                     f"range. Measured: {measured:.3f} nm. Expected: "
                     f" {expected:.3f} nm."
                 )
+
+
+def read_visit_pairs(pattern: str) -> typing.List[typing.Tuple[str, str]]:
+    """Read intra/extra visit id pairs from text files.
+
+    Parameters
+    ----------
+    pattern : `str`
+        Glob pattern of the files. Each line of the files has an
+        "intra_visit_id extra_visit_id" pair. Empty lines and lines starting
+        with "#" are ignored.
+
+    Returns
+    -------
+    visit_pairs : `list` [`tuple` [`str`, `str`]]
+        Visit id pairs, in the order of the sorted file names.
+
+    Raises
+    ------
+    salobj.ExpectedError
+        If a line does not have exactly two visit ids.
+    """
+    visit_pairs = []
+    for filename in sorted(glob.glob(pattern)):
+        with open(filename) as fp:
+            for line_number, line in enumerate(fp, start=1):
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                values = line.split()
+                if len(values) != 2:
+                    raise salobj.ExpectedError(
+                        f"Invalid visit pair in {filename}:{line_number}: {line!r}."
+                    )
+                visit_pairs.append((values[0], values[1]))
+
+    return visit_pairs
+
+
+def run_wep_checkout(
+    intra_visit_id: str,
+    extra_visit_id: str,
+    donut_diameter: int,
+    timeout_get_image: float,
+) -> typing.Dict[str, typing.Any]:
+    """Run the WEP pipeline on a pair of images, capturing failures.
+
+    Parameters
+    ----------
+    intra_visit_id : `str`
+        Intra focus visit id.
+    extra_visit_id : `str`
+        Extra focus visit id.
+    donut_diameter : `int`
+        Donut diameter (in pixels).
+    timeout_get_image : `float`
+        Timeout to retrieve each image (in seconds).
+
+    Returns
+    -------
+    result : `dict`
+        Dictionary with the measured ``zernikes`` (in nm, NaN on failure),
+        the ``duration`` of the processing (in seconds) and the ``error``
+        message (empty on success).
+    """
+    start_time = time.monotonic()
+    zernikes = dict.fromkeys(ZERNIKE_INDICES.values(), np.nan)
+    error = ""
+
+    try:
+        _, _, wep_results = run_wep(
+            intra_visit_id, extra_visit_id, donut_diameter, timeout_get_image
+        )
+        for index, key in ZERNIKE_INDICES.items():
+            zernikes[key] = wep_results.outputZernikesAvg[index] * 1e3  # nm
+    except Exception as e:
+        error = repr(e)
+
+    return dict(
+        zernikes=zernikes, duration=time.monotonic() - start_time, error=error
+    )
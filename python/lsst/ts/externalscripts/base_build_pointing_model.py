@@ -25,8 +25,14 @@ __all__ = [
 
 import abc
 import asyncio
+import concurrent.futures
+import dataclasses
 import enum
+import os
+import types
+import typing
 
+import astropy.table
 import astropy.units
 import healpy as hp
 import numpy as np
@@ -40,6 +46,46 @@ class GridType(enum.Enum):
 
     HEALPIX = "healpix"
     RADEC = "radec"
+    ADAPTIVE = "adaptive"
+
+
+@dataclasses.dataclass
+class PointData:
+    """Bookkeeping information for a grid position.
+
+    ``point_index`` is the order in which the position was acquired, which
+    allows measured offsets to be matched to the pointing data afterwards.
+    """
+
+    point_index: int
+    azimuth: float
+    elevation: float
+    rotator: float
+    image_id: typing.Optional[int] = None
+    timestamp: typing.Optional[float] = None
+    centered: bool = True
+    centroid_x: typing.Optional[float] = None
+    centroid_y: typing.Optional[float] = None
+    offset_x: typing.Optional[float] = None
+    offset_y: typing.Optional[float] = None
+
+
+POINT_DATA_COLUMNS = dict(
+    point_index=int,
+    timestamp=float,
+    image_id=int,
+    azimuth=float,
+    elevation=float,
+    rotator=float,
+    centered=bool,
+    centroid_x=float,
+    centroid_y=float,
+    offset_x=float,
+    offset_y=float,
+)
+
+# Basic pointing terms fitted incrementally as points are measured.
+POINTING_TERMS = ("IA", "IE", "CA", "NPAE", "AN", "AW", "TF")
 
 
 class BaseBuildPointingModel(BaseScript, metaclass=abc.ABCMeta):
@@ -76,6 +122,27 @@ class BaseBuildPointingModel(BaseScript, metaclass=abc.ABCMeta):
         self.elevation_grid = np.array([])
         self.azimuth_grid = np.array([])
 
+        # Candidate positions for the adaptive grid refinement.
+        self.elevation_candidates = np.array([])
+        self.azimuth_candidates = np.array([])
+
+        self.point_data = []
+        self.measurement_tasks = []
+
+        # Latest incremental fit of the pointing terms and whether it has
+        # reached the convergence criteria.
+        self.pointing_terms = None
+        self.converged = False
+        self.measurement_lock = asyncio.Lock()
+
+        # Task used to measure the position of the brightest source, built
+        # once in configure, and the executor used to run it without
+        # blocking the event loop.
+        self.quick_measurement = None
+        self.measurement_executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=1
+        )
+
     @property
     @abc.abstractmethod
     def tcs(self):
@@ -206,12 +273,14 @@ type: object
 properties:
     grid:
         type: string
-        enum: ["healpix", "radec"]
+        enum: ["healpix", "radec", "adaptive"]
         default: healpix
         description: >-
             Which type of spacial grid to use?
             healpix: Provide uniformly spaced pointing grid.
             radec: Non uniform but follow a more natural grid.
+            adaptive: Start with a coarse healpix grid and add positions where the
+            measured offsets are poorly constrained, until the time budget is exhausted.
     healpix_grid:
         type: object
         additionalProperties: false
@@ -232,6 +301,30 @@ properties:
                     Origin of the azimuth grid.
                     This allows users to rotate the entire grid in azimuth, hence allowing you to run a grid
                     with the same density (nside) in different occasions to map different regions of the sky.
+    adaptive_grid:
+        type: object
+        additionalProperties: false
+        description: Build pointing grid adaptively.
+        properties:
+            initial_nside:
+                type: integer
+                default: 2
+                minimum: 1
+                description: Healpix nside parameter of the initial, coarse, grid.
+            refine_nside:
+                type: integer
+                default: 8
+                minimum: 2
+                description: >-
+                    Healpix nside parameter of the dense grid from which new positions are
+                    selected. Must be larger than initial_nside.
+            time_budget:
+                type: number
+                default: 3600.
+                exclusiveMinimum: 0
+                description: >-
+                    Total time available for the grid (in seconds). New positions are added
+                    while the estimated time to observe them fits in the budget.
     radec_grid:
         type: object
         additionalProperties: false
@@ -326,6 +419,48 @@ properties:
         type: number
         default: 1.
         description: Exposure time for the acquisition images used to center the target in the FoV.
+    pipeline_measurements:
+        type: boolean
+        default: false
+        description: >-
+            If true, take a single acquisition image at each grid position, without centering
+            the source, and measure the source offset in the background while the telescope
+            slews to the next position. The positions are not registered with the pointing
+            component; the measured offsets are recorded in the point data file, which is
+            required, and used in the fit of the pointing terms. If false, center the source
+            before registering each position with the pointing component.
+    point_data_file:
+        description: >-
+            Optional path to an ECSV file where each measured point (commanded position, measured
+            centroid, offsets, timestamp and image id) is appended as soon as it is available.
+            If the file already exists, new points are appended to it.
+        anyOf:
+        - type: string
+        - type: "null"
+        default: null
+    convergence:
+        type: object
+        additionalProperties: false
+        description: >-
+            Stop the grid early once an incremental fit of the basic pointing terms
+            (IA, IE, CA, NPAE, AN, AW, TF) to the measured offsets converges.
+        properties:
+            stop_on_convergence:
+                type: boolean
+                default: false
+                description: Stop the grid once the fit converges?
+            min_points:
+                type: integer
+                default: 20
+                minimum: 8
+                description: Minimum number of measured points before checking for convergence.
+            threshold:
+                type: number
+                default: 1.0
+                exclusiveMinimum: 0
+                description: >-
+                    Largest formal uncertainty of the fitted pointing terms (in arcsec) for the fit
+                    to be considered converged.
     skip:
         type: integer
         default: 0
@@ -347,12 +482,17 @@ additionalProperties: false
         return yaml.safe_load(yaml_schema)
 
     def set_metadata(self, metadata):
-        metadata.nimages = self.grid_size * self.images_per_position
-        metadata.duration = metadata.nimages * (
+        time_per_image = (
             self.config.exposure_time
             + self.camera_readout_time
             + self.estimated_average_slew_time
         )
+        if GridType(self.config.grid) == GridType.ADAPTIVE:
+            metadata.duration = self.config.adaptive_grid["time_budget"]
+            metadata.nimages = int(metadata.duration // time_per_image)
+        else:
+            metadata.nimages = self.grid_size * self.images_per_position
+            metadata.duration = metadata.nimages * time_per_image
 
     async def configure(self, config):
         """Configure script.
@@ -366,15 +506,46 @@ additionalProperties: false
 
         self.config = config
 
+        if self.config.pipeline_measurements and self.config.point_data_file is None:
+            raise ExpectedError(
+                "pipeline_measurements requires point_data_file; the positions are "
+                "not registered with the pointing component, so the measured "
+                "offsets are only recorded in the point data file."
+            )
+
         # Instantiate BestEffortIsr
         self.best_effort_isr = self.get_best_effort_isr()
 
+        if self.quick_measurement is None:
+            self.quick_measurement = self.get_quick_measurement_task()
+
         self.configure_grid()
 
         self.rotator_sequence_gen = generate_rotator_sequence(
             self.config.rotator_sequence
         )
 
+    def get_quick_measurement_task(self):
+        """Get the task used to measure the position of the brightest source
+        in the acquisition images.
+
+        Returns
+        -------
+        quick_measurement : `QuickFrameMeasurementTask` or `None`
+            Measurement task or `None` if it cannot be imported.
+        """
+        try:
+            from lsst.pipe.tasks.quickFrameMeasurement import QuickFrameMeasurementTask
+        except ImportError:
+            self.log.warning(
+                "Cannot import QuickFrameMeasurementTask. "
+                "Script will not be able to measure source offsets."
+            )
+            return None
+
+        quick_measurement_config = QuickFrameMeasurementTask.ConfigClass()
+        return QuickFrameMeasurementTask(config=quick_measurement_config)
+
     def configure_grid(self):
         """Configure the observation grid."""
         self.log.info(f"Configuring {self.config.grid} grid.")
@@ -385,6 +556,8 @@ additionalProperties: false
             self._configure_grid_healpix()
         elif grid_type == GridType.RADEC:
             self._configure_grid_radec()
+        elif grid_type == GridType.ADAPTIVE:
+            self._configure_grid_adaptive()
         else:
             raise RuntimeError(f"Unexpected grid type: {grid_type!r}")
 
@@ -392,47 +565,86 @@ additionalProperties: false
 
     def _configure_grid_healpix(self):
         """Configure pointing grid using healpix algorithm."""
-        npix = hp.nside2npix(self.config.healpix_grid["nside"])
+        self.azimuth_grid, self.elevation_grid = self._get_healpix_grid(
+            nside=self.config.healpix_grid["nside"],
+            azimuth_origin=self.config.healpix_grid["azimuth_origin"],
+        )
+
+    def _configure_grid_adaptive(self):
+        """Configure the initial pointing grid and the candidate positions
+        for the adaptive algorithm.
+        """
+        initial_nside = self.config.adaptive_grid["initial_nside"]
+        refine_nside = self.config.adaptive_grid["refine_nside"]
+
+        if refine_nside <= initial_nside:
+            raise ExpectedError(
+                f"Adaptive grid refine_nside ({refine_nside}) must be larger "
+                f"than initial_nside ({initial_nside})."
+            )
+
+        self.azimuth_grid, self.elevation_grid = self._get_healpix_grid(
+            nside=initial_nside,
+            azimuth_origin=self.config.healpix_grid["azimuth_origin"],
+        )
+        self.azimuth_candidates, self.elevation_candidates = self._get_healpix_grid(
+            nside=refine_nside,
+            azimuth_origin=self.config.healpix_grid["azimuth_origin"],
+            jitter=False,
+        )
+
+    def _get_healpix_grid(self, nside, azimuth_origin, jitter=True):
+        """Build a pointing grid from healpix pixel centers.
+
+        Parameters
+        ----------
+        nside : `int`
+            Healpix nside parameter.
+        azimuth_origin : `float`
+            Origin of the azimuth grid (in deg).
+        jitter : `bool`, optional
+            Add a random jitter in elevation, of the size of the healpix
+            resolution?
+
+        Returns
+        -------
+        azimuth_grid : `numpy.ndarray`
+            Azimuth of the grid positions, sorted (in deg).
+        elevation_grid : `numpy.ndarray`
+            Elevation of the grid positions (in deg).
+        """
+        npix = hp.nside2npix(nside)
 
         healpy_indices = np.arange(npix)
 
         azimuth, elevation = hp.pix2ang(
-            nside=self.config.healpix_grid["nside"],
+            nside=nside,
             ipix=healpy_indices,
             lonlat=True,
         )
 
-        elevation += (np.random.rand(npix) - 0.5) * np.degrees(
-            hp.nside2resol(self.config.healpix_grid["nside"])
-        )
+        if jitter:
+            elevation += (np.random.rand(npix) - 0.5) * np.degrees(
+                hp.nside2resol(nside)
+            )
 
         position_in_search_area_mask = np.bitwise_and(
             elevation >= self.config.elevation_minimum,
             elevation <= self.config.elevation_maximum,
         )
 
-        self.elevation_grid = np.array(elevation[position_in_search_area_mask])
-        self.azimuth_grid = (
-            np.array(azimuth[position_in_search_area_mask])
-            + self.config.healpix_grid["azimuth_origin"]
+        elevation_grid = np.array(elevation[position_in_search_area_mask])
+        azimuth_grid = wrap_azimuth(
+            np.array(azimuth[position_in_search_area_mask]) + azimuth_origin,
+            azimuth_minimum=self.config.azimuth_minimum,
+            azimuth_maximum=self.config.azimuth_maximum,
         )
 
-        azimuth_bellow_minimum = self.azimuth_grid < self.config.azimuth_minimum
-        while azimuth_bellow_minimum.any():
-            self.azimuth_grid[azimuth_bellow_minimum] += 360
-            azimuth_bellow_minimum = self.azimuth_grid < self.config.azimuth_minimum
-
-        azimuth_above_maximum = self.azimuth_grid > self.config.azimuth_maximum
-        while azimuth_above_maximum.any():
-            self.azimuth_grid[azimuth_above_maximum] -= 360
-            azimuth_above_maximum = self.azimuth_grid > self.config.azimuth_maximum
-
         self.log.debug("Sorting data in azimuth.")
 
-        azimuth_sort = np.argsort(self.azimuth_grid)
+        azimuth_sort = np.argsort(azimuth_grid)
 
-        self.elevation_grid = self.elevation_grid[azimuth_sort]
-        self.azimuth_grid = self.azimuth_grid[azimuth_sort]
+        return azimuth_grid[azimuth_sort], elevation_grid[azimuth_sort]
 
     def _configure_grid_radec(self):
         """Configure pointing grid using radec algorithm."""
@@ -444,55 +656,56 @@ additionalProperties: false
                 f"Size of declination grid ({dec_grid_size}) must match ha grid definition ({ha_grid_size})."
             )
 
-        elevation_grid = []
-        azimuth_grid = []
-
-        reverse_ha = False
         dec_values = np.linspace(
             self.config.radec_grid["dec_grid"]["min"],
             self.config.radec_grid["dec_grid"]["max"],
             dec_grid_size,
         )
 
-        for dec, n_ha in zip(dec_values, self.config.radec_grid["ha_grid"]["n"]):
+        # Build the flattened (ha, dec) grid. The hour angle sequence is
+        # reversed on every other declination row, producing a serpentine
+        # pattern across the sky.
+        ha_rows = []
+        dec_rows = []
+        for row, (dec, n_ha) in enumerate(
+            zip(dec_values, self.config.radec_grid["ha_grid"]["n"])
+        ):
             ha_values = np.linspace(
                 self.config.radec_grid["ha_grid"]["min"],
                 self.config.radec_grid["ha_grid"]["max"],
                 n_ha,
             )
+            ha_rows.append(ha_values[::-1] if row % 2 else ha_values)
+            dec_rows.append(np.full(n_ha, dec))
+
+        ha_grid = np.concatenate(ha_rows)
+        dec_grid = np.concatenate(dec_rows)
+
+        # Convert the entire grid in a single transformation, using the same
+        # time for all points.
+        time = utils.astropy_time_from_tai_unix(utils.current_tai())
+        time.location = self.tcs.location
+        sidereal_time = time.sidereal_time("mean")
+        ra_grid = sidereal_time - ha_grid * astropy.units.hourangle
+
+        azel = self.tcs.azel_from_radec(ra=ra_grid, dec=dec_grid, time=time)
+
+        elevation = np.atleast_1d(azel.alt.to(astropy.units.degree).value)
+        azimuth = wrap_azimuth(
+            np.atleast_1d(azel.az.to(astropy.units.degree).value),
+            azimuth_minimum=self.config.azimuth_minimum,
+            azimuth_maximum=self.config.azimuth_maximum,
+        )
 
-            if reverse_ha:
-                ha_values = ha_values[::-1]
-
-            reverse_ha = not reverse_ha
-
-            for ha in ha_values:
-                time = utils.astropy_time_from_tai_unix(utils.current_tai())
-                time.location = self.tcs.location
-                sidereal_time = time.sidereal_time("mean")
-                ra = sidereal_time - ha * astropy.units.hourangle
-                azel = self.tcs.azel_from_radec(ra, dec)
-                if (
-                    self.config.elevation_minimum
-                    < azel.alt.to(astropy.units.degree).value
-                    < self.config.elevation_maximum
-                ):
-                    az = azel.az.to(astropy.units.degree).value
-                    if az > self.config.azimuth_maximum:
-                        while az > self.config.azimuth_maximum:
-                            az -= 360
-                        if az < self.config.azimuth_minimum:
-                            continue
-                    elif az < self.config.azimuth_minimum:
-                        while az < self.config.azimuth_minimum:
-                            az += 360
-                        if az > self.config.azimuth_maximum:
-                            continue
-                    elevation_grid.append(azel.alt.to(astropy.units.degree).value)
-                    azimuth_grid.append(az)
-
-        self.elevation_grid = np.array(elevation_grid)
-        self.azimuth_grid = np.array(azimuth_grid)
+        position_in_search_area_mask = (
+            (elevation > self.config.elevation_minimum)
+            & (elevation < self.config.elevation_maximum)
+            & (azimuth >= self.config.azimuth_minimum)
+            & (azimuth <= self.config.azimuth_maximum)
+        )
+
+        self.elevation_grid = elevation[position_in_search_area_mask]
+        self.azimuth_grid = azimuth[position_in_search_area_mask]
         sort_az = np.argsort(self.azimuth_grid)
 
         self.elevation_grid = self.elevation_grid[sort_az]
@@ -504,7 +717,7 @@ additionalProperties: false
 
     @property
     def images_per_position(self):
-        return 2
+        return 1 if self.config.pipeline_measurements else 2
 
     @property
     def camera_readout_time(self):
@@ -528,6 +741,8 @@ additionalProperties: false
             self.setup_instrument(),
         )
 
+        start_time = utils.current_tai()
+
         if self.config.skip > 0:
             self.log.info(
                 f"Skipping the initial {self.config.skip} points in the grid."
@@ -567,6 +782,123 @@ additionalProperties: false
             for rotator in rotator_sequence:
                 await self.execute_grid(azimuth, elevation, rotator)
 
+            if self.converged and self.config.convergence["stop_on_convergence"]:
+                self.log.info(
+                    f"Pointing terms converged after {len(self.point_data)} points; "
+                    f"skipping the remaining {self.grid_size - grid_index - 1} grid positions."
+                )
+                break
+
+        if GridType(self.config.grid) == GridType.ADAPTIVE and not (
+            self.converged and self.config.convergence["stop_on_convergence"]
+        ):
+            await self.refine_grid(
+                checkpoint_active=checkpoint_active,
+                start_time=start_time,
+                positions_executed=max(self.grid_size - self.config.skip, 0),
+            )
+
+        if self.config.pipeline_measurements:
+            await self.wait_measurements()
+
+    async def refine_grid(self, checkpoint_active, start_time, positions_executed):
+        """Add positions to the grid where the measured offsets are poorly
+        constrained, until the time budget is exhausted.
+
+        Parameters
+        ----------
+        checkpoint_active : `bool`
+            Use checkpoints?
+        start_time : `float`
+            Time when the grid started (TAI unix seconds).
+        positions_executed : `int`
+            Number of grid positions executed so far.
+        """
+        time_budget = self.config.adaptive_grid["time_budget"]
+
+        while len(self.azimuth_candidates) > 0:
+            elapsed_time = utils.current_tai() - start_time
+            time_per_position = elapsed_time / max(positions_executed, 1)
+
+            if elapsed_time + time_per_position > time_budget:
+                self.log.info(
+                    f"Time budget exhausted after {positions_executed} positions "
+                    f"({elapsed_time:0.1f}s of {time_budget:0.1f}s)."
+                )
+                break
+
+            candidate_index = self.select_refinement_position()
+
+            azimuth = self.azimuth_candidates[candidate_index]
+            elevation = self.elevation_candidates[candidate_index]
+            self.azimuth_candidates = np.delete(
+                self.azimuth_candidates, candidate_index
+            )
+            self.elevation_candidates = np.delete(
+                self.elevation_candidates, candidate_index
+            )
+
+            rotator_sequence = next(self.rotator_sequence_gen)
+
+            checkpoint_message = (
+                f"[refine {positions_executed+1}]:: "
+                f"az={azimuth:0.2f}, el={elevation:0.2f}, rot_seq={rotator_sequence}."
+            )
+
+            await self.handle_checkpoint(checkpoint_active, checkpoint_message)
+            for rotator in rotator_sequence:
+                await self.execute_grid(azimuth, elevation, rotator)
+
+            positions_executed += 1
+
+            if self.converged and self.config.convergence["stop_on_convergence"]:
+                self.log.info(
+                    f"Pointing terms converged after {len(self.point_data)} points."
+                )
+                break
+
+    def select_refinement_position(self):
+        """Select the candidate position where the pointing model is least
+        constrained.
+
+        Candidates are ranked by the angular distance to the nearest
+        registered point. When a fit of the pointing terms is available, the
+        distance is weighted by the fit residual of that point, relative to
+        the rms of the fit, favoring regions where the model performs
+        poorly.
+
+        Returns
+        -------
+        candidate_index : `int`
+            Index of the selected candidate position.
+        """
+        if len(self.point_data) == 0:
+            return 0
+
+        candidate_vectors = azel_to_unit_vector(
+            self.azimuth_candidates, self.elevation_candidates
+        )
+        point_vectors = azel_to_unit_vector(
+            np.array([point_data.azimuth for point_data in self.point_data]),
+            np.array([point_data.elevation for point_data in self.point_data]),
+        )
+
+        distance = np.arccos(
+            np.clip(candidate_vectors @ point_vectors.T, -1.0, 1.0)
+        )
+        nearest_point = np.argmin(distance, axis=1)
+        score = distance[np.arange(len(nearest_point)), nearest_point]
+
+        if self.pointing_terms is not None and self.pointing_terms.rms > 0.0:
+            residuals = np.zeros(len(self.point_data))
+            for point_index, residual in zip(
+                self.pointing_terms.point_indices, self.pointing_terms.residuals
+            ):
+                residuals[point_index] = residual
+            score *= 1.0 + residuals[nearest_point] / self.pointing_terms.rms
+
+        return int(np.argmax(score))
+
     async def handle_checkpoint(self, checkpoint_active, checkpoint_message):
         if checkpoint_active:
             await self.checkpoint(checkpoint_message)
@@ -597,11 +929,30 @@ additionalProperties: false
         if not success:
             return
 
-        await self.center_on_brightest_source()
+        point_data = PointData(
+            point_index=len(self.point_data),
+            azimuth=azimuth,
+            elevation=elevation,
+            rotator=rotator,
+        )
+
+        if self.config.pipeline_measurements:
+            await self.acquire_and_register(point_data)
+        else:
+            await self.center_on_brightest_source(point_data)
 
         self.iterations["successful"] += 1
 
-    async def center_on_brightest_source(self):
+    async def center_on_brightest_source(self, point_data=None):
+        """Center the brightest source in the field of view and register the
+        position with the pointing component.
+
+        Parameters
+        ----------
+        point_data : `PointData`, optional
+            Bookkeeping information for the current grid position. If
+            provided, it is updated with the measurement and recorded.
+        """
         self.camera.rem.atoods.evt_imageInOODS.flush()
 
         acquisition_image_ids = await self.camera.take_acq(
@@ -617,7 +968,9 @@ additionalProperties: false
             flush=False, timeout=self.image_in_oods_timeout
         )
 
-        offset_x, offset_y = await self.find_offset(image_id=acquisition_image_ids[0])
+        offset_x, offset_y = await self.find_offset(
+            image_id=acquisition_image_ids[0], point_data=point_data
+        )
 
         await self.tcs.offset_xy(x=offset_x, y=offset_y)
 
@@ -632,21 +985,278 @@ additionalProperties: false
 
         await self.tcs.add_point_data()
 
-    async def find_offset(self, image_id):
-        exposure = await self.get_image(image_id)
+        if point_data is not None:
+            point_data.image_id = acquisition_image_ids[0]
+            point_data.timestamp = utils.current_tai()
+            point_data.offset_x, point_data.offset_y = offset_x, offset_y
+            self.point_data.append(point_data)
+            self.record_point_data(point_data)
 
-        try:
-            from lsst.pipe.tasks.quickFrameMeasurement import QuickFrameMeasurementTask
-        except ImportError:
+    async def acquire_and_register(self, point_data):
+        """Take an acquisition image and schedule the offset measurement in
+        the background.
+
+        The source is not centered, so the position is not registered with
+        the pointing component (``add_point_data``), which would record an
+        uncentered position. Instead, the measured offset is recorded with
+        `record_point_data`.
+
+        Parameters
+        ----------
+        point_data : `PointData`
+            Bookkeeping information for the current grid position.
+        """
+        if all(task.done() for task in self.measurement_tasks):
+            # No measurement is waiting for an image, so any event in the
+            # queue is stale.
+            self.camera.rem.atoods.evt_imageInOODS.flush()
+
+        acquisition_image_ids = await self.camera.take_acq(
+            exptime=self.config.exposure_time,
+            n=1,
+            group_id=self.group_id,
+            reason="Acquisition"
+            + ("" if self.config.reason is None else f" {self.config.reason}"),
+            program=self.config.program,
+        )
+
+        point_data.image_id = acquisition_image_ids[0]
+        point_data.timestamp = utils.current_tai()
+        point_data.centered = False
+
+        self.point_data.append(point_data)
+        self.measurement_tasks.append(
+            asyncio.create_task(self.measure_point_data(point_data))
+        )
+
+    async def measure_point_data(self, point_data):
+        """Measure the offset of the brightest source for a grid position.
+
+        Measurements are executed one at a time, in the order they were
+        scheduled, after the image arrives in the OODS. Failures are logged
+        and leave the offsets unset.
+
+        Parameters
+        ----------
+        point_data : `PointData`
+            Bookkeeping information for the registered position. The
+            ``offset_x`` and ``offset_y`` attributes are updated in place.
+        """
+        async with self.measurement_lock:
+            try:
+                await self.wait_image_in_oods(point_data.image_id)
+                offset_x, offset_y = await self.find_offset(
+                    image_id=point_data.image_id, point_data=point_data
+                )
+            except Exception:
+                self.log.exception(
+                    f"Failed to measure offset for point {point_data.point_index} "
+                    f"(image {point_data.image_id})."
+                )
+                return
+
+            point_data.offset_x, point_data.offset_y = offset_x, offset_y
+
+            self.log.debug(
+                f"Point {point_data.point_index}: "
+                f"offset_x={offset_x:0.2f}, offset_y={offset_y:0.2f} arcsec."
+            )
+
+            self.record_point_data(point_data)
+
+    async def wait_image_in_oods(self, image_id):
+        """Wait for an image to arrive in the OODS.
+
+        Events of other images are skipped, so images must be waited for in
+        the order they were taken.
+
+        Parameters
+        ----------
+        image_id : `int`
+            Image id (``day_obs * 100000 + seq_num``).
+
+        Raises
+        ------
+        asyncio.TimeoutError
+            If the image does not arrive in the OODS in time.
+        """
+        day_obs, seq_num = divmod(int(image_id), 100000)
+        obsid_suffix = f"{day_obs}_{seq_num:06d}"
+
+        while True:
+            image_in_oods = await self.camera.rem.atoods.evt_imageInOODS.next(
+                flush=False, timeout=self.image_in_oods_timeout
+            )
+            if image_in_oods.obsid.endswith(obsid_suffix):
+                return
+
+    def record_point_data(self, point_data):
+        """Record a measured point.
+
+        Appends the point to the point data file, if one is configured, and
+        updates the incremental fit of the pointing terms.
+
+        Parameters
+        ----------
+        point_data : `PointData`
+            Measured point.
+        """
+        if self.config.point_data_file is not None:
+            try:
+                append_point_data(self.config.point_data_file, point_data)
+            except Exception:
+                self.log.exception(
+                    f"Failed to write point {point_data.point_index} to "
+                    f"{self.config.point_data_file}."
+                )
+
+        self.update_pointing_terms()
+
+    def get_azel_offset(self, point_data):
+        """Convert the measured offset of a point from the camera x/y frame
+        to azimuth/elevation.
+
+        The default implementation uses the bore sight angle of a Nasmyth
+        focus, ``elevation - rotator``, with the commanded rotator position.
+        This is an approximation, good enough for a quick fit of the pointing
+        terms.
+
+        Parameters
+        ----------
+        point_data : `PointData`
+            Measured point.
+
+        Returns
+        -------
+        offset_azimuth : `float`
+            Offset in azimuth, on sky (in arcsec).
+        offset_elevation : `float`
+            Offset in elevation (in arcsec).
+        """
+        bore_sight_angle = np.radians(point_data.elevation - point_data.rotator)
+
+        cos_angle, sin_angle = np.cos(bore_sight_angle), np.sin(bore_sight_angle)
+
+        offset_elevation = (
+            point_data.offset_x * cos_angle - point_data.offset_y * sin_angle
+        )
+        offset_azimuth = (
+            point_data.offset_x * sin_angle + point_data.offset_y * cos_angle
+        )
+
+        return offset_azimuth, offset_elevation
+
+    def update_pointing_terms(self):
+        """Update the incremental fit of the pointing terms with the measured
+        points and check for convergence.
+        """
+        measured_points = [
+            point_data
+            for point_data in self.point_data
+            if point_data.offset_x is not None
+        ]
+
+        if len(measured_points) < self.config.convergence["min_points"]:
+            return
+
+        azimuth = np.array([point_data.azimuth for point_data in measured_points])
+        elevation = np.array([point_data.elevation for point_data in measured_points])
+        offset_azimuth, offset_elevation = np.array(
+            [self.get_azel_offset(point_data) for point_data in measured_points]
+        ).T
+
+        self.pointing_terms = fit_pointing_terms(
+            azimuth=azimuth,
+            elevation=elevation,
+            offset_azimuth=offset_azimuth,
+            offset_elevation=offset_elevation,
+        )
+        self.pointing_terms.point_indices = [
+            point_data.point_index for point_data in measured_points
+        ]
+
+        terms_str = ", ".join(
+            [
+                f"{term}={value:0.2f}+/-{error:0.2f}"
+                for term, value, error in zip(
+                    POINTING_TERMS,
+                    self.pointing_terms.values,
+                    self.pointing_terms.errors,
+                )
+            ]
+        )
+        self.log.info(
+            f"Pointing terms from {len(measured_points)} points "
+            f"(rms={self.pointing_terms.rms:0.2f} arcsec): {terms_str}."
+        )
+
+        self.converged = bool(
+            np.all(self.pointing_terms.errors < self.config.convergence["threshold"])
+        )
+
+    async def wait_measurements(self):
+        """Wait for all pending background measurements and log a summary of
+        the measured positions.
+        """
+        if self.measurement_tasks:
+            self.log.info(
+                f"Waiting for {len(self.measurement_tasks)} background measurements."
+            )
+            await asyncio.gather(*self.measurement_tasks)
+            self.measurement_tasks = []
+
+        point_data_str = "Measured points (offsets in arcsec):\n"
+        for point_data in self.point_data:
+            offsets = (
+                "failed"
+                if point_data.offset_x is None
+                else f"offset_x={point_data.offset_x:0.2f}, "
+                f"offset_y={point_data.offset_y:0.2f}"
+            )
+            point_data_str += (
+                f"[{point_data.point_index}] image_id={point_data.image_id}, "
+                f"az={point_data.azimuth:0.2f}, el={point_data.elevation:0.2f}, "
+                f"rot={point_data.rotator:0.2f}, {offsets}.\n"
+            )
+
+        self.log.info(point_data_str)
+
+    async def find_offset(self, image_id, point_data=None):
+        """Find the offset required to center the brightest source in the
+        image.
+
+        Parameters
+        ----------
+        image_id : `int`
+            Image ID.
+        point_data : `PointData`, optional
+            If provided, updated with the measured centroid.
+
+        Returns
+        -------
+        dx_arcsec : `float`
+            X offset in arcseconds.
+        dy_arcsec : `float`
+            Y offset in arcseconds.
+        """
+        if self.quick_measurement is None:
             raise RuntimeError("Cannot import QuickFrameMeasurementTask.")
 
-        quick_measurement_config = QuickFrameMeasurementTask.ConfigClass()
-        quick_measurement = QuickFrameMeasurementTask(config=quick_measurement_config)
+        exposure = await self.get_image(image_id)
 
-        result = quick_measurement.run(exposure)
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(
+            self.measurement_executor, self.quick_measurement.run, exposure
+        )
 
         from lsst.geom import PointD
 
+        if point_data is not None:
+            point_data.centroid_x, point_data.centroid_y = (
+                result.brightestObjCentroid[0],
+                result.brightestObjCentroid[1],
+            )
+
         dx_arcsec, dy_arcsec = await self.calculate_offset(
             PointD(result.brightestObjCentroid[0], result.brightestObjCentroid[1])
         )
@@ -656,6 +1266,177 @@ additionalProperties: false
     async def run(self):
         await self.arun(checkpoint_active=True)
 
+    async def cleanup(self):
+        for task in self.measurement_tasks:
+            task.cancel()
+
+        self.measurement_executor.shutdown(wait=False, cancel_futures=True)
+
+
+def append_point_data(filename, point_data):
+    """Append a measured point to an ECSV file.
+
+    The file is created, with the ECSV header, if it does not exist. Points
+    are then appended one row at a time, so the file can be read at any time
+    during the run.
+
+    Parameters
+    ----------
+    filename : `str`
+        Path to the ECSV file.
+    point_data : `PointData`
+        Measured point.
+    """
+    if not os.path.exists(filename):
+        astropy.table.Table(
+            names=list(POINT_DATA_COLUMNS), dtype=list(POINT_DATA_COLUMNS.values())
+        ).write(filename, format="ascii.ecsv")
+
+    row = []
+    for column, dtype in POINT_DATA_COLUMNS.items():
+        value = getattr(point_data, column)
+        if value is None:
+            value = -1 if dtype is int else np.nan
+        row.append(str(dtype(value)))
+
+    with open(filename, "a") as fp:
+        fp.write(" ".join(row) + "\n")
+
+
+def fit_pointing_terms(azimuth, elevation, offset_azimuth, offset_elevation):
+    """Fit the basic pointing terms to a set of measured offsets.
+
+    Parameters
+    ----------
+    azimuth : `numpy.ndarray`
+        Azimuth of the measured points (in deg).
+    elevation : `numpy.ndarray`
+        Elevation of the measured points (in deg).
+    offset_azimuth : `numpy.ndarray`
+        Measured offsets in azimuth, on sky (in arcsec).
+    offset_elevation : `numpy.ndarray`
+        Measured offsets in elevation (in arcsec).
+
+    Returns
+    -------
+    pointing_terms : `types.SimpleNamespace`
+        Fit results, with the values and formal errors of the terms in
+        `POINTING_TERMS` (in arcsec), the residual of each point and the rms
+        of the residuals (in arcsec).
+
+    Notes
+    -----
+    The model uses the small-angle form of the basic terms::
+
+        dA cos(E) = -IA cos(E) + CA + NPAE sin(E)
+                    + AN sin(E) sin(A) - AW sin(E) cos(A)
+        dE = IE + AN cos(A) + AW sin(A) + TF cos(E)
+    """
+    az = np.radians(azimuth)
+    el = np.radians(elevation)
+    zeros = np.zeros_like(az)
+    ones = np.ones_like(az)
+
+    # Columns follow the order in POINTING_TERMS.
+    design_azimuth = np.column_stack(
+        [
+            -np.cos(el),
+            zeros,
+            ones,
+            np.sin(el),
+            np.sin(el) * np.sin(az),
+            -np.sin(el) * np.cos(az),
+            zeros,
+        ]
+    )
+    design_elevation = np.column_stack(
+        [zeros, ones, zeros, zeros, np.cos(az), np.sin(az), np.cos(el)]
+    )
+
+    design = np.vstack([design_azimuth, design_elevation])
+    measured = np.concatenate([offset_azimuth, offset_elevation])
+
+    values, _, _, _ = np.linalg.lstsq(design, measured, rcond=None)
+
+    residuals = measured - design @ values
+    degrees_of_freedom = max(len(measured) - len(values), 1)
+    variance = np.sum(residuals**2) / degrees_of_freedom
+    covariance = variance * np.linalg.pinv(design.T @ design)
+
+    residuals_azimuth, residuals_elevation = np.split(residuals, 2)
+
+    return types.SimpleNamespace(
+        values=values,
+        errors=np.sqrt(np.abs(np.diag(covariance))),
+        residuals=np.hypot(residuals_azimuth, residuals_elevation),
+        rms=np.sqrt(np.mean(residuals**2)),
+    )
+
+
+def azel_to_unit_vector(azimuth, elevation):
+    """Convert azimuth/elevation to cartesian unit vectors.
+
+    Parameters
+    ----------
+    azimuth : `numpy.ndarray`
+        Azimuth (in deg).
+    elevation : `numpy.ndarray`
+        Elevation (in deg).
+
+    Returns
+    -------
+    unit_vectors : `numpy.ndarray`
+        Array of shape (N, 3) with the unit vectors.
+    """
+    az = np.radians(azimuth)
+    el = np.radians(elevation)
+    return np.column_stack(
+        [np.cos(el) * np.cos(az), np.cos(el) * np.sin(az), np.sin(el)]
+    )
+
+
+def wrap_azimuth(azimuth, azimuth_minimum, azimuth_maximum):
+    """Wrap azimuth values into the range allowed by the azimuth limits.
+
+    Values below ``azimuth_minimum`` are increased by the smallest multiple
+    of 360 degrees that brings them above the minimum. Values above
+    ``azimuth_maximum`` are then decreased by the smallest multiple of 360
+    degrees that brings them below the maximum.
+
+    Parameters
+    ----------
+    azimuth : `numpy.ndarray`
+        Azimuth values (in deg).
+    azimuth_minimum : `float`
+        Lower azimuth limit (in deg).
+    azimuth_maximum : `float`
+        Upper azimuth limit (in deg).
+
+    Returns
+    -------
+    wrapped_azimuth : `numpy.ndarray`
+        Wrapped azimuth values (in deg).
+
+    Notes
+    -----
+    If the range defined by the limits is smaller than 360 degrees, some
+    values may still fall outside the limits after wrapping. It is up to
+    the caller to mask them out.
+    """
+    azimuth = np.array(azimuth, dtype=float)
+
+    below_minimum = azimuth < azimuth_minimum
+    azimuth[below_minimum] += 360.0 * np.ceil(
+        (azimuth_minimum - azimuth[below_minimum]) / 360.0
+    )
+
+    above_maximum = azimuth > azimuth_maximum
+    azimuth[above_maximum] -= 360.0 * np.ceil(
+        (azimuth[above_maximum] - azimuth_maximum) / 360.0
+    )
+
+    return azimuth
+
 
 def generate_rotator_sequence(sequence):
     """A generator that cycles through the input sequence forward and
@@ -23,6 +23,7 @@ __all__ = ["BaseTakeTwilightFlats"]
 import abc
 import asyncio
 import functools
+import inspect
 import types
 
 import numpy as np
@@ -662,3 +663,11 @@ class BaseTakeTwilightFlats(BaseBlockScript, metaclass=abc.ABCMeta):
 
         await self.assert_feasibility()
         await self.take_twilight_flats()
+
+    async def cleanup(self):
+        await super().cleanup()
+
+        # Only the asyncio ConsDB clients have a close coroutine.
+        client_close = getattr(self.client, "close", None)
+        if inspect.iscoroutinefunction(client_close):
+            await client_close()
@@ -0,0 +1,298 @@
+# This file is part of ts_externalscripts
+#
+# Developed for the LSST Telescope and Site Systems.
+# This product includes software developed by the LSST Project
+# (https://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+__all__ = ["AsyncConsDbClient"]
+
+import asyncio
+import logging
+import time
+import typing
+
+import aiohttp
+from astropy.table import Table
+
+
+class AsyncConsDbClient:
+    """Asyncio client for the ConsDB query service.
+
+    A single HTTP session, with a pool of connections, is used for all the
+    queries. Methods that wait for data to become available poll the
+    service with an exponential backoff, without blocking the event loop or
+    tying up executor threads.
+
+    Parameters
+    ----------
+    url : `str`
+        Base URL of the ConsDB query service, e.g.
+        http://consdb-pq.consdb:8080/consdb
+    poll_interval : `float`, optional
+        Initial interval between polls (in seconds).
+    max_poll_interval : `float`, optional
+        Maximum interval between polls (in seconds).
+    backoff_factor : `float`, optional
+        Factor by which the interval between polls grows after each poll.
+    max_connections : `int`, optional
+        Maximum number of connections in the pool.
+    request_timeout : `float`, optional
+        Timeout of each request to the service (in seconds).
+    log : `logging.Logger`, optional
+        Parent logger.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        poll_interval: float = 0.5,
+        max_poll_interval: float = 5.0,
+        backoff_factor: float = 1.5,
+        max_connections: int = 4,
+        request_timeout: float = 30.0,
+        log: logging.Logger | None = None,
+    ) -> None:
+        self.url = url.rstrip("/")
+        self.poll_interval = poll_interval
+        self.max_poll_interval = max_poll_interval
+        self.backoff_factor = backoff_factor
+        self.max_connections = max_connections
+        self.request_timeout = request_timeout
+
+        self.log = (
+            log.getChild(type(self).__name__)
+            if log is not None
+            else logging.getLogger(type(self).__name__)
+        )
+
+        self._session = None
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        """HTTP session, created on first use."""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.max_connections),
+                timeout=aiohttp.ClientTimeout(total=self.request_timeout),
+            )
+        return self._session
+
+    async def query(self, query: str) -> Table:
+        """Run a query.
+
+        Parameters
+        ----------
+        query : `str`
+            SQL query.
+
+        Returns
+        -------
+        `astropy.table.Table`
+            Result of the query.
+
+        Raises
+        ------
+        RuntimeError
+            If the query fails, times out or returns a malformed response.
+        """
+        try:
+            async with self.session.post(
+                f"{self.url}/query", json=dict(query=query)
+            ) as response:
+                response.raise_for_status()
+                result = await response.json()
+            data, columns = result["data"], result["columns"]
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            raise RuntimeError(f"ConsDB query failed: {query}") from e
+        except (ValueError, KeyError, TypeError) as e:
+            raise RuntimeError(f"Malformed ConsDB response to query: {query}") from e
+
+        if len(data) == 0:
+            return Table(names=columns)
+
+        return Table(rows=data, names=columns)
+
+    async def poll(
+        self,
+        query: str,
+        is_done: typing.Callable[[Table], bool],
+        timeout: float,
+    ) -> Table:
+        """Run a query until its result is complete or the timeout expires.
+
+        Failed queries are logged and retried. Each query is limited to the
+        time left before the timeout.
+
+        Parameters
+        ----------
+        query : `str`
+            SQL query.
+        is_done : `callable`
+            Function that receives the result of the query and returns True
+            if it is complete.
+        timeout : `float`
+            Timeout (in seconds).
+
+        Returns
+        -------
+        `astropy.table.Table`
+            Last result of the query, which may be incomplete if the timeout
+            expired. Empty if no query succeeded.
+        """
+        time_end = time.monotonic() + timeout
+        poll_interval = self.poll_interval
+        result = Table()
+
+        while True:
+            try:
+                result = await asyncio.wait_for(
+                    self.query(query), timeout=time_end - time.monotonic()
+                )
+                if is_done(result):
+                    return result
+            except asyncio.TimeoutError:
+                self.log.debug(f"ConsDB query timed out: {query}.")
+            except RuntimeError as e:
+                self.log.debug(f"{e}; retrying.")
+
+            time_left = time_end - time.monotonic()
+            if time_left <= 0.0:
+                return result
+
+            await asyncio.sleep(min(poll_interval, time_left))
+            poll_interval = min(
+                poll_interval * self.backoff_factor, self.max_poll_interval
+            )
+
+    async def wait_for_row_to_exist(self, query: str, timeout: float) -> Table:
+        """Wait for a query to return at least one row.
+
+        Parameters
+        ----------
+        query : `str`
+            SQL query.
+        timeout : `float`
+            Timeout (in seconds).
+
+        Returns
+        -------
+        `astropy.table.Table`
+            Result of the query, empty if the timeout expired.
+        """
+        return await self.poll(query, lambda table: len(table) > 0, timeout)
+
+    async def wait_for_item_in_row(
+        self, query: str, item: str, timeout: float
+    ) -> typing.Any:
+        """Wait for an item of the first row returned by a query to be
+        available.
+
+        Parameters
+        ----------
+        query : `str`
+            SQL query.
+        item : `str`
+            Name of the column.
+        timeout : `float`
+            Timeout (in seconds).
+
+        Returns
+        -------
+        value
+            Value of the item in the first row.
+
+        Raises
+        ------
+        asyncio.TimeoutError
+            If the item is not available before the timeout.
+        """
+
+        def is_done(table):
+            return (
+                len(table) > 0
+                and item in table.colnames
+                and table[0][item] is not None
+            )
+
+        result = await self.poll(query, is_done, timeout)
+
+        if not is_done(result):
+            raise asyncio.TimeoutError(
+                f"Timeout waiting for {item} to be available in ConsDB."
+            )
+
+        return result[0][item]
+
+    async def wait_for_rows(
+        self,
+        table: str,
+        columns: list[str],
+        ids: list[int],
+        timeout: float,
+        id_column: str = "exposure_id",
+    ) -> dict[int, typing.Any]:
+        """Wait for the rows of several exposures, with a single query per
+        poll.
+
+        Only rows with all the columns available (not None) are considered
+        complete.
+
+        Parameters
+        ----------
+        table : `str`
+            Name of the table, e.g. cdb_lsstcam.exposure.
+        columns : `list` [`str`]
+            Columns to retrieve.
+        ids : `list` [`int`]
+            Ids of the rows.
+        timeout : `float`
+            Timeout (in seconds).
+        id_column : `str`, optional
+            Name of the column with the ids.
+
+        Returns
+        -------
+        `dict` [`int`, `astropy.table.Row`]
+            Complete rows by id. Rows that are not complete when the timeout
+            expires are not included.
+        """
+        query = (
+            f"SELECT {id_column}, {', '.join(columns)} FROM {table} "
+            f"WHERE {id_column} IN ({', '.join(str(int(_id)) for _id in ids)})"
+        )
+
+        def get_complete_rows(result):
+            return {
+                int(row[id_column]): row
+                for row in result
+                if all(row[column] is not None for column in columns)
+            }
+
+        result = await self.poll(
+            query,
+            lambda result: len(get_complete_rows(result)) == len(set(ids)),
+            timeout,
+        )
+
+        return get_complete_rows(result)
+
+    async def close(self) -> None:
+        """Close the HTTP session."""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
@@ -22,6 +22,7 @@ __all__ = [
     "BuildPointingModel",
 ]
 
+from lsst.ts import salobj, utils
 from lsst.ts.externalscripts.base_build_pointing_model import BaseBuildPointingModel
 from lsst.ts.observatory.control.maintel.lsstcam import LSSTCam, LSSTCamUsages
 from lsst.ts.observatory.control.maintel.mtcs import MTCS, MTCSUsages
@@ -81,6 +82,9 @@ class BuildPointingModel(BaseBuildPointingModel):
         schema = super().get_schema()
         # Update the program default for AuxTel
         schema["properties"]["program"]["default"] = "MTPTMODEL"
+        schema["properties"]["pipeline_measurements"][
+            "description"
+        ] = "Not supported for the Main Telescope, must be false."
         return schema
 
     async def configure(self, config):
@@ -91,6 +95,12 @@ class BuildPointingModel(BaseBuildPointingModel):
         config : `types.SimpleNamespace`
             Script configuration, as defined by `schema`.
         """
+        if config.pipeline_measurements:
+            raise salobj.ExpectedError(
+                "pipeline_measurements is not supported for the Main Telescope, "
+                "images are not measured."
+            )
+
         if self._mtcs is None:
             self._mtcs = MTCS(
                 domain=self.domain,
@@ -153,9 +163,17 @@ class BuildPointingModel(BaseBuildPointingModel):
 
         return True
 
-    async def center_on_brightest_source(self):
+    async def center_on_brightest_source(self, point_data=None):
+        """Take an image and register the position with the pointing
+        component.
 
-        await self.camera.take_acq(
+        Parameters
+        ----------
+        point_data : `PointData`, optional
+            Bookkeeping information for the current grid position. If
+            provided, it is updated with the image id and recorded.
+        """
+        image_ids = await self.camera.take_acq(
             exptime=self.config.exposure_time,
             n=1,
             group_id=self.group_id,
@@ -165,3 +183,10 @@ class BuildPointingModel(BaseBuildPointingModel):
         )
 
         await self.tcs.add_point_data()
+
+        if point_data is not None:
+            point_data.image_id = image_ids[0]
+            point_data.timestamp = utils.current_tai()
+            point_data.centered = False
+            self.point_data.append(point_data)
+            self.record_point_data(point_data)
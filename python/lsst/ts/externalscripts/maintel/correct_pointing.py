@@ -18,13 +18,14 @@
 #
 # You should have received a copy of the GNU General Public License
 
-__all__ = ["CorrectPointing"]
+__all__ = ["CorrectPointing", "PointingErrorEstimator", "RubinTVSidecarWatcher"]
 
 import asyncio
+import collections
+import concurrent.futures
 import enum
-import functools
 import json
-import warnings
+import multiprocessing
 from pathlib import Path
 
 import astropy.units as u
@@ -36,10 +37,16 @@ from lsst.ts.observatory.control.maintel.mtcs import MTCS, MTCSUsages
 from lsst.ts.salobj.base_script import HEARTBEAT_INTERVAL, BaseScript
 from lsst.ts.utils import current_tai
 
-try:
-    from lsst.summit.utils import ConsDbClient
-except ImportError:
-    warnings.warn("Cannot import ConsDB client. Script will not work.")
+from ..consdb_client import AsyncConsDbClient
+from .local_wcs_solver import (
+    mean_coordinates,
+    solve_boresight,
+    warm_up_local_solver_worker,
+)
+
+# Default configuration of the local WCS solver; the central detectors of
+# the R22 raft.
+LOCAL_SOLVER_DEFAULTS = dict(detectors=[93, 94, 95], max_workers=3, timeout=60.0)
 
 
 class OffsetSource(enum.IntEnum):
@@ -49,6 +56,208 @@ class OffsetSource(enum.IntEnum):
     ConsDB = enum.auto()
 
 
+class RubinTVSidecarWatcher:
+    """Watch a RubinTV sidecar metadata file.
+
+    The file is only parsed again when its modification time, size or inode
+    changes, and the parsed document is kept between calls, so waiting for
+    an entry does not re-read the file on every poll. Parsing runs in an
+    executor, so large files do not block the event loop.
+
+    Parameters
+    ----------
+    path : `str` or `pathlib.Path`
+        Path to the sidecar metadata file.
+    poll_interval : `float`, optional
+        Interval between checks for changes in the file (in seconds).
+    """
+
+    def __init__(self, path, poll_interval: float = HEARTBEAT_INTERVAL) -> None:
+        self.path = Path(path)
+        self.poll_interval = poll_interval
+
+        self.data = dict()
+        self.n_parsed = 0
+        self._file_state = None
+
+    @property
+    def exists(self) -> bool:
+        """Has the file been found and parsed?"""
+        return self._file_state is not None
+
+    def refresh(self) -> bool:
+        """Parse the file again if it changed since the last call.
+
+        Returns
+        -------
+        `bool`
+            True if the document was updated.
+        """
+        try:
+            stat = self.path.stat()
+        except FileNotFoundError:
+            return False
+
+        file_state = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if file_state == self._file_state:
+            return False
+
+        try:
+            with open(self.path) as fp:
+                data = json.load(fp)
+        except (OSError, ValueError):
+            # The file may be in the middle of being written, leave the file
+            # state unchanged so it is parsed again on the next call.
+            return False
+
+        self.data = data
+        self.n_parsed += 1
+        self._file_state = file_state
+        return True
+
+    def get_entry(self, seq_num: int, columns: list[str]) -> dict | None:
+        """Get the entry of a sequence number from the parsed document.
+
+        Parameters
+        ----------
+        seq_num : `int`
+            Sequence number of the exposure.
+        columns : `list` [`str`]
+            Columns that must be available (not None) in the entry.
+
+        Returns
+        -------
+        `dict` or `None`
+            Entry, or None if it or any of the columns are not available.
+        """
+        entry = self.data.get(f"{seq_num}")
+
+        if entry is None or any(entry.get(column) is None for column in columns):
+            return None
+
+        return entry
+
+    async def wait_for_entry(
+        self, seq_num: int, columns: list[str], timeout: float
+    ) -> dict:
+        """Wait for the entry of a sequence number to be available.
+
+        Parameters
+        ----------
+        seq_num : `int`
+            Sequence number of the exposure.
+        columns : `list` [`str`]
+            Columns that must be available (not None) in the entry.
+        timeout : `float`
+            Timeout (in seconds).
+
+        Returns
+        -------
+        `dict`
+            Entry of the sequence number.
+
+        Raises
+        ------
+        TimeoutError
+            If the entry is not available before the timeout.
+        """
+        loop = asyncio.get_running_loop()
+        time_start = current_tai()
+
+        while True:
+            entry = self.get_entry(seq_num, columns)
+            if entry is not None:
+                return entry
+
+            if current_tai() - time_start > timeout:
+                if not self.exists:
+                    raise TimeoutError(
+                        f"Timeout waiting for RubinTV data file ({self.path}) to exists."
+                    )
+                raise TimeoutError(
+                    "Timeout waiting for offsets to be available in RubinTV."
+                )
+
+            if not await loop.run_in_executor(None, self.refresh):
+                await asyncio.sleep(self.poll_interval)
+
+
+class PointingErrorEstimator:
+    """Kalman filter estimate of the pointing error.
+
+    The pointing error is modeled as a constant (up to a small random drift)
+    offset in azimuth and elevation. Each measurement is the pointing error
+    minus the corrections that were applied when the image was taken, so
+    images taken before the latest corrections are still useful.
+
+    Parameters
+    ----------
+    measurement_noise : `float`, optional
+        Uncertainty of each measurement (in arcsec).
+    process_noise : `float`, optional
+        Drift of the pointing error between measurements (in arcsec).
+    """
+
+    def __init__(
+        self, measurement_noise: float = 0.3, process_noise: float = 0.05
+    ) -> None:
+        self.measurement_noise = measurement_noise
+        self.process_noise = process_noise
+
+        # Pointing error, in azimuth (on sky) and elevation (in arcsec).
+        self.estimate = np.zeros(2)
+        self.variance = np.inf
+        # Corrections applied so far, in azimuth and elevation (in arcsec).
+        self.correction = np.zeros(2)
+        self.n_measurements = 0
+
+    @property
+    def residual(self) -> np.ndarray:
+        """Estimated pointing error that is still to be corrected, in
+        azimuth and elevation (in arcsec).
+        """
+        return self.estimate - self.correction
+
+    @property
+    def uncertainty(self) -> float:
+        """Uncertainty of the estimate (in arcsec)."""
+        return float(np.sqrt(self.variance))
+
+    def update(self, measured_offset: np.ndarray, correction: np.ndarray) -> None:
+        """Update the estimate with a measurement.
+
+        Parameters
+        ----------
+        measured_offset : `numpy.ndarray`
+            Measured offset in azimuth and elevation (in arcsec).
+        correction : `numpy.ndarray`
+            Corrections that were applied when the image was taken, in
+            azimuth and elevation (in arcsec).
+        """
+        measured_error = np.asarray(measured_offset) + np.asarray(correction)
+
+        if self.n_measurements == 0:
+            self.estimate = measured_error
+            self.variance = self.measurement_noise**2
+        else:
+            variance = self.variance + self.process_noise**2
+            gain = variance / (variance + self.measurement_noise**2)
+            self.estimate = self.estimate + gain * (measured_error - self.estimate)
+            self.variance = (1.0 - gain) * variance
+
+        self.n_measurements += 1
+
+    def add_correction(self, offset: np.ndarray) -> None:
+        """Record a commanded correction.
+
+        Parameters
+        ----------
+        offset : `numpy.ndarray`
+            Offset in azimuth and elevation (in arcsec).
+        """
+        self.correction = self.correction + np.asarray(offset)
+
+
 class CorrectPointing(BaseScript):
     """Measure and apply pointing corrections for the Simonyi Telescope.
 
@@ -61,6 +270,14 @@ class CorrectPointing(BaseScript):
     3. Calculate offset between measured and target position
     4. Apply offset to pointing component with absorb=True
     5. Repeat until offsets are below threshold
+
+    In predictive mode, once the offset is below a threshold, the next image
+    is taken without waiting for the measurement of the previous one, and the
+    measurements are combined with a `PointingErrorEstimator`.
+
+    Optionally, the WCS of a few central detectors is also solved in the
+    script, in a process pool, and the first solution between ConsDB and the
+    local solver is used.
     """
 
     offset_source = OffsetSource.ConsDB
@@ -74,6 +291,14 @@ class CorrectPointing(BaseScript):
         self.mtcs = None
         self.lsstcam = None
         self.consdb_client = None
+        # RubinTV sidecar watchers, by file path, kept between iterations.
+        self.rubintv_watchers = dict()
+        self.local_solver = None
+        self.local_solver_executor = None
+        # Id of the exposure being solved, shared with the solver processes,
+        # and the solves of the last exposure.
+        self.local_solver_active_exposure = None
+        self.local_solver_futures = []
 
         self.tolerance_arcsec = 1.0
         self.max_iterations = 5
@@ -81,6 +306,9 @@ class CorrectPointing(BaseScript):
         self.consdb_timeout = 60.0
         self.consdb_max_retries = 3
         self.filter = None
+        self.predictive = False
+        self.predictive_threshold_arcsec = 10.0
+        self.measurement_noise_arcsec = 0.3
 
     @classmethod
     def get_schema(cls):
@@ -135,6 +363,69 @@ class CorrectPointing(BaseScript):
                 default: {cls.offset_source.name}
                 type: string
                 enum: [{offset_sources}]
+            predictive:
+                type: boolean
+                description: >-
+                    If true, once the pointing offset is below
+                    predictive_threshold_arcsec, take the next image without
+                    waiting for the measurement of the previous one, and combine
+                    the measurements with a Kalman filter estimate of the
+                    pointing error. In this mode max_iterations is the maximum
+                    number of images.
+                default: false
+            predictive_threshold_arcsec:
+                type: number
+                description: >-
+                    Pointing offset (in arcsec) below which images are taken
+                    without waiting for the measurement of the previous one, if
+                    predictive is true.
+                default: 10.0
+                minimum: 0.0
+            measurement_noise_arcsec:
+                type: number
+                description: >-
+                    Uncertainty of the pointing measurements (in arcsec), used
+                    to combine them if predictive is true.
+                default: 0.3
+                minimum: 0.01
+            local_solver:
+                description: >-
+                    Solve the WCS of a few central detectors in the script, as
+                    a fallback for Rapid Analysis, and use the first solution
+                    between ConsDB and the local solver. Only used if
+                    offset_source is ConsDB. If null, only ConsDB is used.
+                default: null
+                anyOf:
+                  - type: "null"
+                  - type: object
+                    properties:
+                        index_path:
+                            type: string
+                            description: >-
+                                Path to the astrometry.net index files of the
+                                local reference catalog.
+                        detectors:
+                            type: array
+                            description: Ids of the detectors to solve.
+                            items:
+                                type: integer
+                                minimum: 0
+                            minItems: 1
+                            default: {LOCAL_SOLVER_DEFAULTS["detectors"]}
+                        max_workers:
+                            type: integer
+                            description: Number of solver processes.
+                            minimum: 1
+                            default: {LOCAL_SOLVER_DEFAULTS["max_workers"]}
+                        timeout:
+                            type: number
+                            description: >-
+                                Timeout in seconds for waiting for the images
+                                to be available to the local solver.
+                            minimum: 1.0
+                            default: {LOCAL_SOLVER_DEFAULTS["timeout"]}
+                    required: [index_path]
+                    additionalProperties: false
         additionalProperties: false
         """
         return yaml.safe_load(schema_yaml)
@@ -160,6 +451,15 @@ class CorrectPointing(BaseScript):
         self.offset_source = getattr(
             OffsetSource, config.offset_source, self.offset_source
         )
+        self.predictive = config.predictive
+        self.predictive_threshold_arcsec = config.predictive_threshold_arcsec
+        self.measurement_noise_arcsec = config.measurement_noise_arcsec
+        self.local_solver = (
+            None
+            if config.local_solver is None
+            else {**LOCAL_SOLVER_DEFAULTS, **config.local_solver}
+        )
+        self.configure_local_solver()
 
     async def configure_tcs(self) -> None:
         """Handle creating the MTCS object and waiting for remote to start."""
@@ -194,10 +494,36 @@ class CorrectPointing(BaseScript):
         """Handle creating the ConsDB client."""
         if self.consdb_client is None:
             self.log.debug("Creating ConsDB client.")
-            self.consdb_client = ConsDbClient("http://consdb-pq.consdb:8080/consdb")
+            self.consdb_client = AsyncConsDbClient(
+                "http://consdb-pq.consdb:8080/consdb", log=self.log
+            )
         else:
             self.log.debug("ConsDB client already defined, skipping.")
 
+    def configure_local_solver(self) -> None:
+        """Handle creating the process pool of the local WCS solver."""
+        if self.local_solver_executor is not None:
+            self.local_solver_executor.shutdown(wait=False, cancel_futures=True)
+            self.local_solver_executor = None
+
+        if self.local_solver is None:
+            return
+
+        self.log.debug(
+            f"Creating local WCS solver with {self.local_solver['max_workers']} "
+            "processes."
+        )
+        # The solver tasks are built once in each process, when it starts.
+        self.local_solver_active_exposure = multiprocessing.Value("q", 0)
+        self.local_solver_executor = concurrent.futures.ProcessPoolExecutor(
+            max_workers=self.local_solver["max_workers"],
+            initializer=warm_up_local_solver_worker,
+            initargs=(
+                self.local_solver["index_path"],
+                self.local_solver_active_exposure,
+            ),
+        )
+
     def set_metadata(self, metadata):
         """Set estimated duration in metadata.
 
@@ -243,6 +569,11 @@ class CorrectPointing(BaseScript):
             f"Target coordinates: RA={target_ra_deg:.6f} deg, Dec={target_dec_deg:.6f} deg"
         )
 
+        if self.predictive:
+            await self.run_predictive(target_ra_angle, target_dec_angle)
+            self.log.info("Pointing correction successful.")
+            return
+
         offset_magnitude_arcsec = float("inf")
 
         for iteration in range(1, self.max_iterations + 1):
@@ -257,57 +588,18 @@ class CorrectPointing(BaseScript):
                     f"Starting iteration {iteration} of {self.max_iterations}"
                 )
 
-            exposure_ids = await self.lsstcam.take_acq(
-                exptime=self.exposure_time,
-                n=1,
-                group_id=self.group_id,
-                reason="pointing_correction",
-                filter=self.filter,
-            )
-
-            exposure_id = int(exposure_ids[0])
-            self.log.info(f"Took exposure {exposure_id}")
-
-            if self.offset_source == OffsetSource.ConsDB:
-
-                measured_ra_deg, measured_dec_deg = (
-                    await self.get_measured_coordinates_from_consdb(exposure_id)
-                )
+            exposure_id = await self.take_pointing_image()
 
-                offset_ra_arcsec, offset_dec_arcsec, offset_magnitude_arcsec = (
-                    self.calculate_offset(
-                        target_ra_deg, target_dec_deg, measured_ra_deg, measured_dec_deg
-                    )
-                )
-            elif self.offset_source == OffsetSource.RubinTV:
-                offset_ra_arcsec, offset_dec_arcsec, offset_magnitude_arcsec = (
-                    await self.get_measured_offset_from_rubintv(exposure_id)
+            offset_az_arcsec, offset_el_arcsec, offset_magnitude_arcsec = (
+                await self.measure_offset(
+                    exposure_id, target_ra_angle, target_dec_angle
                 )
-
-                measured_ra_deg = target_ra_deg + offset_ra_arcsec / 3600.0
-                measured_dec_deg = target_dec_deg + offset_dec_arcsec / 3600.0
-
-            self.log.info(
-                f"Measured coordinates: RA={measured_ra_deg:.6f} deg, "
-                f"Dec={measured_dec_deg:.6f} deg\n"
-                f"Offset: RA={offset_ra_arcsec:.3f} arcsec, "
-                f"Dec={offset_dec_arcsec:.3f} arcsec, "
-                f"Magnitude={offset_magnitude_arcsec:.3f} arcsec"
             )
 
-            altaz_base = self.mtcs.azel_from_radec(target_ra_angle, target_dec_angle)
-            altaz_meas = self.mtcs.azel_from_radec(
-                Angle(measured_ra_deg, unit=u.deg), Angle(measured_dec_deg, unit=u.deg)
-            )
-
-            offset_alt = altaz_meas.alt - altaz_base.alt
-            offset_az = altaz_meas.az - altaz_base.az
-
             if offset_magnitude_arcsec >= self.tolerance_arcsec:
                 await self.mtcs.offset_azel(
-                    az=offset_az.to(u.arcsec).value
-                    * np.cos(altaz_base.alt.to(u.rad).value),
-                    el=offset_alt.to(u.arcsec).value,
+                    az=offset_az_arcsec,
+                    el=offset_el_arcsec,
                     absorb=True,
                 )
             else:
@@ -323,6 +615,196 @@ class CorrectPointing(BaseScript):
 
         self.log.info("Pointing correction successful.")
 
+    async def run_predictive(
+        self, target_ra_angle: Angle, target_dec_angle: Angle
+    ) -> None:
+        """Correct the pointing without waiting for the measurement of each
+        image before taking the next one, once the offset is small.
+
+        The measurements are combined with a `PointingErrorEstimator`, taking
+        into account the corrections applied when each image was taken, and
+        the estimated residual is commanded as soon as a measurement arrives.
+        While the residual is below ``predictive_threshold_arcsec`` up to two
+        images are waiting for measurements at any time, so taking images
+        overlaps with Rapid Analysis.
+
+        Parameters
+        ----------
+        target_ra_angle : `astropy.coordinates.Angle`
+            Target RA.
+        target_dec_angle : `astropy.coordinates.Angle`
+            Target Dec.
+
+        Raises
+        ------
+        RuntimeError
+            If the pointing is not corrected after ``max_iterations`` images.
+        """
+        estimator = PointingErrorEstimator(
+            measurement_noise=self.measurement_noise_arcsec
+        )
+        # Images waiting for measurements, with the corrections applied when
+        # they were taken.
+        pending = collections.deque()
+        n_images = 0
+        residual_magnitude_arcsec = float("inf")
+
+        try:
+            while True:
+                max_pending = (
+                    2
+                    if residual_magnitude_arcsec < self.predictive_threshold_arcsec
+                    else 1
+                )
+                while len(pending) < max_pending and n_images < self.max_iterations:
+                    n_images += 1
+                    self.log.info(f"Taking image {n_images} of {self.max_iterations}")
+                    exposure_id = await self.take_pointing_image()
+                    pending.append(
+                        (
+                            asyncio.create_task(
+                                self.measure_offset(
+                                    exposure_id, target_ra_angle, target_dec_angle
+                                )
+                            ),
+                            estimator.correction,
+                        )
+                    )
+
+                if not pending:
+                    raise RuntimeError(
+                        f"Failed to correct pointing after {self.max_iterations} "
+                        f"images. Final offset: {residual_magnitude_arcsec:.3f} arcsec"
+                    )
+
+                measurement_task, correction = pending.popleft()
+                offset_az_arcsec, offset_el_arcsec, _ = await measurement_task
+                estimator.update(
+                    np.array([offset_az_arcsec, offset_el_arcsec]), correction
+                )
+
+                residual = estimator.residual
+                residual_magnitude_arcsec = float(np.hypot(*residual))
+
+                self.log.info(
+                    f"Estimated residual: Az={residual[0]:.3f} arcsec, "
+                    f"El={residual[1]:.3f} arcsec, "
+                    f"Magnitude={residual_magnitude_arcsec:.3f} arcsec, "
+                    f"Uncertainty={estimator.uncertainty:.3f} arcsec"
+                )
+
+                # Images taken before the latest corrections only confirm
+                # the pointing if the estimate is accurate enough.
+                is_current = np.array_equal(correction, estimator.correction)
+                if residual_magnitude_arcsec < self.tolerance_arcsec and (
+                    is_current or estimator.uncertainty < self.tolerance_arcsec
+                ):
+                    self.log.info(
+                        f"Pointing offset {residual_magnitude_arcsec:.3f} arcsec is "
+                        f"within tolerance {self.tolerance_arcsec:.3f} arcsec. "
+                        "Correction complete."
+                    )
+                    return
+
+                if residual_magnitude_arcsec >= self.tolerance_arcsec:
+                    await self.mtcs.offset_azel(
+                        az=residual[0],
+                        el=residual[1],
+                        absorb=True,
+                    )
+                    estimator.add_correction(residual)
+        finally:
+            for measurement_task, _ in pending:
+                measurement_task.cancel()
+
+    async def take_pointing_image(self) -> int:
+        """Take an image to measure the pointing.
+
+        Returns
+        -------
+        `int`
+            Exposure id.
+        """
+        exposure_ids = await self.lsstcam.take_acq(
+            exptime=self.exposure_time,
+            n=1,
+            group_id=self.group_id,
+            reason="pointing_correction",
+            filter=self.filter,
+        )
+
+        exposure_id = int(exposure_ids[0])
+        self.log.info(f"Took exposure {exposure_id}")
+
+        return exposure_id
+
+    async def measure_offset(
+        self, exposure_id: int, target_ra_angle: Angle, target_dec_angle: Angle
+    ) -> tuple[float, float, float]:
+        """Measure the pointing offset of an image.
+
+        Parameters
+        ----------
+        exposure_id : `int`
+            Exposure id.
+        target_ra_angle : `astropy.coordinates.Angle`
+            Target RA.
+        target_dec_angle : `astropy.coordinates.Angle`
+            Target Dec.
+
+        Returns
+        -------
+        offset_az_arcsec : `float`
+            Azimuth offset, on sky, in arcsec.
+        offset_el_arcsec : `float`
+            Elevation offset, in arcsec.
+        offset_magnitude_arcsec : `float`
+            Magnitude of the offset in RA and Dec, in arcsec.
+        """
+        target_ra_deg = target_ra_angle.to(u.deg).value
+        target_dec_deg = target_dec_angle.to(u.deg).value
+
+        if self.offset_source == OffsetSource.ConsDB:
+
+            measured_ra_deg, measured_dec_deg = await self.get_measured_coordinates(
+                exposure_id
+            )
+
+            offset_ra_arcsec, offset_dec_arcsec, offset_magnitude_arcsec = (
+                self.calculate_offset(
+                    target_ra_deg, target_dec_deg, measured_ra_deg, measured_dec_deg
+                )
+            )
+        elif self.offset_source == OffsetSource.RubinTV:
+            offset_ra_arcsec, offset_dec_arcsec, offset_magnitude_arcsec = (
+                await self.get_measured_offset_from_rubintv(exposure_id)
+            )
+
+            measured_ra_deg = target_ra_deg + offset_ra_arcsec / 3600.0
+            measured_dec_deg = target_dec_deg + offset_dec_arcsec / 3600.0
+
+        self.log.info(
+            f"Measured coordinates: RA={measured_ra_deg:.6f} deg, "
+            f"Dec={measured_dec_deg:.6f} deg\n"
+            f"Offset: RA={offset_ra_arcsec:.3f} arcsec, "
+            f"Dec={offset_dec_arcsec:.3f} arcsec, "
+            f"Magnitude={offset_magnitude_arcsec:.3f} arcsec"
+        )
+
+        altaz_base = self.mtcs.azel_from_radec(target_ra_angle, target_dec_angle)
+        altaz_meas = self.mtcs.azel_from_radec(
+            Angle(measured_ra_deg, unit=u.deg), Angle(measured_dec_deg, unit=u.deg)
+        )
+
+        offset_alt = altaz_meas.alt - altaz_base.alt
+        offset_az = altaz_meas.az - altaz_base.az
+
+        return (
+            offset_az.to(u.arcsec).value * np.cos(altaz_base.alt.to(u.rad).value),
+            offset_alt.to(u.arcsec).value,
+            offset_magnitude_arcsec,
+        )
+
     async def get_target_coordinates(self):
         """Get the current target coordinates from MTPtg.
 
@@ -365,59 +847,175 @@ class CorrectPointing(BaseScript):
         year = _visit_id[0:4]
         month = _visit_id[4:6]
         day = _visit_id[6:8]
-        seq_num = f"{int(_visit_id[9::])}"
+        seq_num = int(_visit_id[9::])
 
         rubintv_source_file_path = Path(
             f"/project/rubintv/LSSTCam/sidecar_metadata/dayObs_{year}{month}{day}.json"
         )
 
-        self.log.debug("Ensuring rubintv data exists.")
-        time_start = current_tai()
-        while not rubintv_source_file_path.exists():
-            if current_tai() - time_start > self.consdb_timeout:
-                raise TimeoutError(
-                    f"Timeout waiting for RubinTV data file ({rubintv_source_file_path}) to exists."
-                )
-            await asyncio.sleep(HEARTBEAT_INTERVAL)
+        if rubintv_source_file_path not in self.rubintv_watchers:
+            self.rubintv_watchers[rubintv_source_file_path] = RubinTVSidecarWatcher(
+                rubintv_source_file_path
+            )
 
         dec_offset_column = "delta Dec (arcsec)"
         ra_offset_column = "delta Ra (arcsec)"
 
-        time_start = current_tai()
-
         self.log.info(
             f"Waiting for offsets in rubintv data file: {rubintv_source_file_path}."
         )
 
-        while current_tai() - time_start < self.consdb_timeout:
-            with open(rubintv_source_file_path) as fp:
-                try:
-                    data = json.load(fp)
-                except Exception:
-                    self.log.debug("Failed to read json file. Continuing...")
-                    await asyncio.sleep(HEARTBEAT_INTERVAL)
-                    continue
-
-            if (
-                seq_num in data
-                and ra_offset_column in data[seq_num]
-                and data[seq_num][ra_offset_column] is not None
-            ):
-                offset_ra_arcsec = data[seq_num][ra_offset_column]
-                offset_dec_arcsec = data[seq_num][dec_offset_column]
-                offset_magnitude_arcsec = np.sqrt(
-                    offset_ra_arcsec**2 + offset_dec_arcsec**2
+        entry = await self.rubintv_watchers[rubintv_source_file_path].wait_for_entry(
+            seq_num,
+            columns=[ra_offset_column, dec_offset_column],
+            timeout=self.consdb_timeout,
+        )
+
+        offset_ra_arcsec = entry[ra_offset_column]
+        offset_dec_arcsec = entry[dec_offset_column]
+        offset_magnitude_arcsec = np.sqrt(offset_ra_arcsec**2 + offset_dec_arcsec**2)
+        return -offset_ra_arcsec, -offset_dec_arcsec, offset_magnitude_arcsec
+
+    async def get_measured_coordinates(self, exposure_id: int):
+        """Get the measured WCS coordinates of an exposure.
+
+        If the local solver is configured, it runs concurrently with the
+        ConsDB query, and the first solution is used. If one of them fails,
+        the other is used.
+
+        Parameters
+        ----------
+        exposure_id : int
+            Exposure ID.
+
+        Returns
+        -------
+        tuple
+            Measured RA and Dec in degrees (ra_deg, dec_deg).
+
+        Raises
+        ------
+        RuntimeError
+            If the WCS solution is not available.
+        """
+        if self.local_solver_executor is None:
+            return await self.get_measured_coordinates_from_consdb(exposure_id)
+
+        tasks = {
+            asyncio.create_task(
+                self.get_measured_coordinates_from_consdb(exposure_id)
+            ): "ConsDB",
+            asyncio.create_task(
+                self.get_measured_coordinates_from_local_solver(exposure_id)
+            ): "local solver",
+        }
+
+        last_exception = None
+        try:
+            while tasks:
+                done, _ = await asyncio.wait(
+                    tasks, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    source = tasks.pop(task)
+                    if task.exception() is None:
+                        self.log.info(
+                            f"Using WCS solution from {source} "
+                            f"for exposure {exposure_id}."
+                        )
+                        return task.result()
+
+                    last_exception = task.exception()
+                    self.log.warning(
+                        f"Failed to get WCS solution from {source} "
+                        f"for exposure {exposure_id}: {last_exception!r}"
+                    )
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        raise RuntimeError(
+            f"WCS solution not available for exposure {exposure_id}."
+        ) from last_exception
+
+    async def get_measured_coordinates_from_local_solver(self, exposure_id: int):
+        """Get the measured WCS coordinates by solving the WCS of the
+        central detectors with the local solver.
+
+        Parameters
+        ----------
+        exposure_id : int
+            Exposure ID.
+
+        Returns
+        -------
+        tuple
+            Measured RA and Dec in degrees (ra_deg, dec_deg), average of the
+            boresight coordinates of the solved detectors.
+
+        Raises
+        ------
+        RuntimeError
+            If the WCS of all the detectors failed to solve, or the solves of
+            a previous exposure are still running.
+        """
+        # Solves of a previous exposure, abandoned when ConsDB answered
+        # first, stop at their next check but may still occupy the workers.
+        stale_futures = [
+            future for future in self.local_solver_futures if not future.done()
+        ]
+        if len(stale_futures) > 0:
+            raise RuntimeError(
+                f"{len(stale_futures)} local solves of a previous exposure still "
+                f"running, skipping local solver for exposure {exposure_id}."
+            )
+
+        detectors = self.local_solver["detectors"]
+
+        self.local_solver_active_exposure.value = exposure_id
+        self.local_solver_futures = [
+            self.local_solver_executor.submit(
+                solve_boresight,
+                exposure_id,
+                detector,
+                self.local_solver["index_path"],
+                self.local_solver["timeout"],
+            )
+            for detector in detectors
+        ]
+        try:
+            results = await asyncio.gather(
+                *[asyncio.wrap_future(future) for future in self.local_solver_futures],
+                return_exceptions=True,
+            )
+        finally:
+            # Cancel the queued solves and signal the running ones to stop.
+            self.local_solver_active_exposure.value = 0
+            for future in self.local_solver_futures:
+                future.cancel()
+
+        coordinates = []
+        for detector, result in zip(detectors, results):
+            if isinstance(result, BaseException):
+                self.log.debug(
+                    f"Local solver failed for exposure {exposure_id}, "
+                    f"detector {detector}: {result!r}"
                 )
-                return -offset_ra_arcsec, -offset_dec_arcsec, offset_magnitude_arcsec
+            else:
+                coordinates.append(result)
 
-            await asyncio.sleep(HEARTBEAT_INTERVAL)
+        if len(coordinates) == 0:
+            raise RuntimeError(
+                f"Local solver failed for all detectors of exposure {exposure_id}."
+            )
 
-        raise TimeoutError("Timeout waiting for offsets to be available in RubinTV.")
+        return mean_coordinates(coordinates)
 
     async def get_measured_coordinates_from_consdb(self, exposure_id: int):
         """Get the measured WCS coordinates from ConsDB.
 
-        Uses wait_for_row_to_exist to efficiently wait for the WCS solution
+        Uses wait_for_row_to_exist to asynchronously wait for the WCS solution
         to be computed and written to ConsDB, then extracts both RA and Dec
         from the single row result.
 
@@ -441,12 +1039,6 @@ class CorrectPointing(BaseScript):
 
         self.log.debug(f"Waiting for WCS solution in ConsDB for exposure {exposure_id}")
 
-        get_wcs_row = functools.partial(
-            self.consdb_client.wait_for_row_to_exist,
-            query=query,
-            timeout=self.consdb_timeout,
-        )
-
         last_exception = None
         for attempt in range(1, self.consdb_max_retries + 1):
             try:
@@ -455,8 +1047,8 @@ class CorrectPointing(BaseScript):
                     f"for exposure {exposure_id}"
                 )
 
-                wcs_table = await asyncio.get_running_loop().run_in_executor(
-                    None, get_wcs_row
+                wcs_table = await self.consdb_client.wait_for_row_to_exist(
+                    query=query, timeout=self.consdb_timeout
                 )
 
                 if len(wcs_table) == 0:
@@ -495,6 +1087,12 @@ class CorrectPointing(BaseScript):
         # If we get here, all retries failed
         raise last_exception
 
+    async def cleanup(self):
+        if self.consdb_client is not None:
+            await self.consdb_client.close()
+        if self.local_solver_executor is not None:
+            self.local_solver_executor.shutdown(wait=False, cancel_futures=True)
+
     def calculate_offset(
         self,
         target_ra_deg: float,
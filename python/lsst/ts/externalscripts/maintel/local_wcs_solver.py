@@ -0,0 +1,229 @@
+# This file is part of ts_externalscripts
+#
+# Developed for the LSST Telescope and Site Systems.
+# This product includes software developed by the LSST Project
+# (https://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+__all__ = ["mean_coordinates", "solve_boresight", "warm_up_local_solver_worker"]
+
+import time
+import typing
+import warnings
+
+import numpy as np
+
+try:
+    from lsst.afw.cameraGeom import FOCAL_PLANE, PIXELS
+    from lsst.geom import Point2D
+    from lsst.pipe.base.struct import Struct
+    from lsst.summit.utils import BestEffortIsr
+    from lsst.summit.utils.astrometry.anet import CommandLineSolver
+    from lsst.summit.utils.astrometry.utils import runCharactierizeImage
+except ImportError:
+    warnings.warn("Cannot import required libraries. Local WCS solver will not work.")
+
+# Interval between attempts to retrieve an image (in seconds).
+IMAGE_POLL_INTERVAL = 1.0
+
+# Detection thresholds used to find the sources to solve the WCS.
+SOURCE_SNR = 5.0
+SOURCE_MIN_PIX = 25
+
+# Tasks used by the solver, built once in each worker process.
+_solver_tasks: typing.Dict[str, typing.Any] = dict()
+
+# Id of the exposure the script is waiting for, shared with the worker
+# processes (see `warm_up_local_solver_worker`).
+_active_exposure: typing.Any = None
+
+
+def get_solver_tasks(index_path: str) -> "Struct":
+    """Get the tasks used to solve the WCS.
+
+    The tasks are built the first time this function is called in a process
+    and reused afterwards.
+
+    Parameters
+    ----------
+    index_path : `str`
+        Path to the astrometry.net index files of the local reference
+        catalog.
+
+    Returns
+    -------
+    tasks : `Struct`
+        Struct with the ``best_effort_isr`` and ``solver`` entries.
+    """
+    if not _solver_tasks:
+        _solver_tasks.update(
+            best_effort_isr=BestEffortIsr(repoString="LSSTCam"),
+            solver=CommandLineSolver(indexFilePath=index_path, checkInParallel=True),
+        )
+
+    return Struct(
+        best_effort_isr=_solver_tasks["best_effort_isr"],
+        solver=_solver_tasks["solver"],
+    )
+
+
+def warm_up_local_solver_worker(
+    index_path: str, active_exposure: typing.Any = None
+) -> None:
+    """Build the solver tasks in a worker process.
+
+    Parameters
+    ----------
+    index_path : `str`
+        Path to the astrometry.net index files of the local reference
+        catalog.
+    active_exposure : `multiprocessing.Value`, optional
+        Shared id of the exposure the script is waiting for. Solves of other
+        exposures are abandoned (see `check_active_exposure`). If `None`,
+        solves are never abandoned.
+    """
+    global _active_exposure
+    _active_exposure = active_exposure
+
+    get_solver_tasks(index_path)
+
+
+def check_active_exposure(exposure_id: int, detector: int) -> None:
+    """Check that the script is still waiting for the solution of an
+    exposure.
+
+    Parameters
+    ----------
+    exposure_id : `int`
+        Exposure id.
+    detector : `int`
+        Detector id.
+
+    Raises
+    ------
+    RuntimeError
+        If the solution is no longer needed.
+    """
+    if _active_exposure is not None and _active_exposure.value != exposure_id:
+        raise RuntimeError(
+            f"Solution of image {exposure_id}, detector {detector} no longer needed."
+        )
+
+
+def solve_boresight(
+    exposure_id: int, detector: int, index_path: str, timeout: float
+) -> typing.Tuple[float, float]:
+    """Solve the WCS of a detector and return the coordinates of the
+    boresight.
+
+    Parameters
+    ----------
+    exposure_id : `int`
+        Exposure id.
+    detector : `int`
+        Detector id.
+    index_path : `str`
+        Path to the astrometry.net index files of the local reference
+        catalog.
+    timeout : `float`
+        Timeout to wait for the image to be available (in seconds).
+
+    Returns
+    -------
+    ra_deg : `float`
+        RA of the boresight, in degrees.
+    dec_deg : `float`
+        Dec of the boresight, in degrees.
+
+    Raises
+    ------
+    TimeoutError
+        If the image is not available before the timeout.
+    RuntimeError
+        If the WCS could not be solved, or the solution is no longer needed.
+    """
+    tasks = get_solver_tasks(index_path)
+
+    data_id = dict(instrument="LSSTCam", exposure=int(exposure_id), detector=detector)
+    time_end = time.monotonic() + timeout
+
+    exposure = None
+    while exposure is None:
+        check_active_exposure(exposure_id, detector)
+        try:
+            exposure = tasks.best_effort_isr.getExposure(data_id)
+        except LookupError:
+            if time.monotonic() > time_end:
+                raise TimeoutError(
+                    f"Timeout waiting for image {exposure_id}, detector {detector}."
+                )
+            time.sleep(IMAGE_POLL_INTERVAL)
+
+    check_active_exposure(exposure_id, detector)
+    characterize_result = runCharactierizeImage(exposure, SOURCE_SNR, SOURCE_MIN_PIX)
+
+    check_active_exposure(exposure_id, detector)
+    result = tasks.solver.run(
+        exposure, characterize_result.sourceCat, isWideField=False
+    )
+
+    if result is None:
+        raise RuntimeError(
+            f"Failed to solve WCS of image {exposure_id}, detector {detector}."
+        )
+
+    # The boresight is at the origin of the focal plane, which is outside
+    # the pixels of all but the central detector.
+    boresight_pixel = (
+        exposure.getDetector()
+        .getTransform(FOCAL_PLANE, PIXELS)
+        .applyForward(Point2D(0.0, 0.0))
+    )
+    boresight = result.wcs.pixelToSky(boresight_pixel)
+
+    return boresight.getRa().asDegrees(), boresight.getDec().asDegrees()
+
+
+def mean_coordinates(
+    coordinates: typing.List[typing.Tuple[float, float]]
+) -> typing.Tuple[float, float]:
+    """Compute the mean of a list of sky coordinates.
+
+    Parameters
+    ----------
+    coordinates : `list` [`tuple` [`float`, `float`]]
+        RA and Dec, in degrees.
+
+    Returns
+    -------
+    ra_deg : `float`
+        Mean RA, in degrees, between 0 and 360.
+    dec_deg : `float`
+        Mean Dec, in degrees.
+    """
+    ra, dec = np.radians(np.array(coordinates, dtype=float)).T
+
+    x, y, z = (
+        np.mean(np.cos(dec) * np.cos(ra)),
+        np.mean(np.cos(dec) * np.sin(ra)),
+        np.mean(np.sin(dec)),
+    )
+
+    return (
+        float(np.degrees(np.arctan2(y, x)) % 360.0),
+        float(np.degrees(np.arctan2(z, np.hypot(x, y)))),
+    )
@@ -20,8 +20,6 @@
 
 __all__ = ["TakeTwilightFlatsComCam"]
 
-import asyncio
-import functools
 import warnings
 
 import yaml
@@ -31,13 +29,13 @@ from lsst.ts.observatory.control.utils import RotType
 from lsst.ts.xml.enums.MTPtg import WrapStrategy
 
 try:
-    from lsst.summit.utils import ConsDbClient
     from lsst.summit.utils.utils import computeCcdExposureId
 except ImportError:
     warnings.warn("Cannot import required libraries. Script will not work.")
 
 
 from ..base_take_twilight_flats import BaseTakeTwilightFlats
+from ..consdb_client import AsyncConsDbClient
 
 
 class TakeTwilightFlatsComCam(BaseTakeTwilightFlats):
@@ -89,7 +87,9 @@ class TakeTwilightFlatsComCam(BaseTakeTwilightFlats):
         """Handle creating the ConsDB client and waiting remote to start."""
         if self.client is None:
             self.log.debug("Creating ConsDB client.")
-            self.client = ConsDbClient("http://consdb-pq.consdb:8080/consdb")
+            self.client = AsyncConsDbClient(
+                "http://consdb-pq.consdb:8080/consdb", log=self.log
+            )
         else:
             self.log.debug("ConsDB client already defined, skipping.")
 
@@ -140,13 +140,9 @@ class TakeTwilightFlatsComCam(BaseTakeTwilightFlats):
             f"where ccdexposure_id={ccd_exp_id}"
         )
         item = "postisr_pixel_median"
-        get_counts = functools.partial(
-            self.client.wait_for_item_in_row,
-            query=query,
-            item=item,
-            timeout=timeout,
+        sky_counts = await self.client.wait_for_item_in_row(
+            query=query, item=item, timeout=timeout
         )
-        sky_counts = await asyncio.get_running_loop().run_in_executor(None, get_counts)
         return sky_counts
 
     def get_instrument_name(self) -> str:
@@ -21,20 +21,14 @@
 __all__ = ["TakeTwilightFlatsLSSTCam"]
 
 import asyncio
-import functools
-import warnings
 
 import yaml
 from lsst.ts.observatory.control.maintel.lsstcam import LSSTCam, LSSTCamUsages
 from lsst.ts.observatory.control.maintel.mtcs import MTCS
 from lsst.ts.observatory.control.utils import RotType
 
-try:
-    from lsst.summit.utils import ConsDbClient
-except ImportError:
-    warnings.warn("Cannot import required libraries. Script will not work.")
-
 from ..base_take_twilight_flats import BaseTakeTwilightFlats
+from ..consdb_client import AsyncConsDbClient
 
 
 class TakeTwilightFlatsLSSTCam(BaseTakeTwilightFlats):
@@ -84,7 +78,9 @@ class TakeTwilightFlatsLSSTCam(BaseTakeTwilightFlats):
         """Handle creating the ConsDB client."""
         if self.client is None:
             self.log.debug("Creating ConsDB client.")
-            self.client = ConsDbClient("http://consdb-pq.consdb:8080/consdb")
+            self.client = AsyncConsDbClient(
+                "http://consdb-pq.consdb:8080/consdb", log=self.log
+            )
         else:
             self.log.debug("ConsDB client already defined, skipping.")
 
@@ -127,13 +123,9 @@ class TakeTwilightFlatsLSSTCam(BaseTakeTwilightFlats):
         timeout = 30
         query = f"SELECT * from cbd_lsstcam.exposure_quicklook where exposure_id = {self.latest_exposure_id}"
         item = "post_isr_pixel_median_median"
-        get_counts = functools.partial(
-            self.client.wait_for_item_in_row,
-            query=query,
-            item=item,
-            timeout=timeout,
+        sky_counts = await self.client.wait_for_item_in_row(
+            query=query, item=item, timeout=timeout
         )
-        sky_counts = await asyncio.get_running_loop().run_in_executor(None, get_counts)
         return sky_counts
 
     def get_instrument_name(self) -> str:
@@ -18,9 +18,13 @@
 #
 # You should have received a copy of the GNU General Public License
 
-__all__ = ["get_scripts_dir"]
+__all__ = ["get_scripts_dir", "StageTimer"]
 
+import contextlib
 import pathlib
+import threading
+import time
+import typing
 
 
 def get_scripts_dir():
@@ -32,3 +36,93 @@ def get_scripts_dir():
         Absolute path to the specified scripts directory.
     """
     return pathlib.Path(__file__).resolve().parent / "data" / "scripts"
+
+
+class StageTimer:
+    """Accumulate the wall time spent in the stages of a procedure.
+
+    Stages are timed with the instance as a context manager, which can be
+    used from multiple threads at the same time.
+
+    Examples
+    --------
+    >>> timer = StageTimer()
+    >>> with timer("load"):
+    ...     pass
+    >>> timer.summary()["load"]["count"]
+    1
+    """
+
+    def __init__(self) -> None:
+        self.timings: typing.Dict[str, typing.List[float]] = dict()
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def __call__(self, stage: str) -> typing.Iterator[None]:
+        """Time a stage.
+
+        Parameters
+        ----------
+        stage : `str`
+            Name of the stage.
+        """
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.add(stage, time.monotonic() - start)
+
+    def add(self, stage: str, duration: float) -> None:
+        """Add a duration to a stage.
+
+        Parameters
+        ----------
+        stage : `str`
+            Name of the stage.
+        duration : `float`
+            Duration (in seconds).
+        """
+        with self._lock:
+            self.timings.setdefault(stage, []).append(duration)
+
+    def reset(self) -> None:
+        """Remove all timings."""
+        with self._lock:
+            self.timings = dict()
+
+    def summary(self) -> typing.Dict[str, typing.Dict[str, float]]:
+        """Summarize the timings of each stage.
+
+        Returns
+        -------
+        summary : `dict`
+            Dictionary with the ``count``, ``total``, ``mean`` and ``max``
+            duration (in seconds) of each stage, in the order the stages were
+            first executed.
+        """
+        with self._lock:
+            return {
+                stage: dict(
+                    count=len(durations),
+                    total=sum(durations),
+                    mean=sum(durations) / len(durations),
+                    max=max(durations),
+                )
+                for stage, durations in self.timings.items()
+            }
+
+    def format(self) -> str:
+        """Format the summary as a table.
+
+        Returns
+        -------
+        `str`
+            Table with one line per stage.
+        """
+        lines = [f"{'stage':<20} {'count':>5} {'total':>9} {'mean':>9} {'max':>9}"]
+        for stage, summary in self.summary().items():
+            lines.append(
+                f"{stage:<20} {summary['count']:>5d} {summary['total']:>8.3f}s "
+                f"{summary['mean']:>8.3f}s {summary['max']:>8.3f}s"
+            )
+        return "\n".join(lines)
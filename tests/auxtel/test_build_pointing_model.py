@@ -26,15 +26,22 @@ import unittest
 import unittest.mock
 
 import numpy as np
+from astropy.table import Table
 from lsst.daf import butler as dafButler
-from lsst.ts import salobj
+from lsst.ts import salobj, utils
 from lsst.ts.externalscripts import get_scripts_dir
 from lsst.ts.externalscripts.auxtel.build_pointing_model import (
     BuildPointingModel,
+    azel_to_hadec,
 )
 from lsst.ts.externalscripts.base_build_pointing_model import (
+    POINTING_TERMS,
     GridType,
+    PointData,
+    append_point_data,
+    fit_pointing_terms,
     generate_rotator_sequence,
+    wrap_azimuth,
 )
 from lsst.ts.observatory.control.utils.enums import RotType
 from lsst.ts.standardscripts import BaseScriptTestCase
@@ -66,6 +73,8 @@ class TestBuildPointingModel(BaseScriptTestCase, unittest.IsolatedAsyncioTestCas
         # Mock the method that returns the BestEffortIsr class if it is
         # not available for import
         self.script.get_best_effort_isr = unittest.mock.Mock()
+        self.script.warm_up_measurement_service = unittest.mock.AsyncMock()
+        self.script.get_quick_measurement_task = unittest.mock.Mock()
 
         return (self.script,)
 
@@ -144,6 +153,40 @@ class TestBuildPointingModel(BaseScriptTestCase, unittest.IsolatedAsyncioTestCas
         ) as test_configuration:
             self.assert_config(test_configuration)
 
+    async def test_configure_use_adaptive_grid(self):
+        async with self.make_configured_dry_script(
+            grid=GridType.ADAPTIVE
+        ) as test_configuration:
+            self.assert_config(test_configuration)
+            assert len(self.script.azimuth_candidates) > self.script.grid_size
+
+    async def test_select_refinement_position(self):
+        async with self.make_configured_dry_script(grid=GridType.ADAPTIVE):
+            self.script.point_data = [
+                PointData(
+                    point_index=0,
+                    azimuth=self.script.azimuth_candidates[0],
+                    elevation=self.script.elevation_candidates[0],
+                    rotator=0.0,
+                )
+            ]
+
+            candidate_index = self.script.select_refinement_position()
+
+            # With a single registered point the selected candidate must be
+            # the one farthest away from it.
+            distance = np.hypot(
+                (
+                    self.script.azimuth_candidates
+                    - self.script.azimuth_candidates[0]
+                )
+                * np.cos(np.radians(self.script.elevation_candidates)),
+                self.script.elevation_candidates
+                - self.script.elevation_candidates[0],
+            )
+            assert candidate_index != 0
+            assert distance[candidate_index] > np.median(distance)
+
     async def test_configure_skip(self):
         async with self.make_configured_dry_script(
             grid=GridType.RADEC,
@@ -151,6 +194,95 @@ class TestBuildPointingModel(BaseScriptTestCase, unittest.IsolatedAsyncioTestCas
         ) as test_configuration:
             self.assert_config(test_configuration)
 
+    def test_wrap_azimuth(self):
+        azimuth = np.array([-400.0, -200.0, 0.0, 185.0, 200.0, 560.0])
+
+        wrapped_azimuth = wrap_azimuth(
+            azimuth, azimuth_minimum=-190.0, azimuth_maximum=190.0
+        )
+
+        np.testing.assert_allclose(
+            wrapped_azimuth, [-40.0, 160.0, 0.0, 185.0, -160.0, -160.0]
+        )
+        # Input array must not be modified in place.
+        assert azimuth[0] == -400.0
+
+    def test_fit_pointing_terms(self):
+        rng = np.random.default_rng(12345)
+        azimuth = rng.uniform(-180.0, 180.0, 50)
+        elevation = rng.uniform(20.0, 80.0, 50)
+        terms = dict(IA=10.0, IE=-5.0, CA=3.0, NPAE=-2.0, AN=4.0, AW=-6.0, TF=1.5)
+
+        az, el = np.radians(azimuth), np.radians(elevation)
+        offset_azimuth = (
+            -terms["IA"] * np.cos(el)
+            + terms["CA"]
+            + terms["NPAE"] * np.sin(el)
+            + terms["AN"] * np.sin(el) * np.sin(az)
+            - terms["AW"] * np.sin(el) * np.cos(az)
+        )
+        offset_elevation = (
+            terms["IE"]
+            + terms["AN"] * np.cos(az)
+            + terms["AW"] * np.sin(az)
+            + terms["TF"] * np.cos(el)
+        )
+
+        pointing_terms = fit_pointing_terms(
+            azimuth=azimuth,
+            elevation=elevation,
+            offset_azimuth=offset_azimuth,
+            offset_elevation=offset_elevation,
+        )
+
+        np.testing.assert_allclose(
+            pointing_terms.values,
+            [terms[term] for term in POINTING_TERMS],
+            atol=1e-6,
+        )
+        assert pointing_terms.rms < 1e-6
+
+    def test_append_point_data(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            filename = os.path.join(tmp_dir, "point_data.ecsv")
+
+            append_point_data(
+                filename,
+                PointData(
+                    point_index=0,
+                    azimuth=10.0,
+                    elevation=45.0,
+                    rotator=0.0,
+                    image_id=2025010100001,
+                    timestamp=1.0,
+                    centroid_x=2000.0,
+                    centroid_y=2001.0,
+                    offset_x=1.0,
+                    offset_y=-1.0,
+                ),
+            )
+            append_point_data(
+                filename,
+                PointData(
+                    point_index=1,
+                    azimuth=20.0,
+                    elevation=50.0,
+                    rotator=90.0,
+                    image_id=2025010100002,
+                    timestamp=2.0,
+                    centered=False,
+                ),
+            )
+
+            point_data = Table.read(filename, format="ascii.ecsv")
+
+        assert len(point_data) == 2
+        assert list(point_data["point_index"]) == [0, 1]
+        assert list(point_data["image_id"]) == [2025010100001, 2025010100002]
+        assert list(point_data["centered"]) == [True, False]
+        assert point_data["offset_x"][0] == 1.0
+        assert np.isnan(point_data["offset_x"][1])
+
     async def test_configure_fails(self):
         self.remotes_needed = False
         bad_config = [
@@ -163,6 +295,9 @@ class TestBuildPointingModel(BaseScriptTestCase, unittest.IsolatedAsyncioTestCas
             dict(radec_grid=dict(ha_grid=dict(max=14))),
             dict(radec_grid=dict(ha_grid=dict(n=[]))),
             dict(grid="radec", radec_grid=dict(ha_grid=dict(n=[3, 5, 6]))),
+            dict(grid="adaptive", adaptive_grid=dict(initial_nside=4, refine_nside=4)),
+            # Pipelined measurements are only recorded in the point data file.
+            dict(pipeline_measurements=True),
         ]
         for config in bad_config:
             with self.subTest(config=config), self.assertRaises(salobj.ExpectedError):
@@ -299,6 +434,113 @@ class TestBuildPointingModel(BaseScriptTestCase, unittest.IsolatedAsyncioTestCas
         assert self.script.iterations["failed"] == 0
         assert self.script.iterations["successful"] == 1
 
+    async def test_execute_grid_local_catalog(self):
+        azimuth, elevation, rotator = 30.0, 60.0, 0.0
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            catalog_file = os.path.join(tmp_dir, "targets.ecsv")
+            self.remotes_needed = False
+            async with self.make_script():
+                time = utils.astropy_time_from_tai_unix(utils.current_tai())
+                time.location = self.script.tcs.location
+                hour_angle, declination = azel_to_hadec(
+                    azimuth=azimuth,
+                    elevation=elevation,
+                    latitude=self.script.tcs.location.lat.deg,
+                )
+                right_ascension = (
+                    time.sidereal_time("mean").deg - hour_angle
+                ) % 360.0
+                Table(
+                    dict(
+                        name=["HD 1", "HD 2", "HD 3"],
+                        ra=[right_ascension, right_ascension, right_ascension],
+                        dec=[declination + 0.5, declination + 0.1, declination],
+                        mag=[8.5, 12.0, 9.0],
+                    )
+                ).write(catalog_file)
+
+                await self.set_test_configuration(
+                    grid=GridType.HEALPIX, target_catalog=catalog_file
+                )
+
+                self.script.tcs.find_target = unittest.mock.AsyncMock()
+                self.script.tcs.slew_icrs = unittest.mock.AsyncMock()
+                self.script.tcs.slew_object = unittest.mock.AsyncMock()
+                self.script.center_on_brightest_source = unittest.mock.AsyncMock()
+
+                await self.script.execute_grid(
+                    azimuth=azimuth, elevation=elevation, rotator=rotator
+                )
+
+        # HD 2 is outside the magnitude range, HD 3 is the nearest target.
+        self.script.tcs.find_target.assert_not_awaited()
+        self.script.tcs.slew_object.assert_not_awaited()
+        self.script.tcs.slew_icrs.assert_awaited_once()
+        assert (
+            self.script.tcs.slew_icrs.await_args.kwargs["target_name"] == "HD 3"
+        )
+        assert (
+            self.script.tcs.slew_icrs.await_args.kwargs["rot_type"]
+            == RotType.PhysicalSky
+        )
+        assert self.script.iterations["successful"] == 1
+
+    async def test_execute_grid_local_catalog_fallback(self):
+        azimuth, elevation, rotator = 30.0, 60.0, 0.0
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            catalog_file = os.path.join(tmp_dir, "targets.ecsv")
+            self.remotes_needed = False
+            async with self.make_script():
+                time = utils.astropy_time_from_tai_unix(utils.current_tai())
+                time.location = self.script.tcs.location
+                hour_angle, declination = azel_to_hadec(
+                    azimuth=azimuth,
+                    elevation=elevation,
+                    latitude=self.script.tcs.location.lat.deg,
+                )
+                right_ascension = (
+                    time.sidereal_time("mean").deg - hour_angle
+                ) % 360.0
+                Table(
+                    dict(
+                        name=["HD 1", "HD 2", "HD 3"],
+                        ra=[right_ascension, right_ascension, right_ascension],
+                        dec=[declination + 0.5, declination + 10.0, declination],
+                        mag=[8.5, 9.0, 9.0],
+                    )
+                ).write(catalog_file)
+
+                await self.set_test_configuration(
+                    grid=GridType.HEALPIX, target_catalog=catalog_file
+                )
+
+                # The candidates of the grid cells are precomputed.
+                target_index = self.script.target_index
+                assert len(target_index.cell_candidates) == self.script.grid_size
+
+                self.script.tcs.find_target = unittest.mock.AsyncMock()
+                self.script.tcs.slew_icrs = unittest.mock.AsyncMock(
+                    side_effect=[RuntimeError("Unittesting failure."), None]
+                )
+                self.script.tcs.slew_object = unittest.mock.AsyncMock()
+                self.script.center_on_brightest_source = unittest.mock.AsyncMock()
+
+                await self.script.execute_grid(
+                    azimuth=azimuth, elevation=elevation, rotator=rotator
+                )
+
+        # The slew to the nearest target (HD 3) fails, the next candidate
+        # (HD 1) is used. HD 2 is outside the search radius.
+        self.script.tcs.find_target.assert_not_awaited()
+        self.script.tcs.slew_object.assert_not_awaited()
+        assert [
+            call.kwargs["target_name"]
+            for call in self.script.tcs.slew_icrs.await_args_list
+        ] == ["HD 3", "HD 1"]
+        assert self.script.iterations["successful"] == 1
+
     async def test_execute_grid_fail_to_find_target(self):
         async with self.make_configured_dry_script(grid=GridType.HEALPIX):
             azimuth, elevation = (
@@ -330,6 +572,97 @@ class TestBuildPointingModel(BaseScriptTestCase, unittest.IsolatedAsyncioTestCas
         assert self.script.iterations["failed"] == 1
         assert self.script.iterations["successful"] == 0
 
+    async def test_execute_grid_pipeline_measurements(self):
+        point_data_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(point_data_dir.cleanup)
+        point_data_file = os.path.join(point_data_dir.name, "point_data.ecsv")
+
+        async with self.make_configured_dry_script(
+            grid=GridType.HEALPIX,
+            pipeline_measurements=True,
+            point_data_file=point_data_file,
+        ):
+            azimuth, elevation, rotator = (
+                self.script.azimuth_grid[0],
+                self.script.elevation_grid[0],
+                0.0,
+            )
+            image_id = 2024010100123
+            find_offset_return_value = (-10.0, 10.0)
+
+            self.script.slew_to_az_el_rot = unittest.mock.AsyncMock(
+                return_value=True
+            )
+            self.script.camera.take_acq = unittest.mock.AsyncMock(
+                return_value=[image_id]
+            )
+            self.script.camera.rem.atoods = unittest.mock.AsyncMock()
+            self.script.camera.rem.atoods.evt_imageInOODS.attach_mock(
+                unittest.mock.Mock(),
+                "flush",
+            )
+            # An event from a previous image arrives before the new image.
+            self.script.camera.rem.atoods.evt_imageInOODS.next.side_effect = [
+                types.SimpleNamespace(obsid="AT_O_20240101_000122"),
+                types.SimpleNamespace(obsid="AT_O_20240101_000123"),
+            ]
+            self.script.find_offset = unittest.mock.AsyncMock(
+                return_value=find_offset_return_value
+            )
+            self.script.tcs.offset_xy = unittest.mock.AsyncMock()
+            self.script.tcs.add_point_data = unittest.mock.AsyncMock()
+            self.script.center_on_brightest_source = unittest.mock.AsyncMock()
+
+            await self.script.execute_grid(
+                azimuth=azimuth, elevation=elevation, rotator=rotator
+            )
+            await self.script.wait_measurements()
+
+            self.script.center_on_brightest_source.assert_not_awaited()
+            self.script.camera.take_acq.assert_awaited_once()
+            # Uncentered positions are not registered with the pointing
+            # component.
+            self.script.tcs.add_point_data.assert_not_awaited()
+            self.script.tcs.offset_xy.assert_not_awaited()
+            self.script.camera.rem.atoods.evt_imageInOODS.flush.assert_called_once()
+            assert self.script.camera.rem.atoods.evt_imageInOODS.next.await_count == 2
+            assert len(self.script.point_data) == 1
+            point_data = self.script.point_data[0]
+            self.script.find_offset.assert_awaited_once_with(
+                image_id=image_id, point_data=point_data
+            )
+            assert point_data.point_index == 0
+            assert point_data.image_id == image_id
+            assert not point_data.centered
+            assert (
+                point_data.offset_x,
+                point_data.offset_y,
+            ) == find_offset_return_value
+            assert self.script.iterations["successful"] == 1
+
+            # The measured offset is recorded in the point data file.
+            point_data_table = Table.read(point_data_file, format="ascii.ecsv")
+            assert len(point_data_table) == 1
+            assert point_data_table["image_id"][0] == image_id
+
+    async def test_find_offset_reuses_measurement_task(self):
+        async with self.make_configured_dry_script(grid=GridType.HEALPIX):
+            quick_measurement = self.script.quick_measurement
+            quick_measurement.run.return_value = types.SimpleNamespace(
+                brightestObjCentroid=(2000.0, 2000.0)
+            )
+            self.script.get_image = unittest.mock.AsyncMock()
+            self.script.calculate_offset = unittest.mock.AsyncMock(
+                return_value=(1.0, -1.0)
+            )
+
+            for image_id in range(3):
+                offset = await self.script.find_offset(image_id=image_id)
+                assert offset == (1.0, -1.0)
+
+            self.script.get_quick_measurement_task.assert_called_once()
+            assert quick_measurement.run.call_count == 3
+
     async def test_center_on_brightest_source(self):
         async with self.make_configured_dry_script(grid=GridType.HEALPIX):
             self.find_offset_image_id = [
@@ -384,7 +717,7 @@ class TestBuildPointingModel(BaseScriptTestCase, unittest.IsolatedAsyncioTestCas
         self.script.camera.take_acq.assert_has_awaits(take_acq_calls)
 
         self.script.find_offset.assert_awaited_once_with(
-            image_id=self.find_offset_image_id[0]
+            image_id=self.find_offset_image_id[0], point_data=None
         )
 
         self.script.tcs.offset_xy.assert_awaited_once_with(
@@ -68,6 +68,7 @@ class TestCorrectPointing(BaseScriptTestCase, unittest.IsolatedAsyncioTestCase):
         # Mock the method that returns the BestEffortIsr class if it is
         # not available for import
         self.script.get_best_effort_isr = unittest.mock.Mock()
+        self.script.warm_up_measurement_service = unittest.mock.AsyncMock()
 
         return (self.script,)
 
@@ -84,6 +85,7 @@ class TestCorrectPointing(BaseScriptTestCase, unittest.IsolatedAsyncioTestCase):
             dict(mag_limit=9.0),
             dict(radius=1.0),
             dict(filter="SDSSr_65mm"),
+            dict(early_stop=True),
         ]
 
         self.remotes_needed = False
@@ -95,6 +97,7 @@ class TestCorrectPointing(BaseScriptTestCase, unittest.IsolatedAsyncioTestCase):
                 mag_limit=self.script.magnitude_limit,
                 mag_range=self.script.magnitude_range,
                 filter=self.script.filter,
+                early_stop=self.script.early_stop,
             )
             for config in configs_good:
                 await self.configure_script(**config)
@@ -115,6 +118,32 @@ class TestCorrectPointing(BaseScriptTestCase, unittest.IsolatedAsyncioTestCase):
                 await self.script._center()
             self.script.atcs.offset_xy.assert_not_awaited()
 
+    async def test_center_on_brightest_source_early_stop(self):
+        self.remotes_needed = False
+        for early_stop, expected_images in [(False, 4), (True, 2)]:
+            with self.subTest(early_stop=early_stop):
+                async with self.make_script():
+                    await self.configure_script(early_stop=early_stop)
+
+                    self.script._center = unittest.mock.AsyncMock(
+                        side_effect=[10.0, 3.0, 1.5, 0.5]
+                    )
+                    self.script.latiss.rem.atoods = unittest.mock.AsyncMock()
+                    self.script.latiss.rem.atoods.evt_imageInOODS.flush = (
+                        unittest.mock.Mock()
+                    )
+                    self.script.atcs.add_point_data = unittest.mock.AsyncMock()
+
+                    await self.script.center_on_brightest_source()
+
+                    assert self.script._center.await_count == expected_images
+                    self.script.atcs.add_point_data.assert_awaited_once()
+
+    def test_predict_residual(self):
+        assert CorrectPointing.predict_residual([10.0]) is None
+        assert CorrectPointing.predict_residual([3.0, 3.0]) is None
+        assert np.isclose(CorrectPointing.predict_residual([10.0, 3.0]), 0.9)
+
     def assert_config(self, default_values, config):
         configured_values = dict(
             az=self.script.azimuth,
@@ -123,6 +152,7 @@ class TestCorrectPointing(BaseScriptTestCase, unittest.IsolatedAsyncioTestCase):
             mag_limit=self.script.magnitude_limit,
             mag_range=self.script.magnitude_range,
             filter=self.script.filter,
+            early_stop=self.script.early_stop,
         )
 
         for parameter in default_values:
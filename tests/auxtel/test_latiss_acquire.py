@@ -19,17 +19,20 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
+import asyncio
 import contextlib
 import logging
 import os
 import tempfile
+import types
 import unittest
 
 import lsst.daf.butler as dafButler
 import pytest
+from lsst.geom import PointD
 from lsst.ts import salobj
 from lsst.ts.externalscripts import get_scripts_dir
-from lsst.ts.externalscripts.auxtel import LatissAcquire
+from lsst.ts.externalscripts.auxtel import ImageInOODSRegistry, LatissAcquire
 from lsst.ts.observatory.control.auxtel import ATCS, LATISS, ATCSUsages, LATISSUsages
 from lsst.ts.standardscripts import BaseScriptTestCase
 from lsst.ts.xml.enums.Script import ScriptState
@@ -103,6 +106,7 @@ class TestLatissAcquire(BaseScriptTestCase, unittest.IsolatedAsyncioTestCase):
         # Mock the method that returns the BestEffortIsr class if it is
         # not available for import
         self.script.get_best_effort_isr = unittest.mock.Mock()
+        self.script.warm_up_measurement_service = unittest.mock.AsyncMock()
 
         return (self.script,)
 
@@ -116,12 +120,11 @@ class TestLatissAcquire(BaseScriptTestCase, unittest.IsolatedAsyncioTestCase):
 
     async def setup_execute_acquisition_mocks(self):
         self.script.latiss.rem.atoods = unittest.mock.AsyncMock()
-        self.script.latiss.rem.atoods.evt_imageInOODS.attach_mock(
-            unittest.mock.Mock(),
-            "flush",
+        self.script.latiss.rem.atoods.evt_imageInOODS.callback = None
+        self.script.latiss.take_acq = unittest.mock.AsyncMock(
+            return_value=[2000010100123]
         )
-        self.script.latiss.take_acq = unittest.mock.AsyncMock()
-        self.script.get_next_image_data_id = unittest.mock.AsyncMock(
+        self.script.wait_image_in_oods = unittest.mock.AsyncMock(
             return_value=self.acq_image_id
         )
         self.script.find_offset = unittest.mock.AsyncMock(
@@ -168,6 +171,13 @@ class TestLatissAcquire(BaseScriptTestCase, unittest.IsolatedAsyncioTestCase):
                 user_final_y=100,
             ),
             dict(do_reacquire=True, program="test_program", reason="test_reason"),
+            dict(
+                object_name="HR8799",
+                program="test_program",
+                reason="test_reason",
+                fast_centroiding=True,
+                fast_centroiding_cutout_size=200,
+            ),
         ]
 
         self.remotes_needed = False
@@ -192,6 +202,8 @@ class TestLatissAcquire(BaseScriptTestCase, unittest.IsolatedAsyncioTestCase):
                     user_final_y=self.script.user_final_y,
                     reason=self.script.reason,
                     program=self.script.program,
+                    fast_centroiding=False,
+                    fast_centroiding_cutout_size=400,
                 )
 
                 self.assert_config(default_values, config)
@@ -290,6 +302,36 @@ class TestLatissAcquire(BaseScriptTestCase, unittest.IsolatedAsyncioTestCase):
 
             self.assert_execute_acquisition_fail_on_max_iters()
 
+    async def test_image_in_oods_registry(self):
+        topic = types.SimpleNamespace(callback=None)
+        registry = ImageInOODSRegistry(topic)
+
+        registry.start()
+        assert topic.callback is not None
+
+        with unittest.mock.patch(
+            "lsst.ts.externalscripts.auxtel.latiss_acquire.parse_obs_id",
+            side_effect=lambda obsid: dict(day_obs=20000101, seq_num=int(obsid)),
+            create=True,
+        ):
+            # Event arriving before the wait is not lost.
+            topic.callback(types.SimpleNamespace(obsid="123"))
+            data_id = await registry.wait(2000010100123, timeout=1.0)
+            assert data_id == dict(day_obs=20000101, seq_num=123)
+
+            # Event arriving after the wait started.
+            wait_task = asyncio.create_task(registry.wait(2000010100124, timeout=1.0))
+            await asyncio.sleep(0)
+            topic.callback(types.SimpleNamespace(obsid="124"))
+            data_id = await wait_task
+            assert data_id == dict(day_obs=20000101, seq_num=124)
+
+            with pytest.raises(asyncio.TimeoutError):
+                await registry.wait(2000010100125, timeout=0.1)
+
+        registry.stop()
+        assert topic.callback is None
+
     def assert_config(self, default_values, config):
         configured_values = dict(
             object_name=self.script.object_name,
@@ -311,6 +353,8 @@ class TestLatissAcquire(BaseScriptTestCase, unittest.IsolatedAsyncioTestCase):
             do_reacquire=self.script.do_reacquire,
             reason=self.script.reason,
             program=self.script.program,
+            fast_centroiding=self.script.fast_centroiding,
+            fast_centroiding_cutout_size=self.script.fast_centroiding_cutout_size,
         )
 
         for parameter in default_values:
@@ -321,8 +365,6 @@ class TestLatissAcquire(BaseScriptTestCase, unittest.IsolatedAsyncioTestCase):
                 )
 
     def assert_execute_acquisition(self):
-        self.script.latiss.rem.atoods.evt_imageInOODS.flush.assert_called_once()
-
         take_acq_calls = [
             unittest.mock.call(
                 exptime=2,
@@ -333,18 +375,18 @@ class TestLatissAcquire(BaseScriptTestCase, unittest.IsolatedAsyncioTestCase):
             ),
         ]
 
-        self.script.get_next_image_data_id.assert_awaited_once()
+        self.script.wait_image_in_oods.assert_awaited_once_with(2000010100123)
         self.script.latiss.take_acq.assert_has_awaits(take_acq_calls)
         self.script.find_offset.assert_awaited_once_with(
             self.acq_image_id,
             self.script.target_position_x,
             self.script.target_position_y,
+            predicted_position=None,
         )
 
     def assert_execute_acquisition_fail_on_max_iters(self):
         mocks_list = [
-            self.script.latiss.rem.atoods.evt_imageInOODS.flush,
-            self.script.get_next_image_data_id,
+            self.script.wait_image_in_oods,
             self.script.latiss.take_acq,
             self.script.find_offset,
             self.script.atcs.offset_xy,
@@ -353,6 +395,15 @@ class TestLatissAcquire(BaseScriptTestCase, unittest.IsolatedAsyncioTestCase):
         for mock in mocks_list:
             assert mock.call_count == self.script.max_acq_iter
 
+        # After the first offset the target is expected at the target
+        # position.
+        assert self.script.find_offset.await_args_list[0].kwargs[
+            "predicted_position"
+        ] is None
+        assert self.script.find_offset.await_args_list[-1].kwargs[
+            "predicted_position"
+        ] == PointD(self.script.target_position_x, self.script.target_position_y)
+
     async def set_test_configuration(self, **kwargs):
         test_configuration = self._generate_configuration(**kwargs)
 
@@ -125,6 +125,7 @@ class TestLatissAcquireAndTakeSequence(
         # not available for import
         if not DATA_AVAILABLE:
             self.script.get_best_effort_isr = unittest.mock.Mock()
+            self.script.warm_up_measurement_service = unittest.mock.AsyncMock()
 
         self.atcamera = None
         self.atheaderservice = None
@@ -136,6 +137,8 @@ class TestLatissAcquireAndTakeSequence(
 
         # things to track
         self.nimages = 0
+        self.reading_out = False  # Whether an image is reading out
+        self.setup_during_readout = []  # self.reading_out for each setup
         self.date = None  # Used to fake dataId output from takeImages
         self.seq_num_start = None  # Used to fake proper dataId from takeImages
 
@@ -164,6 +167,7 @@ class TestLatissAcquireAndTakeSequence(
     async def cmd_setup_atspec_callback(
         self, grating=None, filter=None, linear_stage=None
     ):
+        self.setup_during_readout.append(self.reading_out)
         list_to_be_returned = []
         if filter:
             list_to_be_returned.append(filter)
@@ -212,7 +216,12 @@ class TestLatissAcquireAndTakeSequence(
         logger.debug(
             f"Exposing for {one_exp_time} seconds for each exposure, total exposures is {data.numImages}"
         )
-        await asyncio.sleep(one_exp_time * data.numImages)
+        for _ in range(data.numImages):
+            await asyncio.sleep(one_exp_time - self.script.latiss.read_out_time)
+            await self.atcamera.evt_startReadout.write()
+            self.reading_out = True
+            await asyncio.sleep(self.script.latiss.read_out_time)
+            self.reading_out = False
         self.nimages += 1
         logger.debug("Scheduling finish_take_images before returning from take_images")
         self.end_image_tasks.append(asyncio.create_task(self.finish_take_images()))
@@ -343,6 +352,28 @@ class TestLatissAcquireAndTakeSequence(
             assert self.script.time_on_target >= acq_exposure_time + sum(
                 exposure_time_sequence
             )
+            assert self.script.reorder_sequence is False
+            assert self.script.overlap_instrument_setup is True
+
+        async with self.make_script():
+            # Visits with the same filter and grating are grouped together
+            await self.configure_script(
+                do_take_sequence=True,
+                object_name=object_name,
+                filter_sequence=["test_filt1", "test_filt2", "test_filt1"],
+                grating_sequence="test_disp1",
+                exposure_time_sequence=[20.0, 60.0, 30.0],
+                reorder_sequence=True,
+                overlap_instrument_setup=False,
+                reason=reason,
+                program=program,
+            )
+            assert self.script.visit_configs == [
+                ("test_filt1", 20.0, "test_disp1"),
+                ("test_filt1", 30.0, "test_disp1"),
+                ("test_filt2", 60.0, "test_disp1"),
+            ]
+            assert self.script.overlap_instrument_setup is False
 
     @unittest.skipIf(
         DATA_AVAILABLE is False,
@@ -673,6 +704,65 @@ class TestLatissAcquireAndTakeSequence(
             # Make sure offset was applied to telescope
             self.script.atcs.offset_xy.assert_called()
 
+    async def test_take_sequence_overlap_instrument_setup(self):
+        async with self.make_script():
+            # Date for file to be produced
+            self.date = "20200316"
+            # sequence number start
+            self.seq_num_start = 130
+            filter_sequence = ["test_filt1", "test_filt2"]
+            grating_sequence = "test_disp1"
+            await self.configure_script(
+                object_name="HR8799",
+                grating_sequence=grating_sequence,
+                filter_sequence=filter_sequence,
+                exposure_time_sequence=[0.3, 0.8],
+                do_acquire=False,
+                do_take_sequence=True,
+                reason="test",
+                program="test_program",
+            )
+
+            self.script.latiss.take_object = unittest.mock.AsyncMock(
+                wraps=self.script.latiss.take_object
+            )
+
+            # publish ataos event saying corrections are enabled
+            await self.ataos.evt_correctionEnabled.set_write(
+                atspectrograph=True, hexapod=True
+            )
+
+            # Send spectrograph events
+            await self.atspectrograph.evt_reportedFilterPosition.set_write(
+                name="filter0"
+            )
+            await self.atspectrograph.evt_reportedDisperserPosition.set_write(
+                name="disp0"
+            )
+            await self.atspectrograph.evt_reportedLinearStagePosition.set_write(
+                position=65
+            )
+
+            await self.run_script()
+
+            assert self.atcamera.cmd_takeImages.callback.await_count == 2
+
+            # The second filter is set up while the first image reads out.
+            setups = [
+                (call.kwargs.get("filter"), reading_out)
+                for call, reading_out in zip(
+                    self.script.latiss.setup_atspec.call_args_list,
+                    self.setup_during_readout,
+                )
+                if call.kwargs.get("filter") is not None
+            ]
+            assert setups == [("test_filt1", False), ("test_filt2", True)]
+
+            # The second image skips the instrument setup.
+            second_take_object = self.script.latiss.take_object.call_args_list[1]
+            assert second_take_object.kwargs["filter"] is None
+            assert second_take_object.kwargs["grating"] is None
+
     async def test_executable(self):
         scripts_dir = externalscripts.get_scripts_dir()
         script_path = scripts_dir / "auxtel" / "latiss_acquire_and_take_sequence.py"
@@ -0,0 +1,110 @@
+# This file is part of ts_standardscripts
+#
+# Developed for the LSST Telescope and Site Systems.
+# This product includes software developed by the LSST Project
+# (https://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import logging
+import types
+import unittest
+
+import numpy as np
+import pytest
+from lsst.ts.externalscripts import StageTimer
+from lsst.ts.externalscripts.auxtel import (
+    LatissAlignReplay,
+    ReplayATCS,
+    ReplayExposureProvider,
+    ReplayLATISS,
+)
+from lsst.ts.externalscripts.auxtel.latiss_base_align import LatissAlignResults
+
+
+class TestLatissAlignReplay(unittest.IsolatedAsyncioTestCase):
+    async def test_replay_exposure_provider(self):
+        exposure_provider = ReplayExposureProvider(stage_timer=StageTimer())
+
+        intra_visit_id = exposure_provider.add("intra.fits")
+        extra_visit_id = exposure_provider.add("extra.fits")
+
+        assert extra_visit_id == intra_visit_id + 1
+        assert exposure_provider.paths[intra_visit_id] == "intra.fits"
+        assert exposure_provider.paths[extra_visit_id] == "extra.fits"
+
+    async def test_replay_atcs(self):
+        atcs = ReplayATCS(hexapod_error=(0.1, -0.1, 0.05), bore_sight_angle=30.0)
+
+        # Intra/extra focal offsets and return to focus cancel out.
+        await atcs.offset_aos_lut(z=0.8)
+        await atcs.offset_aos_lut(z=-1.6011)
+        await atcs.offset_aos_lut(z=0.8011)
+        await atcs.offset_aos_lut(x=-0.1, y=0.1, z=-0.05)
+
+        np.testing.assert_allclose(atcs.hexapod_error, [0.0, 0.0, 0.0], atol=1e-12)
+        assert atcs.hexapod_moves == 4
+        assert await atcs.get_bore_sight_angle() == pytest.approx(30.0)
+
+        hexapod_position = await atcs.rem.athexapod.tel_positionStatus.aget(
+            timeout=1.0
+        )
+        assert len(hexapod_position.reportedPosition) == 6
+
+    async def test_replay_latiss(self):
+        latiss = ReplayLATISS([(1, 2), (3, 4)])
+
+        visit_ids = [(await latiss.take_cwfs(exptime=1.0))[0] for _ in range(6)]
+        await latiss.take_acq(1.0)
+
+        assert visit_ids == [1, 2, 3, 4, 1, 2]
+        assert latiss.exposures == 7
+
+    async def test_perturb_results(self):
+        recorded_offset = np.array([0.01, -0.02, 0.03])
+        script = types.SimpleNamespace(
+            log=logging.getLogger("test_perturb_results"),
+            stage_timer=StageTimer(),
+            calculate_results=lambda: LatissAlignResults(
+                zernikes=np.zeros(3),
+                zernikes_rot=np.zeros(3),
+                offset_hex=recorded_offset,
+                offset_tel=np.zeros(2),
+            ),
+            dz=0.8,
+            extra_focal_offset=0.0011,
+            at_extra_focal_position=False,
+            gain=0.5,
+            hexapod_offset_scale=np.ones((3, 2)),
+        )
+        replay = LatissAlignReplay(
+            script, [("intra.fits", "extra.fits")], hexapod_error=(0.1, -0.1, 0.05)
+        )
+
+        results = replay.perturb_results()
+
+        np.testing.assert_allclose(
+            results.offset_hex, recorded_offset - 0.5 * np.array([0.1, -0.1, 0.05])
+        )
+        np.testing.assert_allclose(results.offset_tel, [results.offset_hex.sum()] * 2)
+
+        # The defocus of the extra-focal position is not a misalignment.
+        script.at_extra_focal_position = True
+        await replay.atcs.offset_aos_lut(z=-0.8011)
+
+        np.testing.assert_allclose(
+            replay.perturb_results().offset_hex, results.offset_hex
+        )
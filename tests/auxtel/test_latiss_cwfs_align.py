@@ -371,6 +371,33 @@ class TestLatissCWFSAlign(
 
         return bore_sight_angle
 
+    @unittest.skipIf(
+        CWFS_AVAILABLE is False,
+        f"CWFS package availibility is {CWFS_AVAILABLE}. "
+        "Skipping test_cwfs_instrument.",
+    )
+    async def test_cwfs_instrument(self):
+        async with self.make_script():
+            self.script.dz = 1.2
+            self.script.binning = 2
+
+            config_dir = self.script._cwfs_config_dir
+
+            # The instrument is built from the private configuration.
+            assert os.path.isfile(os.path.join(config_dir, "auxtel_latiss.param"))
+            assert self.script.inst.offset == pytest.approx(1.2 * 0.041)
+            assert self.script.inst.pixelSize == pytest.approx(2e-5)
+
+            # Changing dz and binning back reuses the cached instrument.
+            inst = self.script.inst
+            self.script.binning = 1
+            self.script.binning = 2
+            assert self.script.inst is inst
+
+            await self.script.cleanup()
+
+            assert not os.path.exists(config_dir)
+
     @unittest.skipIf(
         CWFS_AVAILABLE is False or DATA_AVAILABLE is False,
         f"CWFS package availibility is {CWFS_AVAILABLE}."
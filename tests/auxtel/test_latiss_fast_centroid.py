@@ -0,0 +1,59 @@
+# This file is part of ts_standardscripts
+#
+# Developed for the LSST Telescope and Site Systems.
+# This product includes software developed by the LSST Project
+# (https://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import unittest
+
+import numpy as np
+import pytest
+from lsst.ts.externalscripts.auxtel import find_cutout_centroid
+
+
+class TestLatissFastCentroid(unittest.TestCase):
+    def make_cutout(self, x, y, flux=5e4, sigma=3.0, size=200):
+        rng = np.random.default_rng(42)
+        yy, xx = np.mgrid[0:size, 0:size]
+        star = (
+            flux
+            / (2.0 * np.pi * sigma**2)
+            * np.exp(-((xx - x) ** 2 + (yy - y) ** 2) / (2.0 * sigma**2))
+        )
+        return 1000.0 + star + rng.normal(0.0, 5.0, size=(size, size))
+
+    def test_find_cutout_centroid(self):
+        cutout = self.make_cutout(x=87.3, y=112.6)
+        # A cosmic ray, brighter than the star peak but a single pixel.
+        cutout[20, 30] += 5000.0
+
+        centroid = find_cutout_centroid(cutout)
+
+        assert centroid is not None
+        assert centroid[0] == pytest.approx(87.3, abs=0.1)
+        assert centroid[1] == pytest.approx(112.6, abs=0.1)
+
+    def test_find_cutout_centroid_no_source(self):
+        cutout = self.make_cutout(x=100.0, y=100.0, flux=0.0)
+
+        assert find_cutout_centroid(cutout) is None
+
+    def test_find_cutout_centroid_source_on_edge(self):
+        cutout = self.make_cutout(x=3.0, y=100.0)
+
+        assert find_cutout_centroid(cutout) is None
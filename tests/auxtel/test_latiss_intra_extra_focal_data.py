@@ -380,6 +380,68 @@ class TestLatissIntraExtraFocalData(
 
         return bore_sight_angle
 
+    async def test_take_intra_extra_skip_return_to_focus(self):
+        async with self.make_script():
+            await self.configure_script(skip_return_to_focus=True)
+
+            self.script.atcs = unittest.mock.AsyncMock()
+            self.script.atcs.get_bore_sight_angle.return_value = 0.0
+            self.script.latiss = unittest.mock.AsyncMock()
+            self.script.latiss.take_cwfs.side_effect = [[1], [2], [3], [4]]
+            self.script.next_supplemented_group_id = unittest.mock.Mock(
+                return_value="test_group_id"
+            )
+
+            dz = self.script.dz
+            extra_focal_offset = self.script.extra_focal_offset
+
+            await self.script.take_intra_extra(return_to_focus=False)
+
+            assert self.script.at_extra_focal_position
+            assert self.script.atcs.offset_aos_lut.await_count == 2
+
+            # Correction is combined with the move to the next intra-focal
+            # position.
+            await self.script.apply_correction(z=0.01, next_intra=True)
+
+            assert self.script.at_intra_focal_position
+            assert not self.script.at_extra_focal_position
+            assert self.script.atcs.offset_aos_lut.await_args.kwargs[
+                "z"
+            ] == pytest.approx(0.01 + 2.0 * dz + extra_focal_offset)
+
+            # No hexapod move needed for the intra-focal image.
+            await self.script.take_intra_extra()
+
+            assert self.script.atcs.offset_aos_lut.await_count == 5
+            assert not self.script.at_intra_focal_position
+            assert not self.script.at_extra_focal_position
+
+    async def test_align_gain_controller(self):
+        gain_controller = externalscripts.auxtel.latiss_base_align.AlignGainController(
+            gain=[0.5, 0.5, 0.9], tolerance=[0.2, 0.2, 0.004]
+        )
+
+        gain = gain_controller.update([1.0, 1.0, 0.1])
+        np.testing.assert_allclose(gain, [0.5, 0.5, 0.9])
+        gain_controller.add_correction(gain * [1.0, 1.0, 0.1])
+
+        # x responded as expected, y and z only realized half of the
+        # correction.
+        gain = gain_controller.update([0.5, 0.75, 0.1 - 0.09 * 0.5])
+        np.testing.assert_allclose(gain, [0.5, 1.0, 1.0])
+
+        gain_controller.add_correction(gain * [0.5, 0.75, 0.055])
+        assert not gain_controller.is_diverging()
+
+        gain_controller.update([0.6, 0.8, 0.06])
+        assert not gain_controller.is_diverging()
+        gain_controller.add_correction([0.0, 0.0, 0.0])
+        gain_controller.update([0.7, 0.9, 0.07])
+        assert gain_controller.is_diverging()
+
+        np.testing.assert_allclose(gain_controller.reset(), [0.5, 0.5, 0.9])
+
     async def test_executable(self):
         scripts_dir = externalscripts.get_scripts_dir()
         script_path = scripts_dir / "auxtel" / "latiss_intra_extra_focal_data.py"
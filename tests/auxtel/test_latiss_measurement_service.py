@@ -0,0 +1,98 @@
+# This file is part of ts_externalscripts
+#
+# Developed for the LSST Telescope and Site Systems.
+# This product includes software developed by the LSST Project
+# (https://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import asyncio
+import types
+import unittest
+
+import pytest
+from lsst.ts.externalscripts.auxtel import (
+    LatissMeasurementService,
+    get_measurement_service,
+)
+
+
+class TestLatissMeasurementService(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.service = LatissMeasurementService(cache_size=2)
+        self.service._best_effort_isr = unittest.mock.Mock()
+        self.service._quick_measurement = unittest.mock.Mock()
+        self.service._quick_measurement.run.side_effect = (
+            lambda exposure: types.SimpleNamespace(
+                success=True, brightestObjCentroid=(exposure, exposure)
+            )
+        )
+
+        async def get_image(data_id, best_effort_isr, timeout):
+            await asyncio.sleep(0.1)
+            return data_id["seq_num"]
+
+        self.get_image = unittest.mock.AsyncMock(side_effect=get_image)
+        patcher = unittest.mock.patch(
+            "lsst.ts.externalscripts.auxtel.latiss_measurement_service.get_image",
+            self.get_image,
+            create=True,
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def asyncTearDown(self):
+        self.service.shutdown()
+
+    async def test_measure(self):
+        data_id = dict(day_obs=20240101, seq_num=1)
+
+        results = await asyncio.gather(
+            self.service.measure(data_id, timeout=1.0),
+            self.service.measure(data_id, timeout=1.0),
+        )
+        result = await self.service.measure(data_id, timeout=1.0)
+
+        # Concurrent and repeated requests share a single measurement.
+        self.get_image.assert_awaited_once()
+        self.service.quick_measurement.run.assert_called_once_with(1)
+        assert results[0] is results[1] is result
+        assert result.brightestObjCentroid == (1, 1)
+
+    async def test_measure_cache_size(self):
+        for seq_num in [1, 2, 3, 1]:
+            await self.service.measure(
+                dict(day_obs=20240101, seq_num=seq_num), timeout=1.0
+            )
+
+        # The first image was dropped from the cache and measured again.
+        assert self.get_image.await_count == 4
+
+    async def test_measure_fail(self):
+        self.get_image.side_effect = asyncio.TimeoutError()
+        data_id = dict(day_obs=20240101, seq_num=1)
+
+        with pytest.raises(asyncio.TimeoutError):
+            await self.service.measure(data_id, timeout=1.0)
+
+        # Failures are not cached.
+        with pytest.raises(asyncio.TimeoutError):
+            await self.service.measure(data_id, timeout=1.0)
+
+        assert self.get_image.await_count == 2
+
+    def test_get_measurement_service(self):
+        assert get_measurement_service() is get_measurement_service()
@@ -50,8 +50,8 @@ class TestTakeTwilightFlatsLatiss(
 
     def mock_consdb(self):
         """Mock consdb and its methods."""
-        self.script.client = mock.Mock()
-        self.script.client.wait_for_item_in_row = mock.Mock(return_value=15000)
+        self.script.client = mock.AsyncMock()
+        self.script.client.wait_for_item_in_row = mock.AsyncMock(return_value=15000)
 
     def mock_vizier(self):
         """Mock Vizier catalog"""
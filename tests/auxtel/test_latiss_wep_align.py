@@ -21,6 +21,7 @@
 
 import asyncio
 import os
+import types
 import unittest
 import warnings
 
@@ -40,6 +41,7 @@ import logging
 import lsst.daf.butler as dafButler
 from lsst.ts import externalscripts, salobj, standardscripts
 from lsst.ts.externalscripts.auxtel import LatissWEPAlign
+from lsst.ts.externalscripts.auxtel.latiss_wep_align import find_donuts, match_donuts
 from lsst.utils import getPackageDir
 
 # Make matplotlib less chatty
@@ -250,6 +252,22 @@ class TestLatissWEPAlign(
             assert self.script.cwfs_target is None
             assert self.script.cwfs_target_ra is None
             assert self.script.cwfs_target_dec is None
+            assert self.script.n_donuts == 1
+
+        # Test with multiple donuts
+        async with self.make_script():
+            self.script.atcs = unittest.mock.AsyncMock()
+            self.script.latiss = unittest.mock.AsyncMock()
+            await self.configure_script(n_donuts=3)
+
+            assert self.script.n_donuts == 3
+
+        # Test with multiple donuts; fail if no donut is requested
+        async with self.make_script():
+            self.script.atcs = unittest.mock.AsyncMock()
+            self.script.latiss = unittest.mock.AsyncMock()
+            with pytest.raises(salobj.ExpectedError):
+                await self.configure_script(n_donuts=0)
 
         # Test with find_target
         # this can fail occasionally if you're unlucky and
@@ -708,3 +726,114 @@ class TestLatissWEPAlign(
         script_path = scripts_dir / "auxtel" / "latiss_wep_align.py"
         logger.debug(f"Checking for script in {script_path}")
         await self.check_executable(script_path)
+
+
+class TestFindDonuts(unittest.TestCase):
+    """Test the donut detection and intra/extra matching on synthetic
+    images.
+    """
+
+    donut_diameter = 40
+
+    def make_exposure(self, donuts, seed):
+        """Make a synthetic exposure with donuts.
+
+        Parameters
+        ----------
+        donuts : `list` [`tuple` [`float`, `float`, `float`]]
+            x/y centers (in pixels) and amplitude of the donuts.
+        seed : `int`
+            Seed of the noise.
+        """
+        rng = np.random.default_rng(seed)
+        image = rng.normal(100.0, 5.0, size=(400, 600))
+        y, x = np.indices(image.shape)
+        for center_x, center_y, amplitude in donuts:
+            radius = np.hypot(x - center_x, y - center_y)
+            image[(radius > 8) & (radius < self.donut_diameter / 2)] += amplitude
+
+        return types.SimpleNamespace(image=types.SimpleNamespace(array=image))
+
+    def test_find_donuts(self):
+        exposure = self.make_exposure(
+            [
+                (100.0, 100.0, 50.0),
+                (300.0, 150.0, 30.0),
+                (450.0, 300.0, 20.0),
+                # Too close to the edge to be cut out.
+                (15.0, 250.0, 80.0),
+                # Too close to the brightest donut.
+                (100.0, 145.0, 10.0),
+            ],
+            seed=1,
+        )
+
+        centroids, fluxes = find_donuts(
+            exposure, donut_diameter=self.donut_diameter, n_donuts=5
+        )
+
+        # Brightest first, within a block of the true position.
+        np.testing.assert_allclose(
+            centroids, [[100.0, 100.0], [300.0, 150.0], [450.0, 300.0]], atol=10.0
+        )
+        assert fluxes[0] > fluxes[1] > fluxes[2]
+
+        centroids, fluxes = find_donuts(
+            exposure, donut_diameter=self.donut_diameter, n_donuts=2
+        )
+
+        np.testing.assert_allclose(
+            centroids, [[100.0, 100.0], [300.0, 150.0]], atol=10.0
+        )
+
+        centroids, fluxes = find_donuts(
+            self.make_exposure([], seed=2),
+            donut_diameter=self.donut_diameter,
+            n_donuts=5,
+        )
+
+        assert centroids.shape == (0, 2)
+        assert len(fluxes) == 0
+
+    def test_match_donuts(self):
+        intra = self.make_exposure(
+            [(100.0, 100.0, 50.0), (300.0, 150.0, 30.0), (450.0, 300.0, 20.0)],
+            seed=3,
+        )
+        # Donuts shifted between the images, with different brightness, and
+        # a donut only in the extra focal image.
+        extra = self.make_exposure(
+            [
+                (307.0, 146.0, 60.0),
+                (107.0, 96.0, 40.0),
+                (457.0, 296.0, 20.0),
+                (500.0, 80.0, 15.0),
+            ],
+            seed=4,
+        )
+
+        centroids_intra, _ = find_donuts(
+            intra, donut_diameter=self.donut_diameter, n_donuts=5
+        )
+        centroids_extra, _ = find_donuts(
+            extra, donut_diameter=self.donut_diameter, n_donuts=5
+        )
+
+        intra_index, extra_index = match_donuts(
+            centroids_intra, centroids_extra, max_distance=self.donut_diameter / 2
+        )
+
+        assert len(intra_index) == 3
+        np.testing.assert_allclose(
+            centroids_intra[intra_index], centroids_extra[extra_index], atol=20.0
+        )
+        # The donut only in the extra focal image, the faintest, is not matched.
+        assert len(centroids_extra) == 4
+        assert 3 not in extra_index
+
+        # Nothing to match.
+        intra_index, extra_index = match_donuts(
+            centroids_intra, np.zeros((0, 2)), max_distance=self.donut_diameter / 2
+        )
+
+        assert len(intra_index) == len(extra_index) == 0
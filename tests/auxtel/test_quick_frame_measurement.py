@@ -0,0 +1,128 @@
+# This file is part of ts_externalscripts
+#
+# Developed for the LSST Telescope and Site Systems.
+# This product includes software developed by the LSST Project
+# (https://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import asyncio
+import os
+import tempfile
+import types
+import unittest
+import unittest.mock
+
+import numpy as np
+import pytest
+from astropy.table import Table
+from lsst.ts import salobj
+from lsst.ts.externalscripts.auxtel.functional_tests import QuickFrameMeasurement
+from lsst.ts.standardscripts import BaseScriptTestCase
+
+
+class TestQuickFrameMeasurement(BaseScriptTestCase, unittest.IsolatedAsyncioTestCase):
+    async def basic_make_script(self, index):
+        self.script = QuickFrameMeasurement(index=index)
+
+        # Mock the methods that construct the BestEffortIsr and the
+        # measurement task.
+        self.script.get_best_effort_isr = unittest.mock.Mock()
+        self.script.warm_up_measurement_service = unittest.mock.AsyncMock()
+
+        # Failed images have seq_num 6, unsuccessful measurements 7.
+        async def measure(data_id, timeout):
+            await asyncio.sleep(0.1)
+            seq_num = data_id["seq_num"]
+            if seq_num == 6:
+                raise RuntimeError("Image not available.")
+            return types.SimpleNamespace(
+                success=seq_num != 7,
+                brightestObjCentroid=(float(seq_num), 2.0 * seq_num),
+            )
+
+        self.script.measurement_service = unittest.mock.Mock()
+        self.script.measurement_service.measure = unittest.mock.AsyncMock(
+            side_effect=measure
+        )
+
+        return (self.script,)
+
+    async def test_configure_batch(self):
+        async with self.make_script():
+            await self.configure_script(
+                batch=dict(
+                    visit_ids=["AT_O_20240101_000010"],
+                    day_obs=20240102,
+                    seq_num_start=3,
+                    seq_num_end=5,
+                )
+            )
+
+            assert [
+                (int(data_id["day_obs"]), int(data_id["seq_num"]))
+                for data_id in self.script.data_ids
+            ] == [(20240101, 10), (20240102, 3), (20240102, 4), (20240102, 5)]
+            self.script.warm_up_measurement_service.assert_awaited_once()
+
+        async with self.make_script():
+            with pytest.raises(salobj.ExpectedError):
+                await self.configure_script(batch=dict())
+
+    async def test_run_batch(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            summary_file = os.path.join(tmp_dir, "summary.ecsv")
+
+            async with self.make_script():
+                await self.configure_script(
+                    batch=dict(
+                        day_obs=20240102,
+                        seq_num_start=4,
+                        seq_num_end=5,
+                        max_concurrent=2,
+                        summary_file=summary_file,
+                    )
+                )
+
+                await self.script.run_batch()
+
+                assert self.script.measurement_service.measure.await_count == 2
+                summary = Table.read(summary_file, format="ascii.ecsv")
+
+        for table in (self.script.summary, summary):
+            assert list(table["seq_num"]) == [4, 5]
+            assert all(table["success"])
+            np.testing.assert_allclose(table["centroid_x"], [4.0, 5.0])
+            np.testing.assert_allclose(table["centroid_y"], [8.0, 10.0])
+            assert all(table["duration"] > 0.0)
+
+    async def test_run_batch_failures(self):
+        async with self.make_script():
+            await self.configure_script(
+                batch=dict(day_obs=20240102, seq_num_start=5, seq_num_end=7)
+            )
+
+            with pytest.raises(RuntimeError, match="2 of 3 visits: 20240102/6"):
+                await self.script.run_batch()
+
+            summary = self.script.summary
+            assert list(summary["seq_num"]) == [5, 6, 7]
+            assert list(summary["success"]) == [True, False, False]
+            assert "Image not available." in summary["error"][1]
+            assert summary["error"][2] == ""
+            assert np.isnan(summary["centroid_x"][1])
+            assert np.isnan(summary["centroid_x"][2])
+
@@ -19,9 +19,12 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
+import os
+import tempfile
 import unittest
 
-from lsst.ts import externalscripts, standardscripts
+import pytest
+from lsst.ts import externalscripts, salobj, standardscripts
 from lsst.ts.externalscripts.auxtel import WepCheckout
 
 
@@ -69,6 +72,32 @@ class TestWepCheckout(
             )
             assert self.script.config.threshold == config["threshold"]
 
+    async def test_configure_batch(self):
+        async with self.make_script():
+            with tempfile.TemporaryDirectory() as tmpdir:
+                with open(os.path.join(tmpdir, "pairs.txt"), "w") as fp:
+                    fp.write("# intra extra\n2021110400956 2021110400957\n\n")
+
+                await self.configure_script(
+                    batch=dict(
+                        visit_pairs=[["2021110400954", "2021110400955"]],
+                        visit_pairs_glob=os.path.join(tmpdir, "*.txt"),
+                        max_workers=2,
+                    )
+                )
+
+            assert self.script.visit_pairs == [
+                ("2021110400954", "2021110400955"),
+                ("2021110400956", "2021110400957"),
+            ]
+            assert self.script.config.batch["max_workers"] == 2
+            assert self.script.config.batch["summary_file"] is None
+
+    async def test_configure_batch_without_pairs(self):
+        async with self.make_script():
+            with pytest.raises(salobj.ExpectedError):
+                await self.configure_script(batch=dict())
+
     async def test_executable(self):
         scripts_dir = externalscripts.get_scripts_dir()
         script_path = scripts_dir / "auxtel" / "wep_checkout.py"
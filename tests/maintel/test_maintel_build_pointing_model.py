@@ -139,6 +139,7 @@ class TestBuildPointingModel(BaseScriptTestCase, unittest.IsolatedAsyncioTestCas
             dict(radec_grid=dict(ha_grid=dict(max=14))),
             dict(radec_grid=dict(ha_grid=dict(n=[]))),
             dict(grid="radec", radec_grid=dict(ha_grid=dict(n=[3, 5, 6]))),
+            dict(pipeline_measurements=True, point_data_file="point_data.ecsv"),
         ]
         for config in bad_config:
             with self.subTest(config=config), self.assertRaises(salobj.ExpectedError):
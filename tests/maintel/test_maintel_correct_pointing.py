@@ -1,3 +1,10 @@
+import asyncio
+import concurrent.futures
+import json
+import os
+import pathlib
+import tempfile
+import threading
 import unittest
 import unittest.mock as mock
 
@@ -7,7 +14,12 @@ from astropy import units
 from astropy.coordinates import AltAz
 from astropy.table import Table
 from lsst.ts import externalscripts, salobj, standardscripts
-from lsst.ts.externalscripts.maintel.correct_pointing import CorrectPointing
+from lsst.ts.externalscripts.maintel.correct_pointing import (
+    CorrectPointing,
+    PointingErrorEstimator,
+    RubinTVSidecarWatcher,
+)
+from lsst.ts.externalscripts.maintel.local_wcs_solver import mean_coordinates
 
 
 class TestCorrectPointing(
@@ -55,8 +67,8 @@ class TestCorrectPointing(
 
     def mock_consdb(self):
         """Mock ConsDB client and its methods."""
-        self.script.consdb_client = mock.Mock()
-        self.script.consdb_client.wait_for_row_to_exist = mock.Mock(
+        self.script.consdb_client = mock.AsyncMock()
+        self.script.consdb_client.wait_for_row_to_exist = mock.AsyncMock(
             side_effect=self.mock_consdb_wait_for_row
         )
 
@@ -184,6 +196,106 @@ class TestCorrectPointing(
             assert dec_deg == -17.12345
             assert self.script.consdb_client.wait_for_row_to_exist.call_count == 1
 
+    async def test_get_measured_coordinates_local_solver(self):
+        async with self.make_script():
+            await self.configure_script(local_solver=dict(index_path="/data/index"))
+
+            assert self.script.local_solver["detectors"] == [93, 94, 95]
+            assert self.script.local_solver_executor is not None
+
+            async def wait_for_row(query, timeout):
+                await asyncio.sleep(5.0)
+                return Table(rows=[[28.65432, -17.12345]], names=["s_ra", "s_dec"])
+
+            self.script.consdb_client.wait_for_row_to_exist = mock.AsyncMock(
+                side_effect=wait_for_row
+            )
+            self.script.get_measured_coordinates_from_local_solver = mock.AsyncMock(
+                return_value=(28.6543, -17.1234)
+            )
+
+            # The local solver answers first.
+            ra_deg, dec_deg = await asyncio.wait_for(
+                self.script.get_measured_coordinates(123456), timeout=1.0
+            )
+
+            assert (ra_deg, dec_deg) == (28.6543, -17.1234)
+
+            # If the local solver fails, ConsDB is used.
+            self.script.consdb_client.wait_for_row_to_exist = mock.AsyncMock(
+                side_effect=self.mock_consdb_wait_for_row
+            )
+            self.script.get_measured_coordinates_from_local_solver = mock.AsyncMock(
+                side_effect=RuntimeError("Local solver failed.")
+            )
+
+            ra_deg, dec_deg = await self.script.get_measured_coordinates(123456)
+
+            assert (ra_deg, dec_deg) == (28.65432, -17.12345)
+
+            await self.script.cleanup()
+
+    async def test_get_measured_coordinates_local_solver_stale(self):
+        async with self.make_script():
+            await self.configure_script(local_solver=dict(index_path="/data/index"))
+
+            # Run the solves in threads, which keep running until released.
+            self.script.local_solver_executor.shutdown(wait=False)
+            self.script.local_solver_executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=3
+            )
+            release = threading.Event()
+            active_exposures = []
+
+            def solve_boresight(exposure_id, detector, index_path, timeout):
+                release.wait(timeout=5.0)
+                active_exposures.append(self.script.local_solver_active_exposure.value)
+                raise RuntimeError("Solution no longer needed.")
+
+            with mock.patch(
+                "lsst.ts.externalscripts.maintel.correct_pointing.solve_boresight",
+                side_effect=solve_boresight,
+            ) as mock_solve_boresight:
+                # ConsDB answers first and the solves are signalled to stop.
+                ra_deg, dec_deg = await asyncio.wait_for(
+                    self.script.get_measured_coordinates(123456), timeout=1.0
+                )
+
+                assert (ra_deg, dec_deg) == (28.65432, -17.12345)
+                assert mock_solve_boresight.call_count == 3
+                assert self.script.local_solver_active_exposure.value == 0
+
+                # No new solves are submitted while the stale ones run.
+                ra_deg, dec_deg = await asyncio.wait_for(
+                    self.script.get_measured_coordinates(123457), timeout=1.0
+                )
+
+                assert (ra_deg, dec_deg) == (28.65432, -17.12345)
+                assert mock_solve_boresight.call_count == 3
+
+                release.set()
+                await asyncio.wait_for(
+                    asyncio.gather(
+                        *[
+                            asyncio.wrap_future(future)
+                            for future in self.script.local_solver_futures
+                        ],
+                        return_exceptions=True,
+                    ),
+                    timeout=5.0,
+                )
+
+            assert active_exposures == [0, 0, 0]
+
+            await self.script.cleanup()
+
+    def test_mean_coordinates(self):
+        ra_deg, dec_deg = mean_coordinates([(359.9, -10.0), (0.1, -10.0)])
+
+        # The mean is at the wrap-around of RA.
+        assert min(ra_deg, 360.0 - ra_deg) == pytest.approx(0.0, abs=1e-6)
+        assert dec_deg == pytest.approx(-10.0, abs=1e-4)
+
     async def test_run_converges_immediately(self):
         async with self.make_script():
             await self.configure_script(tolerance_arcsec=1000.0)
@@ -228,7 +340,7 @@ class TestCorrectPointing(
 
                 return Table(rows=[[ra, dec]], names=["s_ra", "s_dec"])
 
-            self.script.consdb_client.wait_for_row_to_exist = mock.Mock(
+            self.script.consdb_client.wait_for_row_to_exist = mock.AsyncMock(
                 side_effect=mock_consdb_responses
             )
 
@@ -260,6 +372,106 @@ class TestCorrectPointing(
             for call in self.script.mtcs.offset_azel.call_args_list:
                 assert call.kwargs["absorb"] is True
 
+    async def test_run_predictive(self):
+        async with self.make_script():
+            await self.configure_script(
+                tolerance_arcsec=1.0,
+                max_iterations=5,
+                predictive=True,
+                predictive_threshold_arcsec=10.0,
+            )
+
+            pointing_error = np.array([3.0, -4.0])
+            correction = [np.zeros(2)]
+            correction_at_exposure = dict()
+            measured_exposures = []
+            # Number of previous images waiting for measurements when each
+            # image is taken.
+            n_pending = []
+
+            async def take_acq(**kwargs):
+                exposure_id = len(correction_at_exposure) + 1
+                correction_at_exposure[exposure_id] = correction[0]
+                n_pending.append(exposure_id - 1 - len(measured_exposures))
+                return [exposure_id]
+
+            async def offset_azel(az, el, absorb):
+                correction[0] = correction[0] + np.array([az, el])
+
+            async def measure_offset(exposure_id, target_ra_angle, target_dec_angle):
+                await asyncio.sleep(0.1)
+                measured_exposures.append(exposure_id)
+                offset = pointing_error - correction_at_exposure[exposure_id]
+                return offset[0], offset[1], float(np.hypot(*offset))
+
+            self.script.lsstcam.take_acq = mock.AsyncMock(side_effect=take_acq)
+            self.script.mtcs.offset_azel = mock.AsyncMock(side_effect=offset_azel)
+            self.script.measure_offset = mock.AsyncMock(side_effect=measure_offset)
+
+            await self.script.run()
+
+            self.script.mtcs.offset_azel.assert_awaited_once_with(
+                az=pytest.approx(3.0), el=pytest.approx(-4.0), absorb=True
+            )
+            # After the offset, the next image is taken without waiting for
+            # the measurement of the previous one.
+            assert n_pending == [0, 0, 1]
+
+    def test_pointing_error_estimator(self):
+        estimator = PointingErrorEstimator(measurement_noise=0.3, process_noise=0.0)
+
+        estimator.update(np.array([3.0, -4.0]), np.zeros(2))
+        np.testing.assert_allclose(estimator.residual, [3.0, -4.0])
+        assert estimator.uncertainty == pytest.approx(0.3)
+
+        estimator.add_correction(np.array([3.0, -4.0]))
+        np.testing.assert_allclose(estimator.residual, [0.0, 0.0])
+
+        # Image taken before the correction, with a different measurement.
+        estimator.update(np.array([3.2, -4.2]), np.zeros(2))
+        np.testing.assert_allclose(estimator.residual, [0.1, -0.1])
+        assert estimator.uncertainty == pytest.approx(0.3 / np.sqrt(2.0))
+
+    async def test_rubintv_sidecar_watcher(self):
+        columns = ["delta Ra (arcsec)", "delta Dec (arcsec)"]
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = pathlib.Path(tmpdir) / "dayObs_20250101.json"
+            watcher = RubinTVSidecarWatcher(path, poll_interval=0.05)
+
+            # File does not exist yet.
+            assert not watcher.refresh()
+            with pytest.raises(TimeoutError, match="RubinTV data file"):
+                await watcher.wait_for_entry(10, columns=columns, timeout=0.1)
+
+            path.write_text(json.dumps({"9": {columns[0]: 1.0, columns[1]: 2.0}}))
+            assert watcher.refresh()
+            # The file did not change, so it is not parsed again.
+            assert not watcher.refresh()
+            assert watcher.n_parsed == 1
+
+            async def write_entry():
+                await asyncio.sleep(0.2)
+                path.write_text(
+                    json.dumps(
+                        {
+                            "9": {columns[0]: 1.0, columns[1]: 2.0},
+                            "10": {columns[0]: 3.0, columns[1]: 4.0},
+                        }
+                    )
+                )
+                # Make sure the modification time changes, regardless of the
+                # resolution of the filesystem.
+                stat = path.stat()
+                os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+            write_task = asyncio.create_task(write_entry())
+            entry = await watcher.wait_for_entry(10, columns=columns, timeout=5.0)
+            await write_task
+
+            assert entry == {columns[0]: 3.0, columns[1]: 4.0}
+            assert watcher.n_parsed == 2
+
     async def test_executable(self):
         scripts_dir = externalscripts.get_scripts_dir()
         script_path = scripts_dir / "maintel" / "correct_pointing.py"
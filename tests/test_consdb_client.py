@@ -0,0 +1,163 @@
+# This file is part of ts_externalscripts
+#
+# Developed for the LSST Telescope and Site Systems.
+# This product includes software developed by the LSST Project
+# (https://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import asyncio
+import json
+import time
+import unittest
+import unittest.mock as mock
+
+import pytest
+from astropy.table import Table
+from lsst.ts.externalscripts import AsyncConsDbClient
+
+
+class TestAsyncConsDbClient(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.client = AsyncConsDbClient(
+            "http://consdb.test/consdb",
+            poll_interval=0.01,
+            max_poll_interval=0.05,
+        )
+
+    async def asyncTearDown(self):
+        await self.client.close()
+
+    async def test_wait_for_row_to_exist(self):
+        self.client.query = mock.AsyncMock(
+            side_effect=[
+                Table(names=["s_ra", "s_dec"]),
+                RuntimeError("Connection refused."),
+                Table(rows=[[1.0, 2.0]], names=["s_ra", "s_dec"]),
+            ]
+        )
+
+        table = await self.client.wait_for_row_to_exist(query="SELECT", timeout=1.0)
+
+        assert self.client.query.await_count == 3
+        assert table[0]["s_ra"] == 1.0
+        assert table[0]["s_dec"] == 2.0
+
+    async def test_wait_for_row_to_exist_timeout(self):
+        self.client.query = mock.AsyncMock(return_value=Table(names=["s_ra", "s_dec"]))
+
+        table = await self.client.wait_for_row_to_exist(query="SELECT", timeout=0.2)
+
+        assert len(table) == 0
+        # Backoff limits the number of queries.
+        assert 2 < self.client.query.await_count < 20
+
+    async def test_wait_for_row_to_exist_slow_query(self):
+        async def query(query):
+            await asyncio.sleep(10.0)
+
+        self.client.query = mock.AsyncMock(side_effect=query)
+
+        start_time = time.monotonic()
+        table = await self.client.wait_for_row_to_exist(query="SELECT", timeout=0.2)
+
+        assert len(table) == 0
+        assert time.monotonic() - start_time < 1.0
+        assert self.client.query.await_count == 1
+
+    async def test_query(self):
+        assert self.client.session.timeout.total == self.client.request_timeout
+        await self.client.close()
+
+        response = mock.MagicMock()
+        post = mock.MagicMock()
+        post.return_value.__aenter__.return_value = response
+        post.return_value.__aexit__.return_value = False
+        self.client._session = mock.Mock(
+            closed=False, post=post, close=mock.AsyncMock()
+        )
+
+        response.json = mock.AsyncMock(
+            return_value=dict(data=[[1.0, 2.0]], columns=["s_ra", "s_dec"])
+        )
+        table = await self.client.query("SELECT")
+
+        assert table[0]["s_ra"] == 1.0
+        post.assert_called_with(
+            "http://consdb.test/consdb/query", json=dict(query="SELECT")
+        )
+
+        # Timeouts and malformed responses are retried.
+        for error in (
+            asyncio.TimeoutError(),
+            json.JSONDecodeError("Expecting value", "", 0),
+        ):
+            response.json = mock.AsyncMock(side_effect=error)
+            with pytest.raises(RuntimeError):
+                await self.client.query("SELECT")
+
+        response.json = mock.AsyncMock(return_value=dict(detail="Bad query"))
+        with pytest.raises(RuntimeError, match="Malformed"):
+            await self.client.query("SELECT")
+
+    async def test_wait_for_item_in_row(self):
+        self.client.query = mock.AsyncMock(
+            side_effect=[
+                Table(rows=[[1, None]], names=["exposure_id", "median"]),
+                Table(rows=[[1, 15000.0]], names=["exposure_id", "median"]),
+            ]
+        )
+
+        value = await self.client.wait_for_item_in_row(
+            query="SELECT", item="median", timeout=1.0
+        )
+
+        assert value == 15000.0
+
+        self.client.query = mock.AsyncMock(
+            return_value=Table(rows=[[1, None]], names=["exposure_id", "median"])
+        )
+
+        with pytest.raises(asyncio.TimeoutError):
+            await self.client.wait_for_item_in_row(
+                query="SELECT", item="median", timeout=0.1
+            )
+
+    async def test_wait_for_rows(self):
+        self.client.query = mock.AsyncMock(
+            side_effect=[
+                Table(rows=[[1, 10.0, 20.0]], names=["exposure_id", "s_ra", "s_dec"]),
+                Table(
+                    rows=[[1, 10.0, 20.0], [2, 11.0, 21.0]],
+                    names=["exposure_id", "s_ra", "s_dec"],
+                ),
+            ]
+        )
+
+        rows = await self.client.wait_for_rows(
+            table="cdb_lsstcam.exposure",
+            columns=["s_ra", "s_dec"],
+            ids=[1, 2],
+            timeout=1.0,
+        )
+
+        assert self.client.query.await_count == 2
+        self.client.query.assert_awaited_with(
+            "SELECT exposure_id, s_ra, s_dec FROM cdb_lsstcam.exposure "
+            "WHERE exposure_id IN (1, 2)"
+        )
+        assert set(rows) == {1, 2}
+        assert rows[2]["s_ra"] == 11.0
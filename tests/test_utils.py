@@ -18,6 +18,7 @@
 #
 # You should have received a copy of the GNU General Public License
 
+import concurrent.futures
 import pathlib
 import unittest
 
@@ -34,3 +35,28 @@ class TestUtils(unittest.TestCase):
             pkg_path / "python" / "lsst" / "ts" / "externalscripts" / "data" / "scripts"
         )
         assert scripts_dir.samefile(predicted_path)
+
+    def test_stage_timer(self):
+        timer = externalscripts.StageTimer()
+
+        def run_stage(stage):
+            with timer(stage):
+                pass
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=4) as executor:
+            list(executor.map(run_stage, ["load", "detection"] * 4))
+
+        timer.add("fit", 2.0)
+        timer.add("fit", 1.0)
+
+        summary = timer.summary()
+
+        assert set(summary) == {"load", "detection", "fit"}
+        assert summary["load"]["count"] == 4
+        assert summary["detection"]["count"] == 4
+        assert summary["fit"] == dict(count=2, total=3.0, mean=1.5, max=2.0)
+        assert len(timer.format().splitlines()) == 4
+
+        timer.reset()
+
+        assert timer.summary() == dict()